@@ -0,0 +1,118 @@
+"""
+Archive-scale benchmarks runner.
+
+    python -m benchmarks --sizes 1000,10000,100000
+    python -m benchmarks --sizes 10000 --compare data/benchmarks/baseline.json
+
+For each size a synthetic archive is generated, then every stage runs in its own
+freshly spawned process so its peak RSS is not inflated by earlier stages. Results
+are printed and written as JSON; with --compare the run exits with status 1 when a
+stage got slower, or grew its peak RSS, by more than the tolerance.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.stages import LEGACY_FILE, STAGES, run_stage
+
+DEFAULT_SIZES = "1000,10000,100000"
+DEFAULT_OUTPUT = os.path.join("data", "benchmarks", "latest.json")
+
+def _generate(workdir: str, size: int, seed: int):
+    from benchmarks.synthetic import generate_records
+    from reddit_fetch.sinks import write_json_stream
+    write_json_stream(generate_records(size, seed=seed), os.path.join(workdir, LEGACY_FILE))
+
+def _run_in_fresh_process(function, *args):
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return pool.submit(function, *args).result()
+
+def run(sizes: list[int], stages: list[str], seed: int = 42, workdir: str = None, keep: bool = False) -> dict:
+    """Runs the stages at every size. Returns {size: {stage: result or None}}."""
+    from rich.console import Console
+    console = Console()
+    results = {}
+    for size in sizes:
+        directory = os.path.join(workdir, str(size)) if workdir else tempfile.mkdtemp(prefix=f"reddit-fetch-bench-{size}-")
+        os.makedirs(directory, exist_ok=True)
+        try:
+            started = time.perf_counter()
+            _run_in_fresh_process(_generate, directory, size, seed)
+            console.print(f"[bold blue]{size} posts générés en {time.perf_counter() - started:.1f}s ({os.path.getsize(os.path.join(directory, LEGACY_FILE)) / 1e6:.1f} Mo).[/bold blue]")
+            results[str(size)] = {}
+            for name in STAGES:
+                if name in stages:
+                    results[str(size)][name] = _run_in_fresh_process(run_stage, name, directory, size)
+        finally:
+            if not keep:
+                shutil.rmtree(directory, ignore_errors=True)
+    return results
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Lists the stages whose throughput fell, or whose peak RSS grew, by more than tolerance."""
+    regressions = []
+    for size, stages in results.items():
+        for name, result in stages.items():
+            before = baseline.get(size, {}).get(name)
+            if not result or not before:
+                continue
+            if before.get("items_per_sec") and result["items_per_sec"] is not None \
+                    and result["items_per_sec"] < before["items_per_sec"] * (1 - tolerance):
+                regressions.append(f"{name} @ {size}: {before['items_per_sec']} -> {result['items_per_sec']} items/s")
+            if before.get("peak_rss") and result["peak_rss"] > before["peak_rss"] * (1 + tolerance):
+                regressions.append(f"{name} @ {size}: peak RSS {before['peak_rss'] / 2**20:.0f} -> {result['peak_rss'] / 2**20:.0f} MiB")
+    return regressions
+
+def _print_results(results: dict):
+    from rich.console import Console
+    from rich.table import Table
+    table = Table(title="Benchmarks")
+    for column in ("Taille", "Étape", "Items", "Secondes", "Items/s", "RSS max (Mio)"):
+        table.add_column(column, justify="left" if column == "Étape" else "right")
+    for size, stages in results.items():
+        for name, result in stages.items():
+            if result is None:
+                table.add_row(size, name, "-", "-", "-", "ignorée")
+            else:
+                table.add_row(size, name, str(result["items"]), f"{result['seconds']:.3f}",
+                              f"{result['items_per_sec'] or 0:,.0f}", f"{result['peak_rss'] / 2**20:.0f}")
+    Console().print(table)
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmark archive load, merge, dedup and export paths on synthetic archives.")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help=f"Comma-separated archive sizes (default: {DEFAULT_SIZES}).")
+    parser.add_argument("--stages", default=",".join(STAGES), help="Comma-separated stages to run (default: all).")
+    parser.add_argument("--seed", type=int, default=42, help="Seed of the synthetic archive generator.")
+    parser.add_argument("--workdir", help="Directory for the generated archives (default: a temporary directory).")
+    parser.add_argument("--keep", action="store_true", help="Keep the generated archives.")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help=f"Results file (default: {DEFAULT_OUTPUT}).")
+    parser.add_argument("--compare", help="Results file of an earlier run to check for regressions.")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="Allowed relative slowdown or RSS growth (default: 0.3).")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    stages = [name.strip() for name in args.stages.split(",") if name.strip()]
+    unknown = [name for name in stages if name not in STAGES]
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(unknown)}. Choose from: {', '.join(STAGES)}")
+
+    results = run(sizes, stages, seed=args.seed, workdir=args.workdir, keep=args.keep)
+    _print_results(results)
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=4)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
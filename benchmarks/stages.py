@@ -0,0 +1,157 @@
+"""
+Benchmark stages. Each one runs in a fresh process against the work directory and
+returns the number of items it processed and the seconds spent processing them;
+imports happen before the clock starts.
+"""
+import json
+import os
+import sys
+import time
+import resource
+
+LEGACY_FILE = "saved_posts.json"
+MERGE_BATCH = 100 # New records, and as many edited ones, merged by the 'merge' stage
+
+def peak_rss() -> int:
+    """Returns the peak resident set size of the current process in bytes."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def _archive(workdir: str):
+    from reddit_fetch.storage import ShardedArchive
+    return ShardedArchive(os.path.join(workdir, "archive", ""))
+
+def legacy_load(workdir: str, size: int):
+    started = time.perf_counter()
+    with open(os.path.join(workdir, LEGACY_FILE), "r", encoding="utf-8") as f:
+        posts = json.load(f)
+    {post['permalink'] for post in posts}
+    return len(posts), time.perf_counter() - started
+
+def legacy_dump(workdir: str, size: int):
+    with open(os.path.join(workdir, LEGACY_FILE), "r", encoding="utf-8") as f:
+        posts = json.load(f)
+    started = time.perf_counter()
+    with open(os.path.join(workdir, "legacy_dump.json"), "w", encoding="utf-8") as f:
+        json.dump(posts, f, indent=4)
+    return len(posts), time.perf_counter() - started
+
+def archive_import(workdir: str, size: int):
+    from reddit_fetch.storage import open_archive
+    started = time.perf_counter()
+    archive = open_archive(os.path.join(workdir, "archive", ""), legacy_json=os.path.join(workdir, LEGACY_FILE))
+    return len(archive), time.perf_counter() - started
+
+def archive_open(workdir: str, size: int):
+    started = time.perf_counter()
+    archive = _archive(workdir)
+    count = len(archive.index)
+    return count, time.perf_counter() - started
+
+def archive_merge(workdir: str, size: int):
+    from benchmarks.synthetic import generate_records
+    from reddit_fetch.records import content_hash
+    fresh = [dict(post, permalink=f"{post['permalink']}merged/") for post in generate_records(MERGE_BATCH, seed=size + 1)]
+    for post in fresh:
+        post['content_hash'] = content_hash(post)
+    started = time.perf_counter()
+    archive = _archive(workdir)
+    permalinks = list(archive.index)
+    step = max(len(permalinks) // MERGE_BATCH, 1)
+    edited_permalinks = permalinks[::step][:MERGE_BATCH]
+    for permalink in edited_permalinks:
+        edited = dict(archive.get(permalink), selftext="edited")
+        edited['content_hash'] = content_hash(edited)
+        archive.upsert(edited)
+    for post in fresh:
+        archive.upsert(post)
+    archive.commit()
+    return len(edited_permalinks) + len(fresh), time.perf_counter() - started
+
+def archive_scan(workdir: str, size: int):
+    started = time.perf_counter()
+    count = sum(1 for _ in _archive(workdir).iter_records())
+    return count, time.perf_counter() - started
+
+def aggregates(workdir: str, size: int):
+    started = time.perf_counter()
+    totals = _archive(workdir).aggregates["total"]
+    return totals["count"], time.perf_counter() - started
+
+def export_json(workdir: str, size: int):
+    from reddit_fetch.sinks import write_json_stream
+    started = time.perf_counter()
+    count = write_json_stream(_archive(workdir).iter_records(), os.path.join(workdir, "export.json"))
+    return count, time.perf_counter() - started
+
+def export_json_shards(workdir: str, size: int):
+    from reddit_fetch.sinks import write_json_from_shards
+    started = time.perf_counter()
+    count = write_json_from_shards(_archive(workdir), os.path.join(workdir, "export_shards.json"))
+    return count, time.perf_counter() - started
+
+def export_html(workdir: str, size: int):
+    from reddit_fetch.sinks import write_html_stream
+    started = time.perf_counter()
+    count = write_html_stream(_archive(workdir).iter_records(), os.path.join(workdir, "export.html"))
+    return count, time.perf_counter() - started
+
+def sheet_rows(workdir: str, size: int):
+    from reddit_fetch.sheets import overflow_rows, sheet_row
+    started = time.perf_counter()
+    posts = list(_archive(workdir).iter_records())
+    [sheet_row(post, overflow=True) for post in posts]
+    overflow_rows(posts)
+    return len(posts), time.perf_counter() - started
+
+def export_parquet(workdir: str, size: int):
+    from reddit_fetch.columnar import _require_pyarrow, export_to_parquet
+    if _require_pyarrow() is None:
+        return None
+    started = time.perf_counter()
+    archive = _archive(workdir)
+    if not export_to_parquet(archive.iter_records(), reset=True):
+        raise RuntimeError("parquet export failed")
+    return len(archive), time.perf_counter() - started
+
+def dedup(workdir: str, size: int):
+    from reddit_fetch.dedup import _require_numpy, dedupe_archive
+    if _require_numpy() is None:
+        return None
+    started = time.perf_counter()
+    archive = _archive(workdir)
+    # An empty index makes this the first run, which signs and indexes every record
+    dedupe_archive(archive, [], "flag", path=os.path.join(workdir, "dedup_index.npz"))
+    return len(archive), time.perf_counter() - started
+
+# In run order: later stages read the archive built by archive_import
+STAGES = {
+    "legacy_load": legacy_load,
+    "legacy_dump": legacy_dump,
+    "archive_import": archive_import,
+    "archive_open": archive_open,
+    "archive_merge": archive_merge,
+    "archive_scan": archive_scan,
+    "aggregates": aggregates,
+    "export_json": export_json,
+    "export_json_shards": export_json_shards,
+    "export_html": export_html,
+    "sheet_rows": sheet_rows,
+    "export_parquet": export_parquet,
+    "dedup": dedup,
+}
+
+def run_stage(name: str, workdir: str, size: int):
+    """Runs one stage. Returns a result dictionary, or None if the stage's optional dependency is missing."""
+    os.environ["REDDIT_FETCH_DATA_DIR"] = workdir # Before reddit_fetch.config is imported
+    import reddit_fetch.storage # Keeps import time out of the measurements
+    outcome = STAGES[name](workdir, size)
+    if outcome is None:
+        return None
+    items, seconds = outcome
+    return {
+        "items": items,
+        "seconds": round(seconds, 4),
+        "items_per_sec": round(items / seconds, 1) if seconds > 0 else None,
+        "peak_rss": peak_rss()
+    }
@@ -0,0 +1,69 @@
+"""Deterministic synthetic archives shaped like real saved-post archives."""
+import random
+from typing import Iterator
+from reddit_fetch.records import REDDIT_URL, content_hash
+
+START_TIMESTAMP = 1546300800 # 2019-01-01
+SPAN_SECONDS = 5 * 365 * 86400 # Saves spread over five years
+
+_WORDS = ("the of and to in is you that it for on with as this was are be at have not or what but from "
+          "python rust database kernel memory latency release benchmark garden recipe coffee bike camera "
+          "history war map city music album film review guide question answer update finally today help").split()
+_DOMAINS = ("github.com", "arxiv.org", "nytimes.com", "youtube.com", "en.wikipedia.org", "medium.com", "i.imgur.com")
+
+def _text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(words))
+
+def _comment_count(rng: random.Random) -> int:
+    # Heavy tail: most posts carry a handful of comments, a few are megathreads
+    roll = rng.random()
+    if roll < 0.5:
+        return rng.randint(0, 5)
+    if roll < 0.95:
+        return rng.randint(5, 40)
+    if roll < 0.995:
+        return rng.randint(40, 300)
+    return rng.randint(300, 2000)
+
+def generate_records(count: int, seed: int = 42, comments: bool = True) -> Iterator[dict]:
+    """
+    Yields `count` archive records, identical for a given seed.
+
+    About 80% are posts (a third of them self posts with up to ~2 KB of text) and
+    20% saved comments. Subreddits follow a Zipf-like distribution over 500 names,
+    and comment bodies average around 200 characters.
+    """
+    rng = random.Random(seed)
+    subreddits = [f"sub{n}" for n in range(500)]
+    weights = [1 / (rank + 1) for rank in range(len(subreddits))]
+    for n in range(count):
+        subreddit = rng.choices(subreddits, weights)[0]
+        post_id = f"{n:x}"
+        date_saved = float(START_TIMESTAMP + rng.randrange(SPAN_SECONDS))
+        title = _text(rng, rng.randint(5, 15)).capitalize()
+        if rng.random() < 0.2:
+            body = _text(rng, rng.randint(5, 80))
+            record = {
+                'fullname': f"t1_c{post_id}", 'type': 'comment', 'title': f"Comment on {title}",
+                'score': rng.randint(-5, 500), 'subreddit': subreddit,
+                'permalink': f"{REDDIT_URL}/r/{subreddit}/comments/{post_id}/slug/c{post_id}/",
+                'url': f"{REDDIT_URL}/r/{subreddit}/comments/{post_id}/slug/",
+                'date_saved': date_saved, 'selftext': body, 'num_comments': 'N/A', 'combined_content': body
+            }
+        else:
+            permalink = f"{REDDIT_URL}/r/{subreddit}/comments/{post_id}/slug/"
+            selftext = _text(rng, rng.randint(20, 350)) if rng.random() < 0.33 else ""
+            url = permalink if selftext else f"https://{rng.choice(_DOMAINS)}/{post_id}"
+            thread = []
+            if comments:
+                for _ in range(_comment_count(rng)):
+                    thread.append({'author': f"user{rng.randrange(20000)}", 'body': _text(rng, rng.randint(3, 70)), 'score': rng.randint(-10, 2000)})
+            combined = selftext + "".join(f"\n\n--- Comment by u/{c['author']} ---\n{c['body']}" for c in thread)
+            record = {
+                'fullname': f"t3_{post_id}", 'type': 'post', 'title': title, 'score': rng.randint(0, 50000),
+                'subreddit': subreddit, 'permalink': permalink, 'url': url, 'date_saved': date_saved,
+                'selftext': selftext, 'num_comments': len(thread) + rng.randint(0, 50), 'comments': thread,
+                'combined_content': combined
+            }
+        record['content_hash'] = content_hash(record)
+        yield record
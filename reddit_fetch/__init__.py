@@ -1 +1,3 @@
-from .main import fetch_saved_posts
\ No newline at end of file
+from .main import fetch_saved_posts
+from .api import iter_saved_items, load_archive
+from .records import SavedItem
@@ -0,0 +1,164 @@
+import os
+import re
+import json
+import time
+import queue
+import multiprocessing
+from rich.console import Console
+from reddit_fetch.config import DATA_DIR, ACCOUNTS_PARALLELISM
+from reddit_fetch.storage import write_json_atomic
+
+console = Console()
+
+RUN_SUMMARY_FILE = f"{DATA_DIR}run_summary.json"
+
+_ACCOUNT_NAME = re.compile(r"^[A-Za-z0-9_-]+$")
+
+# Manifest keys and the environment variables they set in the account's worker process
+_ACCOUNT_ENV = {
+    "client_id": "CLIENT_ID",
+    "client_secret": "CLIENT_SECRET",
+    "user_agent": "USER_AGENT",
+    "username": "REDDIT_USERNAME",
+    "token_file": "TOKEN_FILE",
+    "max_requests_per_minute": "REDDIT_MAX_RPM",
+    "google_sheet_name": "GOOGLE_SHEET_NAME",
+}
+
+def load_accounts(path: str) -> list[dict]:
+    """
+    Reads an accounts manifest.
+
+    The manifest is a JSON object with an "accounts" list. Each account needs a
+    "name" (used as its output namespace, data/<name>/) and its Reddit credentials:
+
+        {"accounts": [{"name": "alice", "client_id": "...", "client_secret": "...",
+                       "user_agent": "...", "username": "alice",
+                       "token_file": "data/alice/tokens.json",
+                       "max_requests_per_minute": 60}]}
+
+    "token_file" defaults to data/<name>/tokens.json.
+
+    Raises:
+        ValueError: If the manifest is malformed.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    accounts = manifest.get("accounts") if isinstance(manifest, dict) else None
+    if not accounts:
+        raise ValueError(f"{path} must contain a non-empty 'accounts' list")
+
+    names = set()
+    for account in accounts:
+        name = account.get("name", "")
+        if not _ACCOUNT_NAME.match(name):
+            raise ValueError(f"Invalid account name '{name}': use letters, digits, '-' or '_'")
+        if name in names:
+            raise ValueError(f"Duplicate account name '{name}'")
+        names.add(name)
+        missing = [key for key in ("client_id", "client_secret", "user_agent", "username") if not account.get(key)]
+        if missing:
+            raise ValueError(f"Account '{name}' is missing: {', '.join(missing)}")
+        account.setdefault("token_file", f"{DATA_DIR}{name}/tokens.json")
+    return accounts
+
+def account_environment(account: dict) -> dict:
+    """Returns the environment overrides that scope a worker process to one account."""
+    env = {var: str(account[key]) for key, var in _ACCOUNT_ENV.items() if account.get(key) is not None}
+    env["REDDIT_FETCH_DATA_DIR"] = f"{DATA_DIR}{account['name']}/"
+    return env
+
+def _account_worker(name: str, format: str, force_fetch: bool, results):
+    """Fetches one account. Runs in a spawned process whose environment is already scoped to it."""
+    from reddit_fetch.api import fetch_saved_posts
+
+    start = time.monotonic()
+    try:
+        result = fetch_saved_posts(format=format, force_fetch=force_fetch)
+        exports = result.get("exports", {})
+        status = "ok" if exports and all(exports.values()) else "failed"
+        results.put({
+            "account": name,
+            "status": status,
+            "count": result["count"],
+            "exports": exports,
+            "duration": round(time.monotonic() - start, 2)
+        })
+    except Exception as e:
+        results.put({"account": name, "status": "error", "error": str(e), "count": 0, "duration": round(time.monotonic() - start, 2)})
+
+def _start_worker(ctx, account: dict, format: str, force_fetch: bool, results):
+    # Spawned children inherit os.environ as it is at start(), so the account's
+    # credentials and data directory are in place before any module is imported
+    overrides = account_environment(account)
+    saved = {var: os.environ.get(var) for var in overrides}
+    os.environ.update(overrides)
+    try:
+        process = ctx.Process(target=_account_worker, args=(account["name"], format, force_fetch, results), name=f"account-{account['name']}")
+        process.start()
+    finally:
+        for var, value in saved.items():
+            if value is None:
+                os.environ.pop(var, None)
+            else:
+                os.environ[var] = value
+    return process
+
+def _record_summary(summary: dict, summaries: dict, running: dict):
+    summaries[summary["account"]] = summary
+    process = running.pop(summary["account"], None) # Already gone if it was taken for crashed
+    if process is not None:
+        process.join()
+
+def fetch_accounts(accounts: list[dict], format: str = "json", force_fetch: bool = False, parallelism: int = ACCOUNTS_PARALLELISM) -> dict:
+    """
+    Fetches several accounts in parallel worker processes.
+
+    Each account gets its own process, Reddit rate limiter and output namespace
+    under data/<account>/. At most `parallelism` accounts run at once. A
+    consolidated summary is written to data/run_summary.json.
+
+    Returns:
+        The run summary: per-account status, item count, exports and duration.
+    """
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    pending = list(accounts)
+    running = {}
+    summaries = {}
+    started_at = time.time()
+    start = time.monotonic()
+
+    while pending or running:
+        while pending and len(running) < max(1, parallelism):
+            account = pending.pop(0)
+            console.print(f"[bold blue]Starting fetch for account '{account['name']}'...[/bold blue]")
+            running[account["name"]] = _start_worker(ctx, account, format, force_fetch, results)
+
+        try:
+            _record_summary(results.get(timeout=1.0), summaries, running)
+        except queue.Empty:
+            pass
+
+        # Workers that died without reporting (e.g. killed by the OS) never put a summary
+        for name, process in list(running.items()):
+            if not process.is_alive() and process.exitcode not in (None, 0):
+                summaries[name] = {"account": name, "status": "crashed", "exitcode": process.exitcode, "count": 0}
+                running.pop(name)
+
+    # A worker that reported and then exited non-zero was taken for crashed: its report wins
+    while True:
+        try:
+            _record_summary(results.get_nowait(), summaries, running)
+        except queue.Empty:
+            break
+
+    summary = {
+        "started_at": started_at,
+        "duration": round(time.monotonic() - start, 2),
+        "total_count": sum(item["count"] for item in summaries.values()),
+        "accounts": [summaries[account["name"]] for account in accounts]
+    }
+    write_json_atomic(RUN_SUMMARY_FILE, summary)
+    return summary
@@ -1,5 +1,4 @@
 import gspread
-from google.oauth2 import service_account
 import os
 from rich.console import Console
 from dotenv import load_dotenv
@@ -7,16 +6,29 @@ import json
 import requests
 from datetime import datetime # Changed to direct import of datetime class
 import praw
+import time
+from typing import Iterator
 from reddit_fetch.auth import refresh_access_token_safe, load_tokens_safe, is_headless, show_headless_instructions # Import authentication functions
+from reddit_fetch.changelog import ChangeLog
+from reddit_fetch.config import DATA_DIR, CHECKPOINT_EVERY, CHECKPOINT_INTERVAL, GOOGLE_SHEET_LAYOUT, DEDUP, SNAPSHOT_LINKS
+from reddit_fetch.dedup import dedupe_archive
+from reddit_fetch.filters import FetchFilters
+from reddit_fetch.records import SavedItem, item_to_record
+from reddit_fetch.sessions import get_sheets_client, praw_requestor_kwargs
+from reddit_fetch.sheets import SHEET_HEADERS, export_sharded, sheet_row, update_worksheet
+from reddit_fetch.sinks import export_to_sinks, parse_formats
+from reddit_fetch.snapshots import snapshot_archive
+from reddit_fetch.storage import ARCHIVE_DIR, ShardedArchive, open_archive, write_json_atomic
 
 # Load environment variables from .env file
 load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env'))
 
 console = Console()
 
-DATA_DIR = "data/"
 OUTPUT_JSON = f"{DATA_DIR}saved_posts.json"
 LAST_FETCH_FILE = f"{DATA_DIR}last_fetch.json"
+FETCH_STATE_FILE = f"{DATA_DIR}fetch_state.json"
+FETCH_LIMIT = 100 # Maximum number of saved items walked per run
 
 def _get_last_fetch_timestamp():
     """Reads the last fetch timestamp from a file."""
@@ -37,7 +49,42 @@ def _save_last_fetch_timestamp(timestamp):
     except IOError as e:
         console.print(f"[bold red]Erreur:[/bold red] Impossible de sauvegarder le timestamp du dernier fetch: {e}", style="bold red")
 
-def export_to_google_sheet(posts_data: list[dict], spreadsheet_name: str) -> bool:
+def _load_fetch_state():
+    """Reads the in-progress fetch state left behind by an interrupted run, if any."""
+    if os.path.exists(FETCH_STATE_FILE):
+        try:
+            with open(FETCH_STATE_FILE, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            console.print("[bold yellow]Avertissement:[/bold yellow] Impossible de lire l'état du fetch interrompu. Reprise à zéro.")
+    return None
+
+def _clear_fetch_state():
+    """Removes the in-progress fetch state once a run has completed."""
+    if os.path.exists(FETCH_STATE_FILE):
+        os.remove(FETCH_STATE_FILE)
+
+def load_archive() -> ShardedArchive:
+    """
+    Opens the sharded archive under data/archive/, migrating a legacy
+    saved_posts.json into it on first use. Its commits append to the change log in
+    data/archive/changes/.
+    """
+    return open_archive(ARCHIVE_DIR, legacy_json=OUTPUT_JSON, changelog=ChangeLog(f"{ARCHIVE_DIR}changes/"))
+
+def _commit_checkpoint(archive: ShardedArchive, state):
+    """
+    Commits the archive and the listing cursor of the running fetch.
+
+    The touched archive shards are replaced first and the cursor second, all
+    atomically. If the process dies in between, the next run replays the last batch
+    from the previous cursor: the archive rebuilds its index from shards written
+    after it, so the permalink dedup makes that replay a no-op.
+    """
+    archive.commit()
+    write_json_atomic(FETCH_STATE_FILE, state)
+
+def export_to_google_sheet(posts_data: list[dict], spreadsheet_name: str, changed: list[int] = None, layout: str = None) -> bool:
     """
     Exports a list of post data to a Google Sheet.
 
@@ -45,6 +92,13 @@ def export_to_google_sheet(posts_data: list[dict], spreadsheet_name: str) -> boo
         posts_data: A list of dictionaries, where each dictionary represents a post
                     and contains at least 'title', 'score', 'subreddit', 'permalink', 'url'.
         spreadsheet_name: The name of the Google Sheet to export to.
+        changed: Archive positions whose content changed since the last export. When
+                 given, only those rows are rewritten and new posts are appended, as
+                 long as the sheet still mirrors the archive; otherwise the sheet is
+                 cleared and rewritten.
+        layout: 'single' (first worksheet only), 'year' or 'subreddit' (one
+                worksheet per key plus an overflow worksheet for long text).
+                Defaults to GOOGLE_SHEET_LAYOUT.
 
     Returns:
         True if the export was successful, False otherwise.
@@ -60,9 +114,8 @@ def export_to_google_sheet(posts_data: list[dict], spreadsheet_name: str) -> boo
             )
             return False
 
-        scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-        creds = service_account.Credentials.from_service_account_file(credentials_path, scopes=scope)
-        client = gspread.authorize(creds)
+        # Authorized clients are cached per process and share the pooled HTTP session
+        client = get_sheets_client(credentials_path)
 
         # Open the spreadsheet by name
         try:
@@ -87,17 +140,23 @@ def export_to_google_sheet(posts_data: list[dict], spreadsheet_name: str) -> boo
                 console.print(f"[bold red]Erreur API Google Sheets:[/bold red] {e}", style="bold red")
             return False
 
+        layout = layout or GOOGLE_SHEET_LAYOUT
+        if layout != "single":
+            return export_sharded(spreadsheet, posts_data, layout, changed=changed)
+
         # Select the first worksheet
         worksheet = spreadsheet.get_worksheet(0)
         console.print("[bold green]Succès:[/bold green] Première feuille de travail sélectionnée.")
 
+        if changed is not None and update_worksheet(worksheet, posts_data, changed):
+            return True
+
         # Clear existing content
         worksheet.clear()
         console.print("[bold green]Succès:[/bold green] Contenu existant de la feuille effacé.")
 
         # Define headers
-        headers = ['Title', 'Score', 'Subreddit', 'Reddit Link', 'External URL', 'Date Saved', 'Self Text', 'Comments Count', 'Combined Content']
-        worksheet.append_row(headers)
+        worksheet.append_row(SHEET_HEADERS)
         console.print("[bold green]Succès:[/bold green] En-têtes ajoutés.")
 
         # Apply formatting to headers (bold)
@@ -111,33 +170,7 @@ def export_to_google_sheet(posts_data: list[dict], spreadsheet_name: str) -> boo
         })
 
         # Prepare data for insertion
-        rows_to_insert = []
-
-        for i, post in enumerate(posts_data):
-            date_saved = post.get('date_saved', '')
-            if isinstance(date_saved, (int, float)): # Assuming timestamp
-                date_saved = datetime.fromtimestamp(date_saved).strftime('%Y-%m-%d %H:%M:%S') # Changed here
-            
-            full_selftext = str(post.get('selftext', ''))
-            if len(full_selftext) > 4999:
-                full_selftext = full_selftext[:4999]
-
-            combined_content = str(post.get('combined_content', ''))
-            if len(combined_content) > 4999:
-                combined_content = combined_content[:4999]
-            
-            row = [
-                post.get('title', ''),
-                post.get('score', ''),
-                post.get('subreddit', ''),
-                post.get('permalink', ''),
-                post.get('url', ''),
-                date_saved,
-                full_selftext,
-                post.get('num_comments', ''),
-                combined_content
-            ]
-            rows_to_insert.append(row)
+        rows_to_insert = [sheet_row(post) for post in posts_data]
 
         # Insert all data in one batch
         if rows_to_insert:
@@ -152,19 +185,17 @@ def export_to_google_sheet(posts_data: list[dict], spreadsheet_name: str) -> boo
         console.print(f"[bold red]Une erreur inattendue est survenue:[/bold red] {e}", style="bold red")
         return False
 
-def fetch_saved_posts(format: str = "json", force_fetch: bool = False) -> dict:
+def get_reddit_client(revalidate: bool = False):
     """
-    Fetches saved posts from Reddit and saves them in the specified format.
+    Builds an authenticated PRAW client from the environment and the stored refresh token.
 
     Args:
-        format: The desired output format ('json', 'html', 'google_sheet').
-        force_fetch: If True, forces a new fetch regardless of existing data.
+        revalidate: If True, cached API responses are revalidated instead of being
+                    served within their freshness window.
 
     Returns:
-        A dictionary containing the fetched content, count, and format.
+        A praw.Reddit instance, or None if credentials or tokens are missing.
     """
-    console.print(f"[bold blue]Fetching saved posts from Reddit...[/bold blue]")
-    
     client_id = os.getenv("CLIENT_ID")
     client_secret = os.getenv("CLIENT_SECRET")
     user_agent = os.getenv("USER_AGENT")
@@ -172,7 +203,7 @@ def fetch_saved_posts(format: str = "json", force_fetch: bool = False) -> dict:
 
     if not all([client_id, client_secret, user_agent, reddit_username]):
         console.print("[bold red]Erreur:[/bold red] Les variables d'environnement CLIENT_ID, CLIENT_SECRET, USER_AGENT, REDDIT_USERNAME doivent être définies dans .env pour l'authentification Reddit.", style="bold red")
-        return {"content": [], "count": 0, "format": format}
+        return None
 
     # Ensure we have a valid refresh token
     tokens = load_tokens_safe()
@@ -180,123 +211,219 @@ def fetch_saved_posts(format: str = "json", force_fetch: bool = False) -> dict:
         console.print("[bold red]Erreur:[/bold red] Jeton de rafraîchissement Reddit introuvable. Veuillez vous authentifier.", style="bold red")
         if is_headless():
             show_headless_instructions()
-        return {"content": [], "count": 0, "format": format}
+        return None
+
+    return praw.Reddit(
+        client_id=client_id,
+        client_secret=client_secret,
+        user_agent=user_agent,
+        username=reddit_username,
+        refresh_token=tokens["refresh_token"],
+        requestor_kwargs=praw_requestor_kwargs(revalidate=revalidate)
+    )
+
+def iter_saved_items(reddit=None, since: float = 0.0, hydrate: str = None, filters: FetchFilters = None,
+                     limit: int = FETCH_LIMIT, after: str = None, cursor: dict = None) -> Iterator[SavedItem]:
+    """
+    Yields the authenticated user's saved items as archive records, newest first.
+
+    Records are built as the consumer pulls them: listing pages and comment trees are
+    only requested when the next record is needed, so a slow consumer naturally holds
+    back the fetch. Nothing is written to disk.
+
+    Args:
+        reddit: An authenticated praw.Reddit instance. Built from the environment if None.
+        since: Stop at the first item created at or before this Unix timestamp.
+        hydrate: Comment hydration policy ('all', 'top', 'none') overriding the filters'.
+        filters: Which items to yield. Items rejected by the filters cost no request
+                 beyond their listing page.
+        limit: Maximum number of listing items to walk (None for no limit).
+        after: Fullname of the listing item to resume after.
+        cursor: Optional dictionary updated in place with the listing progress:
+                'after' (last walked fullname), 'seen', 'skipped', 'max_timestamp' and
+                'stopped_at' (timestamp of the item that hit `since`).
+
+    Raises:
+        RuntimeError: If no client was given and Reddit credentials are missing.
+    """
+    if reddit is None:
+        reddit = get_reddit_client()
+        if reddit is None:
+            raise RuntimeError("Reddit credentials or refresh token are missing")
+    if filters is None:
+        filters = FetchFilters()
+    if cursor is None:
+        cursor = {}
+    cursor.setdefault("seen", 0)
+    cursor.setdefault("skipped", 0)
+    cursor.setdefault("max_timestamp", since)
+
+    # Reddit API's saved() generator yields items from newest to oldest
+    params = {"after": after} if after else None
+    for item in reddit.user.me().saved(limit=limit, params=params):
+        if item.created_utc <= since:
+            cursor["stopped_at"] = item.created_utc
+            return # Everything past this point was archived by an earlier run
+
+        # Filters run on listing data, before any per-item request
+        post = None
+        if filters.accepts(item):
+            post = item_to_record(item, hydrate=hydrate or filters.hydration_for(item.subreddit.display_name))
+        else:
+            cursor["skipped"] += 1
+
+        cursor["after"] = item.fullname
+        cursor["seen"] += 1
+        cursor["max_timestamp"] = max(cursor["max_timestamp"], item.created_utc)
+        if post is not None:
+            yield post
+
+def fetch_saved_posts(format: str = "json", force_fetch: bool = False, filters: FetchFilters = None) -> dict:
+    """
+    Fetches saved posts from Reddit and saves them in the specified formats.
 
-    refresh_token = tokens["refresh_token"]
+    Args:
+        format: The desired output format ('json', 'html', 'google_sheet', 'parquet'),
+                or several of them separated by commas, e.g. 'json,html,google_sheet'.
+        force_fetch: If True, forces a new fetch regardless of existing data.
+        filters: Which items to archive and how deeply to hydrate their comments.
+                 Defaults to FetchFilters.from_env(). Filters only apply to items
+                 fetched from now on; use force_fetch after widening them.
+
+    Returns:
+        A dictionary containing the number of archived posts, the format, the success
+        flag of each export and the change counts. The archive itself is streamed
+        into the exports and never held in memory as a whole.
+    """
+    console.print(f"[bold blue]Fetching saved posts from Reddit...[/bold blue]")
 
     try:
-        reddit = praw.Reddit(
-            client_id=client_id,
-            client_secret=client_secret,
-            user_agent=user_agent,
-            username=reddit_username,
-            refresh_token=refresh_token
+        formats = parse_formats(format)
+        if filters is None:
+            filters = FetchFilters.from_env()
+    except ValueError as e:
+        console.print(f"[bold red]Erreur:[/bold red] {e}", style="bold red")
+        return {"count": 0, "format": format}
+    
+    reddit = get_reddit_client(revalidate=force_fetch)
+    if reddit is None:
+        return {"count": 0, "format": format}
+
+    state = None
+    archive = None
+    committed = 0
+
+    try:
+        state = _load_fetch_state()
+        resuming = bool(state) and state.get("force", False) == force_fetch
+
+        if resuming:
+            last_fetch_timestamp = state["stop_timestamp"]
+            console.print(f"[bold blue]Resuming interrupted fetch after {state['after']} ({state['seen']} items already processed).[/bold blue]")
+        else:
+            last_fetch_timestamp = _get_last_fetch_timestamp()
+            state = {
+                "after": None,
+                "seen": 0,
+                "force": force_fetch,
+                "stop_timestamp": last_fetch_timestamp,
+                "max_timestamp": last_fetch_timestamp
+            }
+
+        # Open the sharded archive. Only its permalink index is read up front; a shard
+        # is loaded when a fetched post lands in it. A force fetch refreshes the
+        # archive in place rather than starting over.
+        try:
+            archive = load_archive()
+            console.print(f"[bold green]Loaded index of {len(archive)} existing posts in {len(archive.shard_keys())} shards from {ARCHIVE_DIR}.[/bold green]")
+        except json.JSONDecodeError:
+            console.print(f"[bold yellow]Avertissement:[/bold yellow] Impossible de décoder {OUTPUT_JSON}. L'archive repart de zéro.", style="bold yellow")
+            archive = ShardedArchive(ARCHIVE_DIR)
+
+        # New posts are added to their month's shard; posts already archived are only
+        # replaced when their content hash changed (edited selftext or comments)
+        changes = state.setdefault("changes", {"new": 0, "changed": 0, "unchanged": 0})
+        changed_permalinks = set(state.setdefault("changed_permalinks", []))
+        new_permalinks = state.setdefault("new_permalinks", [])
+        committed = state["seen"]
+        last_flush = time.monotonic()
+
+        # Progress is committed in batches together with the listing cursor, which
+        # iter_saved_items advances in `state`, so an interrupted run resumes right
+        # after the last committed item instead of starting over.
+        items = iter_saved_items(
+            reddit,
+            since=0.0 if force_fetch else last_fetch_timestamp,
+            filters=filters,
+            limit=FETCH_LIMIT - state["seen"],
+            after=state["after"],
+            cursor=state
         )
-        
-        new_posts_data = []
-        last_fetch_timestamp = _get_last_fetch_timestamp()
-        current_max_timestamp = last_fetch_timestamp
-
-        # Fetch saved items, starting from the last fetched timestamp if not force_fetch
-        # PRAW's .saved() method does not directly support an 'after' parameter for timestamp.
-        # We need to fetch and then filter manually.
-        # For efficiency, we can limit the fetch to a reasonable number and then filter.
-        # Or, if we want truly incremental, we need to iterate until we hit old posts.
-        # For simplicity and to avoid infinite loops on first run, we'll fetch a batch and filter.
-        # A more robust solution for very large saved lists might involve more complex pagination.
-        
-        # Fetch a reasonable number of recent saved items
-        # Reddit API's saved() generator yields items from newest to oldest.
-        for item in reddit.user.me().saved(limit=100): # Fetch up to 100 most recent saved items
-            if item.created_utc <= last_fetch_timestamp and not force_fetch:
-                console.print(f"[bold blue]Stopping fetch: Reached item saved at {datetime.fromtimestamp(item.created_utc).strftime('%Y-%m-%d %H:%M:%S')}, which is older than or equal to last fetch timestamp.[/bold blue]")
-                break # Stop if we encounter an item older than or equal to the last fetch timestamp
-
-            combined_content = ""
-            if isinstance(item, praw.models.Submission):
-                combined_content += item.selftext if item.selftext else ""
-                # Fetch all comments for the submission
-                # Be cautious: this can be very slow and hit API limits for many posts with many comments
-                try:
-                    item.comments.replace_more(limit=None)
-                    for comment in item.comments.list():
-                        combined_content += f"\n\n--- Comment by u/{comment.author.name if comment.author else '[deleted]'} ---\n{comment.body}"
-                except Exception as comment_e:
-                    console.print(f"[bold yellow]Avertissement:[/bold yellow] Impossible de récupérer les commentaires pour {item.title}: {comment_e}", style="bold yellow")
-
-                new_posts_data.append({
-                    'title': item.title,
-                    'score': item.score,
-                    'subreddit': item.subreddit.display_name,
-                    'permalink': f"https://www.reddit.com{item.permalink}",
-                    'url': item.url,
-                    'date_saved': item.created_utc, # Unix timestamp
-                    'selftext': item.selftext,
-                    'num_comments': item.num_comments,
-                    'combined_content': combined_content
-                })
-            elif isinstance(item, praw.models.Comment):
-                combined_content += item.body # Comment body is the primary content for comments
-                new_posts_data.append({
-                    'title': f"Comment on {item.submission.title}",
-                    'score': item.score,
-                    'subreddit': item.subreddit.display_name,
-                    'permalink': f"https://www.reddit.com{item.permalink}",
-                    'url': item.submission.url, # Link to the submission the comment is on
-                    'date_saved': item.created_utc,
-                    'selftext': item.body, # Comment body is selftext for comments
-                    'num_comments': 'N/A', # Not applicable for a single comment
-                    'combined_content': combined_content
-                })
-            
-            # Update current_max_timestamp with the newest item's timestamp
-            if item.created_utc > current_max_timestamp:
-                current_max_timestamp = item.created_utc
-
-        console.print(f"[bold green]Fetched {len(new_posts_data)} new saved posts and comments from Reddit.[/bold green]")
-
-        # Load existing data, append new posts, and save back to JSON
-        all_posts_data = []
-        if os.path.exists(OUTPUT_JSON) and not force_fetch:
-            try:
-                with open(OUTPUT_JSON, "r", encoding="utf-8") as f:
-                    all_posts_data = json.load(f)
-                console.print(f"[bold green]Loaded {len(all_posts_data)} existing posts from {OUTPUT_JSON}.[/bold green]")
-            except json.JSONDecodeError:
-                console.print(f"[bold yellow]Avertissement:[/bold yellow] Impossible de décoder {OUTPUT_JSON}. Le fichier sera écrasé.", style="bold yellow")
-        
-        # Add only truly new posts to avoid duplicates if filtering wasn't perfect
-        existing_permalinks = {post['permalink'] for post in all_posts_data}
-        unique_new_posts = [post for post in new_posts_data if post['permalink'] not in existing_permalinks]
-        all_posts_data.extend(unique_new_posts)
-
-        # Always save to JSON
-        os.makedirs(DATA_DIR, exist_ok=True)
-        with open(OUTPUT_JSON, "w", encoding="utf-8") as f:
-            json.dump(all_posts_data, f, indent=4)
-        console.print(f"[bold green]Saved {len(all_posts_data)} total posts to {OUTPUT_JSON}.[/bold green]")
-
-        # Save the new last fetch timestamp if new posts were found
-        if new_posts_data:
+        for post in items:
+            outcome = archive.upsert(post)
+            changes[outcome] += 1
+            if outcome == "new":
+                new_permalinks.append(post['permalink'])
+            elif outcome == "changed":
+                changed_permalinks.add(post['permalink'])
+                state["changed_permalinks"] = sorted(changed_permalinks)
+
+            if state["seen"] - committed >= CHECKPOINT_EVERY or time.monotonic() - last_flush >= CHECKPOINT_INTERVAL:
+                _commit_checkpoint(archive, state)
+                console.print(f"[bold blue]Checkpoint: {state['seen']} items processed, {len(archive)} posts in archive.[/bold blue]")
+                committed = state["seen"]
+                last_flush = time.monotonic()
+
+        if state.get("stopped_at") is not None:
+            console.print(f"[bold blue]Stopping fetch: Reached item saved at {datetime.fromtimestamp(state['stopped_at']).strftime('%Y-%m-%d %H:%M:%S')}, which is older than or equal to last fetch timestamp.[/bold blue]")
+        current_max_timestamp = state["max_timestamp"]
+
+        console.print(f"[bold green]Fetched {sum(changes.values())} saved posts and comments from Reddit.[/bold green]")
+        console.print(f"[bold blue]Changes: {changes['new']} new, {changes['changed']} changed, {changes['unchanged']} unchanged.[/bold blue]")
+        if state.get("skipped"):
+            console.print(f"[bold blue]{state['skipped']} saved items skipped by fetch filters.[/bold blue]")
+
+        # Cluster new posts with their near-duplicates before the final commit
+        if DEDUP != "off":
+            deduped = dedupe_archive(archive, new_permalinks, DEDUP)
+            if deduped:
+                console.print(f"[bold blue]Doublons: {deduped['flagged']} signalés, {deduped['merged']} fusionnés.[/bold blue]")
+
+        # Snapshot the external pages new posts link to
+        if SNAPSHOT_LINKS:
+            snapshot_archive(archive, new_permalinks)
+
+        # Always commit the archive. Shards that gained no post are left untouched.
+        rewritten = archive.commit()
+        committed = state["seen"]
+        console.print(f"[bold green]Saved {len(archive)} total posts to {ARCHIVE_DIR} ({len(rewritten)} shards rewritten).[/bold green]")
+
+        # Save the new last fetch timestamp once the whole run has been committed
+        if current_max_timestamp > last_fetch_timestamp:
             _save_last_fetch_timestamp(current_max_timestamp)
             console.print(f"[bold green]Timestamp du dernier fetch mis à jour à {datetime.fromtimestamp(current_max_timestamp).strftime('%Y-%m-%d %H:%M:%S')}.[/bold green]")
-
-        if format == "google_sheet":
-            spreadsheet_name = os.getenv("GOOGLE_SHEET_NAME")
-            if not spreadsheet_name:
-                console.print("[bold red]Erreur:[/bold red] GOOGLE_SHEET_NAME n'est pas défini dans .env. Impossible d'exporter vers Google Sheet.", style="bold red")
-                return {"content": [], "count": 0, "format": format}
-            
-            success = export_to_google_sheet(all_posts_data, spreadsheet_name)
+        _clear_fetch_state()
+
+        # Stream the archive once through every requested exporter concurrently. Sinks
+        # that update in place only rewrite the changed positions.
+        positions = (archive.position(permalink) for permalink in changed_permalinks)
+        changed_positions = sorted(position for position in positions if position is not None) # Merged duplicates are gone
+        exports = export_to_sinks(archive.iter_records(), formats, reset=force_fetch, changed=changed_positions, archive=archive)
+        for name, success in exports.items():
             if success:
-                console.print("[bold green]Exportation vers Google Sheet terminée avec succès![/bold green]")
-                return {"content": all_posts_data, "count": len(all_posts_data), "format": format}
+                console.print(f"[bold green]Export {name} terminé avec succès![/bold green]")
             else:
-                console.print("[bold red]Échec de l'exportation vers Google Sheet.[/bold red]")
-                return {"content": [], "count": 0, "format": format}
-        
-        return {"content": all_posts_data, "count": len(all_posts_data), "format": format}
+                console.print(f"[bold red]Échec de l'export {name}.[/bold red]")
+
+        return {"count": len(archive), "format": format, "exports": exports, "changes": changes}
 
     except Exception as e:
         console.print(f"[bold red]Une erreur est survenue lors de la récupération des posts Reddit:[/bold red] {e}", style="bold red")
-        return {"content": [], "count": 0, "format": format}
\ No newline at end of file
+        # Keep whatever was fetched since the last checkpoint so a rerun resumes from here
+        if state and archive is not None and state["seen"] != committed:
+            try:
+                _commit_checkpoint(archive, state)
+                console.print(f"[bold yellow]Progression sauvegardée:[/bold yellow] {state['seen']} éléments traités. Relancez pour reprendre.")
+            except Exception as flush_e:
+                console.print(f"[bold red]Erreur:[/bold red] Impossible de sauvegarder la progression: {flush_e}", style="bold red")
+        return {"count": 0, "format": format}
\ No newline at end of file
@@ -9,6 +9,7 @@ import webbrowser
 from http.server import BaseHTTPRequestHandler, HTTPServer
 from urllib.parse import urlparse, parse_qs
 from reddit_fetch.config import CLIENT_ID, CLIENT_SECRET, REDIRECT_URI, USER_AGENT, TOKEN_FILE
+from reddit_fetch.sessions import get_session
 from rich.console import Console
 from rich.panel import Panel
 from rich.text import Text
@@ -190,8 +191,8 @@ def refresh_access_token_safe():
     }
     
     try:
-        response = requests.post("https://www.reddit.com/api/v1/access_token", 
-                               headers=headers, data=data, timeout=30)
+        response = get_session().post("https://www.reddit.com/api/v1/access_token",
+                                      headers=headers, data=data)
         
         if response.status_code == 200:
             new_token_data = response.json()
@@ -284,7 +285,7 @@ def get_new_tokens():
             "redirect_uri": REDIRECT_URI
         }
         
-        response = requests.post(url, headers=headers, data=data, timeout=30)
+        response = get_session().post(url, headers=headers, data=data)
         
         if response.status_code == 200:
             tokens = response.json()
@@ -0,0 +1,182 @@
+import os
+import json
+import time
+from typing import Iterator
+from reddit_fetch.config import CHANGELOG_RETAIN_SEGMENTS, CHANGELOG_SEGMENT_EVENTS
+from reddit_fetch.storage import ARCHIVE_DIR, write_json_atomic
+
+CHANGELOG_DIR = f"{ARCHIVE_DIR}changes/"
+CHANGE_OPS = ("insert", "update", "unsave", "delete", "restore")
+
+class ChangeLog:
+    """
+    Append-only log of archive mutations, for consumers that only process deltas.
+
+    Every archive commit appends its events (see CHANGE_OPS) with monotonic sequence
+    numbers, one JSON object per line, to segment files named after their first
+    sequence number (<seq>.jsonl). Consumers are registered by name in
+    consumers.json with the last sequence number they acknowledged; once every
+    registered consumer has acknowledged a whole segment, it is deleted. While no
+    consumer is registered, only the newest CHANGELOG_RETAIN_SEGMENTS segments are
+    kept. The newest segment is always kept, so the sequence never restarts.
+
+    Events hold the record's permalink, fullname, shard and content hash, not the
+    record itself: consumers read current content from the archive.
+    """
+
+    def __init__(self, directory: str = CHANGELOG_DIR):
+        self.directory = directory
+        self.consumers_path = os.path.join(directory, "consumers.json")
+        self._last_seq = None
+        self._segment_events = 0
+
+    def segments(self) -> list[tuple[int, str]]:
+        """Returns (first sequence number, path) of every segment, oldest first."""
+        if not os.path.isdir(self.directory):
+            return []
+        segments = []
+        for name in os.listdir(self.directory):
+            stem, ext = os.path.splitext(name)
+            if ext == ".jsonl" and stem.isdigit():
+                segments.append((int(stem), os.path.join(self.directory, name)))
+        return sorted(segments)
+
+    @staticmethod
+    def _read_segment(path: str) -> Iterator[dict]:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    @property
+    def last_seq(self) -> int:
+        """The sequence number of the latest event, 0 for an empty log."""
+        if self._last_seq is None:
+            segments = self.segments()
+            self._last_seq, self._segment_events = 0, 0
+            if segments:
+                first, path = segments[-1]
+                for event in self._read_segment(path):
+                    self._last_seq = event["seq"]
+                    self._segment_events += 1
+                self._last_seq = max(self._last_seq, first - 1)
+        return self._last_seq
+
+    @property
+    def first_seq(self) -> int:
+        """The oldest sequence number still in the log. Earlier events were compacted away."""
+        segments = self.segments()
+        return segments[0][0] if segments else self.last_seq + 1
+
+    def append(self, events: list[dict]) -> int:
+        """
+        Appends events, numbering them and stamping them with the current time.
+
+        Returns:
+            The sequence number of the last event.
+        """
+        seq = self.last_seq
+        if not events:
+            return seq
+        os.makedirs(self.directory, exist_ok=True)
+        now = time.time()
+        segments = self.segments()
+        if not segments or self._segment_events >= CHANGELOG_SEGMENT_EVENTS:
+            path, self._segment_events = os.path.join(self.directory, f"{seq + 1:012d}.jsonl"), 0
+        else:
+            path = segments[-1][1]
+        with open(path, "a", encoding="utf-8") as f:
+            for event in events:
+                seq += 1
+                f.write(json.dumps({"seq": seq, "at": now, **event}, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._segment_events += len(events)
+        self._last_seq = seq
+        self.compact()
+        return seq
+
+    def read(self, since: int = 0, limit: int = None) -> Iterator[dict]:
+        """Yields the events after sequence number since, oldest first. Skips whole segments before it."""
+        segments = self.segments()
+        count = 0
+        for position, (first, path) in enumerate(segments):
+            next_first = segments[position + 1][0] if position + 1 < len(segments) else None
+            if next_first is not None and next_first <= since + 1:
+                continue
+            for event in self._read_segment(path):
+                if event["seq"] <= since:
+                    continue
+                if limit is not None and count >= limit:
+                    return
+                count += 1
+                yield event
+
+    def consumers(self) -> dict[str, int]:
+        """Returns every registered consumer with the last sequence number it acknowledged."""
+        if not os.path.exists(self.consumers_path):
+            return {}
+        with open(self.consumers_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def register(self, name: str, since: int = None) -> int:
+        """
+        Registers a consumer, by default at the head of the log: it is expected to
+        read the archive itself once, then follow the changes. Registering again
+        keeps the consumer's acknowledgement. Returns it.
+        """
+        consumers = self.consumers()
+        if name not in consumers:
+            consumers[name] = self.last_seq if since is None else since
+            write_json_atomic(self.consumers_path, consumers)
+        return consumers[name]
+
+    def unregister(self, name: str) -> bool:
+        consumers = self.consumers()
+        if consumers.pop(name, None) is None:
+            return False
+        write_json_atomic(self.consumers_path, consumers)
+        self.compact()
+        return True
+
+    def pending(self, name: str, limit: int = None) -> Iterator[dict]:
+        """Yields the events a registered consumer has not acknowledged yet."""
+        consumers = self.consumers()
+        if name not in consumers:
+            raise KeyError(f"unknown consumer '{name}'")
+        return self.read(since=consumers[name], limit=limit)
+
+    def ack(self, name: str, seq: int):
+        """Records that a consumer processed every event up to seq, then compacts."""
+        consumers = self.consumers()
+        if name not in consumers:
+            raise KeyError(f"unknown consumer '{name}'")
+        if seq > consumers[name]:
+            consumers[name] = min(seq, self.last_seq)
+            write_json_atomic(self.consumers_path, consumers)
+            self.compact()
+
+    def compact(self) -> int:
+        """
+        Deletes the segments every registered consumer has fully acknowledged.
+
+        While no consumer is registered, the oldest segments beyond the newest
+        CHANGELOG_RETAIN_SEGMENTS are deleted instead.
+
+        Returns:
+            The number of bytes reclaimed.
+        """
+        consumers = self.consumers()
+        segments = self.segments()
+        if consumers:
+            acknowledged = min(consumers.values())
+        else:
+            retained = segments[-max(CHANGELOG_RETAIN_SEGMENTS, 1):]
+            acknowledged = retained[0][0] - 1 if retained else 0
+        reclaimed = 0
+        for (first, path), (next_first, _) in zip(segments, segments[1:]):
+            if next_first - 1 > acknowledged:
+                break
+            reclaimed += os.path.getsize(path)
+            os.remove(path)
+        return reclaimed
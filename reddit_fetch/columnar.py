@@ -0,0 +1,238 @@
+import os
+import json
+import shutil
+import hashlib
+from datetime import datetime, timezone
+from typing import Iterable
+from rich.console import Console
+from reddit_fetch.comments import comment_rows
+from reddit_fetch.config import DATA_DIR, PARQUET_ROW_GROUP_SIZE
+from reddit_fetch.records import record_fullname, record_hash, record_type
+from reddit_fetch.storage import shard_key, write_json_atomic
+
+console = Console()
+
+PARQUET_DIR = f"{DATA_DIR}parquet/"
+PARQUET_MANIFEST = f"{PARQUET_DIR}_manifest.json"
+
+def _require_pyarrow():
+    """Imports pyarrow lazily so the other output formats work without it."""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        console.print("[bold red]Erreur:[/bold red] Le format parquet nécessite pyarrow. Installez-le avec: pip install pyarrow", style="bold red")
+        return None
+    return pyarrow
+
+def _posts_schema(pa):
+    # Comment text lives in its own table so scans of the posts table never read it
+    return pa.schema([
+        ('fullname', pa.string()),
+        ('type', pa.string()),
+        ('title', pa.string()),
+        ('score', pa.int64()),
+        ('subreddit', pa.string()),
+        ('permalink', pa.string()),
+        ('url', pa.string()),
+        ('date_saved', pa.timestamp('s', tz='UTC')),
+        ('selftext', pa.string()),
+        ('num_comments', pa.int64()),
+    ])
+
+def _comments_schema(pa):
+    return pa.schema([
+        ('post_fullname', pa.string()),
+        ('position', pa.int32()),
+        ('author', pa.string()),
+        ('score', pa.int64()),
+        ('body', pa.string()),
+    ])
+
+def _to_int(value):
+    return value if isinstance(value, int) and not isinstance(value, bool) else None
+
+def _to_timestamp(value):
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value, tz=timezone.utc)
+    return None
+
+def _load_manifest() -> dict:
+    if os.path.exists(PARQUET_MANIFEST):
+        try:
+            with open(PARQUET_MANIFEST, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            if "months" in manifest:
+                return manifest
+        except (IOError, ValueError):
+            console.print("[bold yellow]Avertissement:[/bold yellow] Manifeste parquet illisible. Le dataset sera reconstruit.")
+    return None
+
+def _post_row(post: dict, fullname: str) -> dict:
+    return {
+        'fullname': fullname,
+        'type': record_type(post),
+        'title': post.get('title'),
+        'score': _to_int(post.get('score')),
+        'subreddit': post.get('subreddit'),
+        'permalink': post.get('permalink'),
+        'url': post.get('url'),
+        'date_saved': _to_timestamp(post.get('date_saved')),
+        'selftext': post.get('selftext'),
+        'num_comments': _to_int(post.get('num_comments')),
+    }
+
+def _comment_rows(post: dict, fullname: str) -> list[dict]:
+    return [
+        {
+            'post_fullname': fullname,
+            'position': position,
+            'author': author,
+            'score': _to_int(score),
+            'body': body,
+        }
+        for position, (author, body, score) in enumerate(comment_rows(post.get('comments')))
+    ]
+
+class _RowGroupWriter:
+    """Buffers rows for one table and writes them as row groups of a single part file."""
+
+    def __init__(self, pa, path, schema, row_group_size):
+        self.pa = pa
+        self.path = path
+        self.tmp_path = f"{path}.tmp"
+        self.schema = schema
+        self.row_group_size = row_group_size
+        self.columns = {name: [] for name in schema.names}
+        self.buffered = 0
+        self.rows = 0
+        self.writer = None
+
+    def append(self, row: dict):
+        for name in self.schema.names:
+            self.columns[name].append(row[name])
+        self.buffered += 1
+        if self.buffered >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        if not self.buffered:
+            return
+        if self.writer is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.writer = self.pa.parquet.ParquetWriter(self.tmp_path, self.schema, compression='zstd')
+        table = self.pa.Table.from_pydict(self.columns, schema=self.schema)
+        self.writer.write_table(table, row_group_size=self.row_group_size)
+        self.rows += self.buffered
+        self.columns = {name: [] for name in self.schema.names}
+        self.buffered = 0
+
+    def close(self) -> bool:
+        """Finishes the part file. Returns False if no row was ever written."""
+        self.flush()
+        if self.writer is None:
+            return False
+        self.writer.close()
+        os.replace(self.tmp_path, self.path)
+        return True
+
+    def abort(self):
+        if self.writer is not None:
+            self.writer.close()
+            os.remove(self.tmp_path)
+
+class _MonthBuffer:
+    """Rows of one archive month, with a digest of the records they came from."""
+
+    def __init__(self, month: str):
+        self.month = month
+        self.posts = []
+        self.comments = []
+        self.digest = hashlib.sha256()
+
+    def add(self, post: dict):
+        fullname = record_fullname(post)
+        self.posts.append(_post_row(post, fullname))
+        self.comments.extend(_comment_rows(post, fullname))
+        self.digest.update(f"{post.get('permalink')}:{record_hash(post)}\n".encode("utf-8"))
+
+def _write_month(pa, buffer: _MonthBuffer):
+    """Rewrites the posts and comments partitions of one month."""
+    for table, rows, schema in (("posts", buffer.posts, _posts_schema(pa)), ("comments", buffer.comments, _comments_schema(pa))):
+        partition = f"{PARQUET_DIR}{table}/month={buffer.month}/"
+        writer = _RowGroupWriter(pa, f"{partition}part-0.parquet", schema, PARQUET_ROW_GROUP_SIZE)
+        try:
+            for row in rows:
+                writer.append(row)
+        except Exception:
+            writer.abort()
+            raise
+        if not writer.close() and os.path.exists(f"{partition}part-0.parquet"):
+            os.remove(f"{partition}part-0.parquet") # The month lost all its comments
+
+def export_to_parquet(posts_data: Iterable[dict], reset: bool = False) -> bool:
+    """
+    Exports archive records to the Parquet dataset under data/parquet/.
+
+    The dataset is Hive-partitioned by saved month, like the archive shards:
+    posts/month=YYYY-MM/ and comments/month=YYYY-MM/. The manifest keeps a digest of
+    the records behind each month, and a month's partition files are only rewritten
+    when that digest changes, so older partitions stay untouched across syncs.
+
+    Args:
+        posts_data: Archive records in archive order, e.g. the content returned by
+                    fetch_saved_posts. Records of one month must be contiguous, as
+                    the sharded archive yields them. Any iterable works; it is
+                    consumed once.
+        reset: If True (force fetch), drops the existing dataset and rewrites it.
+
+    Returns:
+        True if the export was successful, False otherwise.
+    """
+    pa = _require_pyarrow()
+    if pa is None:
+        return False
+
+    manifest = None if reset else _load_manifest()
+    if manifest is None:
+        # Forced rebuild, or a dataset written before month partitioning
+        if os.path.exists(PARQUET_DIR):
+            shutil.rmtree(PARQUET_DIR)
+        manifest = {"version": 2, "months": {}}
+
+    done = set()
+    rewritten = []
+    written = 0
+
+    def finish(buffer):
+        nonlocal written
+        digest = buffer.digest.hexdigest()
+        if manifest["months"].get(buffer.month) != digest:
+            _write_month(pa, buffer)
+            written += len(buffer.posts)
+            manifest["months"][buffer.month] = digest
+            rewritten.append(buffer.month)
+        done.add(buffer.month)
+
+    buffer = None
+    try:
+        for post in posts_data:
+            month = shard_key(post)
+            if buffer is None or month != buffer.month:
+                if buffer is not None:
+                    finish(buffer)
+                if month in done:
+                    raise ValueError(f"records of month {month} are not contiguous")
+                buffer = _MonthBuffer(month)
+            buffer.add(post)
+        if buffer is not None:
+            finish(buffer)
+    except Exception as e:
+        console.print(f"[bold red]Erreur lors de l'export parquet:[/bold red] {e}", style="bold red")
+        return False
+    finally:
+        # Months finished before a failure are recorded so they are not rewritten again
+        write_json_atomic(PARQUET_MANIFEST, manifest)
+
+    console.print(f"[bold green]Succès:[/bold green] {len(rewritten)} mois réécrits ({written} posts) dans le dataset parquet {PARQUET_DIR}.")
+    return True
@@ -0,0 +1,120 @@
+from array import array
+from typing import Iterable, Iterator
+
+# A comment row as exporters consume it: (author, body, score)
+CommentRow = tuple[str, str, int]
+
+class CommentForest:
+    """
+    Compact, array-backed comment tree of one post.
+
+    A hydrated PRAW tree keeps one Comment object per comment, each with its own
+    attribute dictionary and Reddit reference. Here a comment is a slot in a few
+    typed arrays: its parent's index (-1 for top-level comments), depth and score,
+    the index of its author in a table of distinct names, and the offsets of its
+    UTF-8 body in a single packed buffer. Comments are kept in the order PRAW's
+    CommentForest.list() yields them (breadth-first), so parents precede children.
+
+    Exporters read it through rows() without building a dictionary per comment;
+    iterating yields CommentRecord dictionaries for code that expects the archive
+    format, and to_list() returns that format for JSON encoding.
+    """
+
+    __slots__ = ("parents", "depths", "scores", "author_ids", "offsets", "text", "authors", "_author_ids")
+
+    def __init__(self, comments: Iterable[dict] = ()):
+        self.parents = array("i")
+        self.depths = array("H")
+        self.scores = array("q")
+        self.author_ids = array("I")
+        self.offsets = array("Q", [0])
+        self.text = bytearray()
+        self.authors = []
+        self._author_ids = {}
+        for comment in comments:
+            self.append(comment.get('author'), comment.get('body'), comment.get('score'))
+
+    @classmethod
+    def from_praw(cls, forest) -> "CommentForest":
+        """
+        Converts a hydrated PRAW CommentForest, reading only each comment's listing data.
+
+        MoreComments placeholders left by replace_more(limit=0) are skipped.
+        """
+        compact = cls()
+        positions = {} # Comment fullname -> index, to resolve parent_id
+        for comment in forest.list():
+            if not hasattr(comment, "body"):
+                continue # MoreComments
+            author = comment.author.name if comment.author else '[deleted]'
+            parent = positions.get(getattr(comment, "parent_id", None), -1)
+            positions[f"t1_{comment.id}"] = compact.append(author, comment.body, comment.score, parent)
+        return compact
+
+    def append(self, author: str, body: str, score: int, parent: int = -1) -> int:
+        """Adds a comment under the comment at index parent (-1 for top level). Returns its index."""
+        author_id = self._author_ids.get(author)
+        if author_id is None:
+            author_id = self._author_ids[author] = len(self.authors)
+            self.authors.append(author)
+        self.parents.append(parent)
+        self.depths.append(self.depths[parent] + 1 if parent >= 0 else 0)
+        self.scores.append(score if isinstance(score, int) else 0)
+        self.author_ids.append(author_id)
+        self.text += (body or "").encode("utf-8")
+        self.offsets.append(len(self.text))
+        return len(self.parents) - 1
+
+    def __len__(self) -> int:
+        return len(self.parents)
+
+    def body(self, index: int) -> str:
+        return self.text[self.offsets[index]:self.offsets[index + 1]].decode("utf-8")
+
+    def author(self, index: int) -> str:
+        return self.authors[self.author_ids[index]]
+
+    def rows(self) -> Iterator[CommentRow]:
+        """Yields (author, body, score) for every comment, in order."""
+        authors, text, offsets = self.authors, self.text, self.offsets
+        for index, (author_id, score) in enumerate(zip(self.author_ids, self.scores)):
+            yield authors[author_id], text[offsets[index]:offsets[index + 1]].decode("utf-8"), score
+
+    def __getitem__(self, index: int) -> dict:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("comment index out of range")
+        return {'author': self.author(index), 'body': self.body(index), 'score': self.scores[index]}
+
+    def __iter__(self) -> Iterator[dict]:
+        for author, body, score in self.rows():
+            yield {'author': author, 'body': body, 'score': score}
+
+    def to_list(self) -> list[dict]:
+        """Returns the comments in the archive's JSON format."""
+        return list(self)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, CommentForest):
+            return list(self.rows()) == list(other.rows()) and self.parents == other.parents
+        if isinstance(other, list):
+            return self.to_list() == other
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"CommentForest({len(self)} comments, {len(self.text)} bytes of text)"
+
+def comment_rows(comments) -> Iterator[CommentRow]:
+    """Yields (author, body, score) from a CommentForest or an archived list of comment dictionaries."""
+    if isinstance(comments, CommentForest):
+        yield from comments.rows()
+        return
+    for comment in comments or ():
+        yield comment.get('author'), comment.get('body'), comment.get('score')
+
+def json_default(value):
+    """json.dumps default hook: encodes CommentForest values in the archive format."""
+    if isinstance(value, CommentForest):
+        return value.to_list()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
@@ -11,13 +11,92 @@ CLIENT_SECRET = os.getenv("CLIENT_SECRET")
 REDIRECT_URI = os.getenv("REDIRECT_URI")  # Must match the Reddit App settings
 USER_AGENT = os.getenv("USER_AGENT")  # Fetch dynamically
 REDDIT_USERNAME = os.getenv("REDDIT_USERNAME")  # Fetch dynamically
-TOKEN_FILE = "/data/tokens.json" if os.getenv("DOCKER", "0") == "1" else "tokens.json"
+TOKEN_FILE = os.getenv("TOKEN_FILE") or ("/data/tokens.json" if os.getenv("DOCKER", "0") == "1" else "tokens.json")
+
+# Local storage. Multi-account runs point each worker process at data/<account>/
+DATA_DIR = os.path.join(os.getenv("REDDIT_FETCH_DATA_DIR", "data"), "")
+
+# Client-side cap on Reddit API requests per minute (0 leaves pacing to PRAW)
+REDDIT_MAX_RPM = float(os.getenv("REDDIT_MAX_RPM", "0"))
 
 # Google Sheets API credentials
 # IMPORTANT: Replace with the actual path to your service account key JSON file
 GOOGLE_SERVICE_ACCOUNT_KEY_PATH = os.getenv("GOOGLE_SERVICE_ACCOUNT_KEY_PATH")
-print(f"DEBUG: GOOGLE_SERVICE_ACCOUNT_KEY_PATH = {GOOGLE_SERVICE_ACCOUNT_KEY_PATH}")
 GOOGLE_SHEET_NAME = os.getenv("GOOGLE_SHEET_NAME", "Reddit Saved Posts") # Default name if not set
+# 'single' writes everything to the first worksheet; 'year' or 'subreddit' spreads
+# rows over one worksheet per key, written by GOOGLE_SHEET_WORKERS threads
+GOOGLE_SHEET_LAYOUT = os.getenv("GOOGLE_SHEET_LAYOUT", "single").lower()
+GOOGLE_SHEET_WORKERS = int(os.getenv("GOOGLE_SHEET_WORKERS", "4"))
+
+# Shared HTTP connection pool (Reddit OAuth, PRAW and Google Sheets)
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "10"))
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "10"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "30"))
+
+# On-disk cache of Reddit API responses: entries younger than HTTP_CACHE_TTL seconds
+# are served without a request, older ones are revalidated when Reddit sent validators
+HTTP_CACHE = os.getenv("HTTP_CACHE", "1").lower() in ["1", "true", "yes"]
+HTTP_CACHE_TTL = float(os.getenv("HTTP_CACHE_TTL", "300"))
+HTTP_CACHE_MAX_BYTES = int(os.getenv("HTTP_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+# Cache of external pages fetched for link snapshots (data/link_cache/)
+LINK_CACHE_MAX_BYTES = int(os.getenv("LINK_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Multi-account runs
+ACCOUNTS_FILE = os.getenv("ACCOUNTS_FILE", "accounts.json")
+ACCOUNTS_PARALLELISM = int(os.getenv("ACCOUNTS_PARALLELISM", "4"))
+
+# Fetch checkpointing: progress is committed every CHECKPOINT_EVERY items or
+# every CHECKPOINT_INTERVAL seconds, whichever comes first
+CHECKPOINT_EVERY = int(os.getenv("CHECKPOINT_EVERY", "25"))
+CHECKPOINT_INTERVAL = float(os.getenv("CHECKPOINT_INTERVAL", "60"))
+
+# Export fan-out: records buffered per sink before the producer blocks
+SINK_QUEUE_SIZE = int(os.getenv("SINK_QUEUE_SIZE", "1000"))
+
+# JSON/HTML encoding: records are encoded in chunks of EXPORT_CHUNK_RECORDS by a pool
+# of EXPORT_WORKERS processes once there are at least two chunks (1 encodes in-process)
+EXPORT_WORKERS = int(os.getenv("EXPORT_WORKERS", str(min(os.cpu_count() or 1, 4))))
+EXPORT_CHUNK_RECORDS = int(os.getenv("EXPORT_CHUNK_RECORDS", "500"))
+
+# Parquet export: rows buffered per row group
+PARQUET_ROW_GROUP_SIZE = int(os.getenv("PARQUET_ROW_GROUP_SIZE", "10000"))
+
+# Near-duplicate detection of newly archived posts: 'off', 'flag' (mark duplicate_of)
+# or 'merge' (fold duplicates into their cluster's first post). Requires numpy.
+DEDUP = os.getenv("DEDUP", "off").lower()
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.8"))
+
+# External link snapshots: pages linked by new posts are stored in data/blobs/
+SNAPSHOT_LINKS = os.getenv("SNAPSHOT_LINKS", "0").lower() in ["1", "true", "yes"]
+SNAPSHOT_WORKERS = int(os.getenv("SNAPSHOT_WORKERS", "8"))
+SNAPSHOT_DOMAIN_DELAY = float(os.getenv("SNAPSHOT_DOMAIN_DELAY", "1"))
+SNAPSHOT_MAX_BYTES = int(os.getenv("SNAPSHOT_MAX_BYTES", str(10 * 1024 * 1024)))
+SNAPSHOT_RETRIES = int(os.getenv("SNAPSHOT_RETRIES", "3"))
+
+# Change log of archive mutations (data/changes/): events per segment file, and the
+# number of newest segments kept while no consumer is registered
+CHANGELOG_SEGMENT_EVENTS = int(os.getenv("CHANGELOG_SEGMENT_EVENTS", "10000"))
+CHANGELOG_RETAIN_SEGMENTS = int(os.getenv("CHANGELOG_RETAIN_SEGMENTS", "10"))
+
+# Garbage collection (reddit-fetcher gc): cache entries unused for CACHE_MAX_AGE seconds
+# are dropped, and a pass stops after GC_TIME_BUDGET seconds, resuming on the next run.
+# GC_INTERVAL > 0 also runs a pass every GC_INTERVAL seconds while serving.
+CACHE_MAX_AGE = float(os.getenv("CACHE_MAX_AGE", str(7 * 24 * 3600)))
+GC_TIME_BUDGET = float(os.getenv("GC_TIME_BUDGET", "30"))
+GC_INTERVAL = float(os.getenv("GC_INTERVAL", "0"))
+
+# Read API server (reddit-fetcher serve): records of recently read shards are kept
+# in memory, up to SERVE_CACHE_RECORDS
+SERVE_HOST = os.getenv("SERVE_HOST", "127.0.0.1")
+SERVE_PORT = int(os.getenv("SERVE_PORT", "8765"))
+SERVE_CACHE_RECORDS = int(os.getenv("SERVE_CACHE_RECORDS", "20000"))
+SERVE_PAGE_SIZE = int(os.getenv("SERVE_PAGE_SIZE", "100"))
+
+# Profiling (--profile): stack samples every PROFILE_INTERVAL seconds and allocation
+# tracebacks of PROFILE_TRACEMALLOC_FRAMES frames, reported in data/
+PROFILE = os.getenv("REDDIT_FETCH_PROFILE", "0").lower() in ["1", "true", "yes"]
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))
+PROFILE_TRACEMALLOC_FRAMES = int(os.getenv("PROFILE_TRACEMALLOC_FRAMES", "8"))
 
 def exponential_backoff(attempt, base_delay=1.0, max_delay=16.0):
     """Implements exponential backoff to avoid rate limiting."""
@@ -0,0 +1,247 @@
+import os
+import re
+import time
+import zlib
+from itertools import chain
+from rich.console import Console
+from reddit_fetch.config import DATA_DIR, DEDUP_THRESHOLD
+
+console = Console()
+
+DEDUP_INDEX_FILE = f"{DATA_DIR}dedup_index.npz"
+DEDUP_MODES = ("off", "flag", "merge")
+
+NUM_PERM = 128 # MinHash permutations per signature
+BANDS = 16 # LSH bands of NUM_PERM // BANDS rows: pairs above ~0.7 Jaccard collide in some band
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3 # Words per shingle
+BATCH_SHINGLES = 50000 # Shingles hashed per NumPy batch, bounding memory to ~50 MB
+_PRIME = 4294967311 # Smallest prime above 2**32
+
+_WORD = re.compile(r"\w+")
+_permutations = None
+
+def _require_numpy():
+    """Imports numpy lazily so fetching works without it."""
+    try:
+        import numpy
+    except ImportError:
+        console.print("[bold red]Erreur:[/bold red] La détection de doublons nécessite numpy. Installez-le avec: pip install numpy", style="bold red")
+        return None
+    return numpy
+
+def _normalize_url(url) -> str:
+    url = str(url or '').strip().lower().split('#', 1)[0]
+    url = re.sub(r"^https?://(www\.|old\.|np\.)?", "", url)
+    return url.rstrip('/')
+
+def shingles(post: dict) -> list[int]:
+    """
+    Returns the CRC32 hashes of a record's shingles: lowercase word 3-grams of its
+    title and selftext, plus its link when that points anywhere but the post itself.
+    """
+    words = _WORD.findall(f"{post.get('title', '')} {post.get('selftext', '')}".lower())
+    grams = {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(max(len(words) - SHINGLE_SIZE + 1, 1))} if words else set()
+    url = _normalize_url(post.get('url'))
+    if url and url != _normalize_url(post.get('permalink')):
+        grams.add(f"url:{url}")
+    if not grams:
+        grams.add(f"permalink:{post.get('permalink', '')}")
+    return [zlib.crc32(gram.encode("utf-8")) for gram in grams]
+
+def _get_permutations(np):
+    global _permutations
+    if _permutations is None:
+        # Fixed seed: signatures stored in the index must stay comparable across runs
+        rng = np.random.RandomState(0x5eed)
+        _permutations = (
+            rng.randint(1, 2**32 - 1, size=NUM_PERM, dtype=np.uint64), # a, b < 2**32 keep a*x+b below 2**64
+            rng.randint(0, 2**32 - 1, size=NUM_PERM, dtype=np.uint64),
+            rng.randint(1, 2**63 - 1, size=ROWS, dtype=np.uint64) | np.uint64(1), # Odd band multipliers
+        )
+    return _permutations
+
+def minhash_signatures(np, shingle_lists: list[list[int]]):
+    """
+    Computes MinHash signatures for many records at once.
+
+    Shingles of a batch of records are concatenated into one array, hashed by every
+    permutation as a single (shingles x NUM_PERM) matrix operation, and reduced per
+    record with np.minimum.reduceat.
+
+    Returns:
+        A (len(shingle_lists), NUM_PERM) uint32 array.
+    """
+    a, b, _ = _get_permutations(np)
+    signatures = np.empty((len(shingle_lists), NUM_PERM), dtype=np.uint32)
+    start = 0
+    while start < len(shingle_lists):
+        end, total = start, 0
+        while end < len(shingle_lists) and (end == start or total + len(shingle_lists[end]) <= BATCH_SHINGLES):
+            total += len(shingle_lists[end])
+            end += 1
+        lengths = np.fromiter((len(values) for values in shingle_lists[start:end]), dtype=np.int64, count=end - start)
+        values = np.fromiter(chain.from_iterable(shingle_lists[start:end]), dtype=np.uint64, count=total)
+        hashed = (values[:, None] * a + b) % np.uint64(_PRIME)
+        offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        signatures[start:end] = np.minimum(np.minimum.reduceat(hashed, offsets, axis=0), np.uint64(2**32 - 1))
+        start = end
+    return signatures
+
+def band_keys(np, signatures):
+    """Folds each LSH band of every signature into one uint64 key. Returns a (n, BANDS) array."""
+    multipliers = _get_permutations(np)[2]
+    view = signatures.reshape(len(signatures), BANDS, ROWS).astype(np.uint64)
+    return (view * multipliers).sum(axis=2, dtype=np.uint64) # Wraps modulo 2**64
+
+class DedupIndex:
+    """
+    Persistent MinHash/LSH index of every archived record.
+
+    Stored in data/dedup_index.npz as the indexed permalinks, their signatures and
+    the position of each record's cluster root (its earliest indexed member). Band
+    keys are sorted per band on load, so new records are matched against the whole
+    index with one np.searchsorted per band rather than compared to every record.
+    """
+
+    def __init__(self, np, path: str = DEDUP_INDEX_FILE):
+        self.np = np
+        self.path = path
+        if os.path.exists(path):
+            with np.load(path) as data:
+                self.permalinks = data["permalinks"].tolist()
+                self.signatures = data["signatures"]
+                self.roots = data["roots"]
+        else:
+            self.permalinks = []
+            self.signatures = np.empty((0, NUM_PERM), dtype=np.uint32)
+            self.roots = np.empty(0, dtype=np.int64)
+        self.positions = {permalink: position for position, permalink in enumerate(self.permalinks)}
+
+    def __len__(self) -> int:
+        return len(self.permalinks)
+
+    def _candidates(self, keys) -> list[set]:
+        """Returns, for each row of band keys, the indexed positions sharing at least one band."""
+        np = self.np
+        candidates = [set() for _ in range(len(keys))]
+        if not len(self.permalinks):
+            return candidates
+        indexed = band_keys(np, self.signatures)
+        order = np.argsort(indexed, axis=0, kind="stable")
+        sorted_keys = np.take_along_axis(indexed, order, axis=0)
+        for band in range(BANDS):
+            low = np.searchsorted(sorted_keys[:, band], keys[:, band], side="left")
+            high = np.searchsorted(sorted_keys[:, band], keys[:, band], side="right")
+            for row in np.nonzero(high > low)[0]:
+                candidates[row].update(order[low[row]:high[row], band].tolist())
+        return candidates
+
+    def add(self, permalinks: list[str], signatures, threshold: float = DEDUP_THRESHOLD) -> dict[str, str]:
+        """
+        Indexes records and assigns each one to a cluster.
+
+        A record joins the cluster of its most similar candidate when their estimated
+        Jaccard similarity (share of equal signature slots) reaches threshold, and
+        starts its own cluster otherwise. Records already indexed keep their cluster.
+
+        Returns:
+            A dictionary mapping each permalink to its cluster root's permalink.
+        """
+        np = self.np
+        fresh, seen = [], set(self.positions)
+        for row, permalink in enumerate(permalinks):
+            if permalink not in seen:
+                fresh.append(row)
+                seen.add(permalink)
+        keys = band_keys(np, signatures[fresh]) if fresh else None
+        candidates = self._candidates(keys) if fresh else []
+
+        base = len(self.permalinks)
+        self.signatures = np.concatenate([self.signatures, signatures[fresh]])
+        roots = np.concatenate([self.roots, np.arange(base, base + len(fresh), dtype=np.int64)])
+        buckets = {} # (band, key) -> positions of earlier records from this batch
+        for offset, row in enumerate(fresh):
+            position = base + offset
+            batch_keys = [(band, int(keys[offset, band])) for band in range(BANDS)]
+            matches = candidates[offset].union(*(buckets.get(key, ()) for key in batch_keys))
+            if matches:
+                matches = np.fromiter(matches, dtype=np.int64, count=len(matches))
+                similarity = (self.signatures[matches] == self.signatures[position]).mean(axis=1)
+                best = int(np.argmax(similarity))
+                if similarity[best] >= threshold:
+                    roots[position] = roots[matches[best]]
+            for key in batch_keys:
+                buckets.setdefault(key, []).append(position)
+            self.permalinks.append(permalinks[row])
+            self.positions[permalinks[row]] = position
+        self.roots = roots
+        return {permalink: self.permalinks[self.roots[self.positions[permalink]]] for permalink in permalinks}
+
+    def save(self):
+        """Writes the index to a temporary file and atomically renames it."""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            self.np.savez(f, permalinks=self.np.array(self.permalinks, dtype=str), signatures=self.signatures, roots=self.roots)
+        os.replace(tmp_path, self.path)
+
+def dedupe_archive(archive, permalinks: list[str], mode: str, threshold: float = DEDUP_THRESHOLD, path: str = DEDUP_INDEX_FILE):
+    """
+    Clusters newly archived records with their near-duplicates.
+
+    Only the given records are signed and looked up in the index; the first run
+    indexes the whole archive. In 'flag' mode every non-root member gets a
+    'duplicate_of' field holding its cluster root's permalink. In 'merge' mode it is
+    removed from the archive and listed in the root's 'duplicates' instead; the index
+    remembers it, so a force fetch merges it again rather than re-adding it.
+
+    Args:
+        archive: The open ShardedArchive. Touched shards are left dirty for its commit.
+        permalinks: Records added since the last run.
+        mode: 'flag' or 'merge'.
+
+    Returns:
+        A dictionary of 'flagged' and 'merged' counts, or None if numpy is missing or
+        the mode is unknown.
+    """
+    if mode not in DEDUP_MODES[1:]:
+        console.print(f"[bold red]Erreur:[/bold red] DEDUP '{mode}' inconnu. Choisissez parmi: {', '.join(DEDUP_MODES)}", style="bold red")
+        return None
+    np = _require_numpy()
+    if np is None:
+        return None
+
+    started = time.perf_counter()
+    index = DedupIndex(np, path)
+    if not len(index):
+        posts = list(archive.iter_records())
+    else:
+        posts = [post for post in (archive.get(permalink) for permalink in permalinks) if post is not None]
+    counts = {"flagged": 0, "merged": 0}
+    if not posts:
+        return counts
+
+    signatures = minhash_signatures(np, [shingles(post) for post in posts])
+    roots = index.add([post['permalink'] for post in posts], signatures, threshold)
+    for permalink in [post['permalink'] for post in posts]:
+        root = roots[permalink]
+        if root == permalink:
+            continue
+        post = archive.get(permalink) # The copy iter_records() yielded is not kept by the archive
+        if mode == "merge" and root in archive:
+            root_post = archive.get(root)
+            duplicates = root_post.setdefault('duplicates', [])
+            if post['permalink'] not in duplicates:
+                duplicates.append(post['permalink'])
+            archive.touch(root)
+            archive.remove(post['permalink'])
+            counts["merged"] += 1
+        elif post.get('duplicate_of') != root:
+            post['duplicate_of'] = root
+            archive.touch(post['permalink'])
+            counts["flagged"] += 1
+    index.save()
+
+    console.print(f"[bold blue]Doublons: {len(posts)} posts comparés à un index de {len(index)} en {time.perf_counter() - started:.2f}s.[/bold blue]")
+    return counts
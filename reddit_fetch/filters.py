@@ -0,0 +1,107 @@
+import os
+from datetime import datetime, timezone
+import praw
+
+HYDRATION_POLICIES = ("all", "top", "none")
+ITEM_TYPES = ("post", "comment")
+
+def _split(value):
+    return {part.strip().lower() for part in (value or "").split(",") if part.strip()}
+
+def _parse_date(value):
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        date = datetime.fromisoformat(value)
+        # Dates without an offset are UTC; explicit offsets are honoured
+        if date.tzinfo is None:
+            date = date.replace(tzinfo=timezone.utc)
+        return date.timestamp()
+
+def parse_hydration(value: str, default: str = "all"):
+    """
+    Parses a comment hydration policy such as 'none,python:all,askhistorians:top'.
+
+    A bare policy sets the default; 'subreddit:policy' entries override it per
+    subreddit. Policies are 'all' (expand every MoreComments), 'top' (only the
+    comments returned with the first page) and 'none' (no comment request at all).
+
+    Raises:
+        ValueError: If a policy name is unknown.
+    """
+    per_subreddit = {}
+    for entry in _split(value):
+        subreddit, _, policy = entry.rpartition(":")
+        if policy not in HYDRATION_POLICIES:
+            raise ValueError(f"Unknown comment hydration policy '{policy}'. Choose from: {', '.join(HYDRATION_POLICIES)}")
+        if subreddit:
+            per_subreddit[subreddit] = policy
+        else:
+            default = policy
+    return default, per_subreddit
+
+class FetchFilters:
+    """
+    Selects which saved items are archived, using listing data only.
+
+    Everything accepts() looks at (type, subreddit, score, created_utc) arrives with
+    the saved listing page, so rejected items cost no request beyond that page.
+    """
+
+    def __init__(self, subreddits=None, exclude_subreddits=None, saved_since=None, types=None, min_score=None, hydration="all"):
+        self.subreddits = {name.lower() for name in subreddits} if subreddits else None
+        self.exclude_subreddits = {name.lower() for name in exclude_subreddits or ()}
+        self.saved_since = saved_since
+        self.types = {name.lower() for name in types} if types else None
+        unknown = sorted((self.types or set()) - set(ITEM_TYPES))
+        if unknown:
+            raise ValueError(f"FILTER_TYPES '{', '.join(unknown)}' inconnu. Choisissez parmi: {', '.join(ITEM_TYPES)}")
+        self.min_score = min_score
+        self.default_hydration, self.hydration = parse_hydration(hydration)
+
+    @classmethod
+    def from_env(cls):
+        """
+        Builds filters from FILTER_SUBREDDITS, FILTER_EXCLUDE_SUBREDDITS,
+        FILTER_SAVED_SINCE (ISO date or Unix timestamp), FILTER_TYPES ('post',
+        'comment'), FILTER_MIN_SCORE and HYDRATE_COMMENTS.
+
+        Raises:
+            ValueError: If FILTER_TYPES or HYDRATE_COMMENTS holds an unknown value.
+        """
+        min_score = os.getenv("FILTER_MIN_SCORE")
+        return cls(
+            subreddits=_split(os.getenv("FILTER_SUBREDDITS")),
+            exclude_subreddits=_split(os.getenv("FILTER_EXCLUDE_SUBREDDITS")),
+            saved_since=_parse_date(os.getenv("FILTER_SAVED_SINCE")),
+            types=_split(os.getenv("FILTER_TYPES")),
+            min_score=int(min_score) if min_score else None,
+            hydration=os.getenv("HYDRATE_COMMENTS", "all")
+        )
+
+    @property
+    def active(self) -> bool:
+        return bool(self.subreddits or self.exclude_subreddits or self.types
+                    or self.saved_since is not None or self.min_score is not None)
+
+    def accepts(self, item) -> bool:
+        if self.types is not None:
+            item_type = "comment" if isinstance(item, praw.models.Comment) else "post"
+            if item_type not in self.types:
+                return False
+        subreddit = item.subreddit.display_name.lower()
+        if self.subreddits is not None and subreddit not in self.subreddits:
+            return False
+        if subreddit in self.exclude_subreddits:
+            return False
+        if self.saved_since is not None and item.created_utc < self.saved_since:
+            return False
+        if self.min_score is not None and item.score < self.min_score:
+            return False
+        return True
+
+    def hydration_for(self, subreddit: str) -> str:
+        """Returns the comment hydration policy for a subreddit."""
+        return self.hydration.get(subreddit.lower(), self.default_hydration)
@@ -0,0 +1,252 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from urllib.parse import urlencode
+import requests
+from requests.structures import CaseInsensitiveDict
+from reddit_fetch.config import DATA_DIR, HTTP_CACHE_TTL, HTTP_CACHE_MAX_BYTES
+
+HTTP_CACHE_DIR = f"{DATA_DIR}http_cache/"
+
+# Rate-limit headers describe the moment a response was served. Replaying them from
+# disk would make PRAW pace itself on stale numbers, so they are never stored.
+_UNCACHED_HEADERS = {"x-ratelimit-remaining", "x-ratelimit-used", "x-ratelimit-reset", "set-cookie", "date"}
+
+def cache_key(method: str, url: str, params=None) -> str:
+    """Returns the cache key for a request: a hash of its method, URL and sorted query."""
+    query = urlencode(sorted((params or {}).items()), doseq=True)
+    return hashlib.sha256(f"{method.upper()} {url}?{query}".encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    """
+    Size-bounded on-disk store of HTTP response bodies.
+
+    Each entry is a <key>.json metadata file (URL, headers, validators, storage time)
+    next to a <key>.body file. When the total body size exceeds max_bytes, the least
+    recently used entries are evicted.
+    """
+
+    def __init__(self, directory: str = HTTP_CACHE_DIR, max_bytes: int = HTTP_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._index = None # key -> [size, last_used], built lazily from disk
+        self._total = 0
+
+    def _paths(self, key: str):
+        base = os.path.join(self.directory, key)
+        return f"{base}.json", f"{base}.body"
+
+    def _load_index(self):
+        if self._index is not None:
+            return
+        self._index = {}
+        if os.path.isdir(self.directory):
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(".body"):
+                    stat = entry.stat()
+                    self._index[entry.name[:-5]] = [stat.st_size, stat.st_mtime]
+                    self._total += stat.st_size
+
+    def get(self, key: str):
+        """Returns (metadata, body) for a cached entry, or None."""
+        meta_path, body_path = self._paths(key)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(body_path, "rb") as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+        self.touch(key)
+        return meta, body
+
+    def touch(self, key: str):
+        """Marks an entry as recently used."""
+        with self._lock:
+            self._load_index()
+            if key in self._index:
+                self._index[key][1] = time.time()
+        try:
+            os.utime(self._paths(key)[1])
+        except OSError:
+            pass
+
+    def put(self, key: str, meta: dict, body: bytes):
+        meta_path, body_path = self._paths(key)
+        os.makedirs(self.directory, exist_ok=True)
+        for path, content, mode in ((body_path, body, "wb"), (meta_path, json.dumps(meta).encode("utf-8"), "wb")):
+            with open(f"{path}.tmp", mode) as f:
+                f.write(content)
+            os.replace(f"{path}.tmp", path)
+        with self._lock:
+            self._load_index()
+            previous = self._index.get(key)
+            if previous:
+                self._total -= previous[0]
+            self._index[key] = [len(body), time.time()]
+            self._total += len(body)
+            self._evict()
+
+    def update_meta(self, key: str, meta: dict):
+        meta_path = self._paths(key)[0]
+        with open(f"{meta_path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(f"{meta_path}.tmp", meta_path)
+
+    def _remove(self, key: str) -> tuple[int, int]:
+        """Deletes both files of an entry. Returns (files removed, bytes freed)."""
+        removed = freed = 0
+        for path in self._paths(key):
+            try:
+                size = os.path.getsize(path)
+                os.remove(path)
+            except OSError:
+                continue
+            removed, freed = removed + 1, freed + size
+        return removed, freed
+
+    def _evict(self) -> tuple[int, int]:
+        removed = freed = 0
+        if self._total <= self.max_bytes:
+            return removed, freed
+        for key, (size, _) in sorted(self._index.items(), key=lambda item: item[1][1]):
+            if self._total <= self.max_bytes:
+                break
+            files, size_freed = self._remove(key)
+            removed, freed = removed + files, freed + size_freed
+            del self._index[key]
+            self._total -= size
+        return removed, freed
+
+    def collect(self, max_age: float = None, deadline: float = None) -> tuple[int, int, bool]:
+        """
+        Removes entries unused for max_age seconds, half-written entries (a metadata
+        or body file without the other, or a leftover .tmp), then evicts the least
+        recently used entries above max_bytes.
+
+        Args:
+            deadline: time.monotonic() value after which collection stops early.
+
+        Returns:
+            (files removed, bytes reclaimed, True if collection ran to completion).
+        """
+        if not os.path.isdir(self.directory):
+            return 0, 0, True
+        now = time.time()
+        removed = freed = 0
+        with self._lock:
+            self._load_index()
+            for entry in list(os.scandir(self.directory)):
+                if deadline is not None and time.monotonic() > deadline:
+                    return removed, freed, False
+                stem, ext = os.path.splitext(entry.name)
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError: # The other file of an entry removed below
+                    continue
+                if now - stat.st_mtime < 60:
+                    continue # Possibly a write in progress
+                if ext == ".tmp" or (ext == ".json" and stem not in self._index):
+                    os.remove(entry.path)
+                    removed, freed = removed + 1, freed + stat.st_size
+                elif ext == ".body" and stem in self._index:
+                    expired = max_age is not None and now - self._index[stem][1] > max_age
+                    if expired or not os.path.exists(self._paths(stem)[0]):
+                        files, size_freed = self._remove(stem)
+                        removed, freed = removed + files, freed + size_freed
+                        self._total -= self._index.pop(stem)[0]
+            evicted, evicted_bytes = self._evict()
+        return removed + evicted, freed + evicted_bytes, True
+
+    @property
+    def total_bytes(self) -> int:
+        with self._lock:
+            self._load_index()
+            return self._total
+
+def _cached_response(meta: dict, body: bytes) -> requests.Response:
+    response = requests.Response()
+    response.status_code = 200
+    response.reason = "OK"
+    response._content = body
+    response.headers = CaseInsensitiveDict(meta["headers"])
+    response.url = meta["url"]
+    response.encoding = meta.get("encoding")
+    response.from_cache = True
+    response._content_consumed = True # iter_content() then slices the body instead of reading a stream
+    return response
+
+class CachingSession(requests.Session):
+    """
+    Session that serves GET requests from a ResponseCache.
+
+    A cached response younger than `ttl` seconds is returned without touching the
+    network. An older one is revalidated with If-None-Match / If-Modified-Since when
+    the server sent an ETag or Last-Modified, and a 304 answer is served from disk.
+    Everything else goes to the network and successful responses are stored.
+
+    A streamed request (stream=True) is not stored on its own, since its body has not
+    been read: the caller hands the body to store() once it accepted it.
+    """
+
+    def __init__(self, cache: ResponseCache, ttl: float = HTTP_CACHE_TTL, limiter=None):
+        super().__init__()
+        self.cache = cache
+        self.ttl = ttl
+        self.limiter = limiter # Only requests that reach the network are paced
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+
+    def _send(self, method, url, **kwargs):
+        if self.limiter is not None:
+            self.limiter.wait()
+        return super().request(method, url, **kwargs)
+
+    def request(self, method, url, params=None, headers=None, **kwargs):
+        if method.upper() != "GET" or kwargs.get("data") or kwargs.get("json"):
+            return self._send(method, url, params=params, headers=headers, **kwargs)
+
+        key = cache_key(method, url, params)
+        cached = self.cache.get(key)
+        if cached:
+            meta, body = cached
+            if time.time() - meta["stored_at"] < self.ttl:
+                self.hits += 1
+                return _cached_response(meta, body)
+            headers = dict(headers or {})
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        response = self._send(method, url, params=params, headers=headers, **kwargs)
+
+        if response.status_code == 304 and cached:
+            self.revalidated += 1
+            meta["stored_at"] = time.time()
+            self.cache.update_meta(key, meta)
+            return _cached_response(meta, body)
+
+        self.misses += 1
+        response.cache_key = key
+        if not kwargs.get("stream"):
+            self.store(response, response.content)
+        return response
+
+    def store(self, response: requests.Response, body: bytes):
+        """Caches the body of a successful network response of this session."""
+        key = getattr(response, "cache_key", None)
+        if key is None or response.status_code != 200:
+            return
+        self.cache.put(key, {
+            "url": response.url,
+            "stored_at": time.time(),
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "encoding": response.encoding,
+            "headers": {name: value for name, value in response.headers.items() if name.lower() not in _UNCACHED_HEADERS}
+        }, body)
@@ -4,17 +4,27 @@ import sys
 import argparse # Import argparse
 
 import requests
-from reddit_fetch.api import fetch_saved_posts, export_to_google_sheet, OUTPUT_JSON # Import OUTPUT_JSON
+from reddit_fetch.api import fetch_saved_posts, export_to_google_sheet, load_archive, ARCHIVE_DIR
 from reddit_fetch.auth import is_headless, is_docker, show_headless_instructions, load_tokens_safe
-from reddit_fetch.config import TOKEN_FILE, GOOGLE_SHEET_NAME # Import GOOGLE_SHEET_NAME
+from reddit_fetch.columnar import PARQUET_DIR
+from reddit_fetch.config import TOKEN_FILE, GOOGLE_SHEET_NAME, DATA_DIR, ACCOUNTS_FILE, PROFILE, SERVE_HOST, SERVE_PORT, GC_TIME_BUDGET # Import GOOGLE_SHEET_NAME
+from reddit_fetch.accounts import load_accounts, fetch_accounts, RUN_SUMMARY_FILE
+from reddit_fetch.changelog import ChangeLog
+from reddit_fetch.maintenance import collect_garbage
+from reddit_fetch.reconcile import reconcile_archive
+from reddit_fetch.server import serve_archive
+from reddit_fetch.profiling import Profiler
+from reddit_fetch.snapshots import BLOB_DIR, snapshot_archive
 from rich.console import Console
 from rich.prompt import Confirm, Prompt
 from rich.panel import Panel
+from rich.table import Table
 from rich.text import Text
 
 console = Console()
+# Diagnostics of commands whose stdout is machine-readable
+err_console = Console(stderr=True)
 
-DATA_DIR = "data/"
 LAST_FETCH_FILE = f"{DATA_DIR}last_fetch.json"
 
 def is_interactive():
@@ -66,18 +76,185 @@ def check_authentication():
     console.print("✅ [bold green]Authentication tokens found and loaded.[/bold green]")
     return True
 
-def cli_entry():
-    console.print("\n🚀 [bold cyan]Welcome to Reddit Saved Posts Fetcher![/bold cyan]", style="bold yellow")
-    console.print("Fetch and save your Reddit saved posts easily.\n", style="italic green")
+def show_stats(by: str = "subreddit", top: int = 20):
+    """Prints archive statistics from the aggregates kept in the archive manifest, without reading any shard."""
+    archive = load_archive()
+    if not archive.exists:
+        console.print(f"❌ [bold red]Error: no archive found in {ARCHIVE_DIR}.[/bold red]")
+        sys.exit(1)
+
+    aggregates = archive.aggregates
+    archive.commit() # Persists aggregates built for an archive that predates them
+    total = aggregates["total"]
+    console.print(f"📊 [bold green]{total['count']} posts[/bold green], score total {total['score']}, {total['comments']} archived comments.")
+
+    if by == "month":
+        rows = sorted(aggregates["months"].items(), reverse=True) # Most recent month first
+    else:
+        rows = sorted(aggregates["subreddits"].items(), key=lambda item: (-item[1]["count"], item[0]))
+    if top:
+        rows = rows[:top]
+
+    table = Table(title=f"Posts by {by}")
+    table.add_column("Subreddit" if by == "subreddit" else "Month")
+    for column in ("Posts", "Score", "Avg score", "Comments"):
+        table.add_column(column, justify="right")
+    for key, totals in rows:
+        table.add_row(key or "-", str(totals["count"]), str(totals["score"]), f"{totals['score'] / totals['count']:.1f}", str(totals["comments"]))
+    console.print(table)
+
+def show_changes(since: str = None, consumer: str = None, ack: int = None):
+    """Prints change-log events as JSON lines on stdout, or acknowledges them for a consumer. Everything else goes to stderr."""
+    changelog = ChangeLog(f"{ARCHIVE_DIR}changes/")
+    try:
+        since = int(since) if since is not None else None
+    except ValueError:
+        err_console.print(f"❌ [bold red]Error: --since must be a sequence number with changes, not '{since}'.[/bold red]")
+        sys.exit(1)
 
+    if ack is not None:
+        if not consumer:
+            err_console.print("❌ [bold red]Error: --ack requires --consumer.[/bold red]")
+            sys.exit(1)
+        changelog.register(consumer, since=0)
+        changelog.ack(consumer, ack)
+        err_console.print(f"✅ [bold green]{consumer} acknowledged changes up to {min(ack, changelog.last_seq)}.[/bold green]")
+        return
+
+    if consumer:
+        acknowledged = changelog.register(consumer)
+        since = acknowledged if since is None else since
+    since = since or 0
+    if since + 1 < changelog.first_seq:
+        err_console.print(f"⚠️ [yellow]Events before {changelog.first_seq} were compacted: re-read the archive to catch up.[/yellow]")
+    for event in changelog.read(since=since):
+        print(json.dumps(event, ensure_ascii=False))
+
+def cli_entry():
     parser = argparse.ArgumentParser(description="Fetch and export Reddit saved posts.")
+    parser.add_argument(
+        "command",
+        nargs="?",
+        default="fetch",
+        choices=["fetch", "stats", "reconcile", "snapshot", "serve", "changes", "gc"],
+        help="'fetch' (default) fetches and exports saved posts; 'stats' prints archive statistics; "
+             "'reconcile' marks archived items that were unsaved or deleted on Reddit; "
+             "'snapshot' stores the external pages linked by archived posts; "
+             "'serve' starts a local HTTP API over the archive; "
+             "'changes' prints archive change events as JSON lines; "
+             "'gc' reclaims disk space from caches, the change log and orphaned snapshots."
+    )
     parser.add_argument(
         "--export-only",
         action="store_true",
-        help="Export existing saved_posts.json to Google Sheet without fetching from Reddit."
+        help="Export the existing archive to Google Sheet without fetching from Reddit."
+    )
+    parser.add_argument(
+        "--since",
+        metavar="YYYY-MM|SEQ",
+        help="With --export-only, only read archive shards from this saved month onwards. "
+             "With changes, print the events after this sequence number."
+    )
+    parser.add_argument(
+        "--until",
+        metavar="YYYY-MM",
+        help="With --export-only, only read archive shards up to this saved month (inclusive)."
+    )
+    parser.add_argument(
+        "--accounts",
+        nargs="?",
+        const=ACCOUNTS_FILE,
+        metavar="MANIFEST",
+        help=f"Fetch every account listed in an accounts manifest in parallel (default: {ACCOUNTS_FILE})."
+    )
+    parser.add_argument(
+        "--by",
+        choices=["subreddit", "month"],
+        default="subreddit",
+        help="With stats, group statistics by subreddit (default) or by saved month."
+    )
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=20,
+        help="With stats, number of rows to show (default: 20, 0 for all)."
+    )
+    parser.add_argument(
+        "--consumer",
+        metavar="NAME",
+        help="With changes, print the events this consumer has not acknowledged (registering it on first use)."
+    )
+    parser.add_argument(
+        "--ack",
+        type=int,
+        metavar="SEQ",
+        help="With changes and --consumer, acknowledge every event up to SEQ, letting the log compact."
+    )
+    parser.add_argument(
+        "--host",
+        default=SERVE_HOST,
+        help=f"With serve, address to listen on (default: {SERVE_HOST})."
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=SERVE_PORT,
+        help=f"With serve, port to listen on (default: {SERVE_PORT})."
+    )
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=GC_TIME_BUDGET,
+        metavar="SECONDS",
+        help=f"With gc, stop after this many seconds and leave the rest for the next run (default: {GC_TIME_BUDGET:g})."
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        default=PROFILE,
+        help="Profile the run: write a flamegraph stack file and a top-allocations report to data/ (or set REDDIT_FETCH_PROFILE=1)."
     )
     args = parser.parse_args()
 
+    if args.command != "changes": # Its stdout is a stream of JSON lines
+        console.print("\n🚀 [bold cyan]Welcome to Reddit Saved Posts Fetcher![/bold cyan]", style="bold yellow")
+        console.print("Fetch and save your Reddit saved posts easily.\n", style="italic green")
+
+    if args.profile:
+        with Profiler():
+            run_command(args)
+    else:
+        run_command(args)
+
+def run_command(args):
+    """Runs the command selected on the command line."""
+
+    if args.command == "stats":
+        show_stats(by=args.by, top=args.top)
+        return
+
+    if args.command == "changes":
+        show_changes(since=args.since, consumer=args.consumer, ack=args.ack)
+        return
+
+    if args.command == "gc":
+        collect_garbage(budget=args.budget)
+        return
+
+    if args.command == "serve":
+        if not load_archive().exists:
+            console.print(f"❌ [bold red]Error: no archive found in {ARCHIVE_DIR}.[/bold red]")
+            sys.exit(1)
+        serve_archive(host=args.host, port=args.port)
+        return
+
+    if args.command == "snapshot":
+        archive = load_archive()
+        counts = snapshot_archive(archive)
+        archive.commit()
+        console.print(f"✅ [bold green]{counts['stored']} pages stored in {BLOB_DIR}, {counts['failed']} failed.[/bold green]")
+        return
+
     # Show environment information
     is_docker_env = is_docker()
     is_headless_env = is_headless()
@@ -92,23 +269,35 @@ def cli_entry():
     console.print(f"🖥️  Headless System: {'Yes' if is_headless_env else 'No'}", style="bold blue")
     console.print(f"💬 Interactive Session: {'No' if is_non_interactive_env else 'Yes'}", style="bold magenta")
     
-    # Check authentication before proceeding (only if not export-only)
-    if not args.export_only:
+    # Check authentication before proceeding (only if not export-only or multi-account,
+    # where every account brings its own token file)
+    if not args.export_only and not args.accounts:
         if not check_authentication():
             # If we're here, we're on a browser system but tokens are missing/invalid
             # The authentication will be handled by the API calls
             pass
+
+    if args.command == "reconcile":
+        try:
+            summary = reconcile_archive()
+        except Exception as e:
+            console.print(f"❌ [bold red]Reconciliation failed: {e}[/bold red]")
+            sys.exit(1)
+        console.print(f"✅ [bold green]{summary['saved']} items still saved, {summary['not_archived']} of them not archived yet.[/bold green]")
+        return
     
     if args.export_only:
-        console.print("🔄 [bold blue]Export-only mode activated. Reading from saved_posts.json...[/bold blue]")
-        if not os.path.exists(OUTPUT_JSON):
-            console.print(f"❌ [bold red]Error: {OUTPUT_JSON} not found. Cannot export without data.[/bold red]")
-            sys.exit(1)
-        
+        console.print(f"🔄 [bold blue]Export-only mode activated. Reading from {ARCHIVE_DIR}...[/bold blue]")
         try:
-            with open(OUTPUT_JSON, "r", encoding="utf-8") as f:
-                posts_to_export = json.load(f)
-            console.print(f"✅ [green]Loaded {len(posts_to_export)} posts from {OUTPUT_JSON}.[/green]")
+            archive = load_archive()
+            if not archive.exists:
+                console.print(f"❌ [bold red]Error: no archive found in {ARCHIVE_DIR}. Cannot export without data.[/bold red]")
+                sys.exit(1)
+
+            # Only the shards in the requested month range are read
+            shards = archive.shard_keys(since=args.since, until=args.until)
+            posts_to_export = list(archive.iter_records(since=args.since, until=args.until))
+            console.print(f"✅ [green]Loaded {len(posts_to_export)} posts from {len(shards)} shards in {ARCHIVE_DIR}.[/green]")
             
             if not GOOGLE_SHEET_NAME:
                 console.print("❌ [bold red]GOOGLE_SHEET_NAME is not set in .env. Cannot export to Google Sheet.[/bold red]")
@@ -124,7 +313,7 @@ def cli_entry():
             sys.exit(0)
             
         except json.JSONDecodeError as e:
-            console.print(f"❌ [bold red]Error decoding {OUTPUT_JSON}: {e}. File might be corrupted.[/bold red]")
+            console.print(f"❌ [bold red]Error decoding the archive: {e}. A shard might be corrupted.[/bold red]")
             sys.exit(1)
         except Exception as e:
             console.print(f"❌ [bold red]An unexpected error occurred during export: {e}[/bold red]")
@@ -142,7 +331,7 @@ def cli_entry():
     else:
         # Interactive mode - ask user for preferences
         try:
-            format_choice = Prompt.ask("Select output format", choices=["json", "html", "google_sheet"], default="json")
+            format_choice = Prompt.ask("Select output format", choices=["json", "html", "google_sheet", "parquet"], default="json")
             force_fetch = Confirm.ask("Do you want to force fetch all saved posts?", default=False)
         except KeyboardInterrupt:
             console.print("\n👋 [yellow]Operation cancelled by user.[/yellow]")
@@ -153,6 +342,23 @@ def cli_entry():
             format_choice = "json"
             force_fetch = False
 
+    if args.accounts:
+        try:
+            accounts = load_accounts(args.accounts)
+        except (OSError, ValueError) as e:
+            console.print(f"❌ [bold red]Cannot read accounts manifest {args.accounts}: {e}[/bold red]")
+            sys.exit(1)
+
+        console.print(f"\n📡 [bold blue]Fetching {len(accounts)} accounts in parallel...[/bold blue]")
+        summary = fetch_accounts(accounts, format=format_choice, force_fetch=force_fetch)
+        for account in summary["accounts"]:
+            icon = "✅" if account["status"] == "ok" else "❌"
+            console.print(f"{icon} [bold]{account['account']}[/bold]: {account['status']}, {account['count']} posts → {DATA_DIR}{account['account']}/")
+        console.print(f"\n📊 [bold green]{summary['total_count']} posts across {len(accounts)} accounts in {summary['duration']}s.[/bold green] Summary saved to [bold]{RUN_SUMMARY_FILE}[/bold]")
+        if any(account["status"] != "ok" for account in summary["accounts"]):
+            sys.exit(1)
+        return
+
     # Handle force fetch
     if force_fetch and os.path.exists(LAST_FETCH_FILE):
         try:
@@ -173,28 +379,24 @@ def cli_entry():
             console.print("   • Authentication or API issues")
             return
         
-        # Extract data from result
-        posts_content = result["content"]
+        # Exports already ran inside fetch_saved_posts, one concurrent sink per format
         posts_count = result["count"]
-        result_format = result["format"]
-        
-        # If the format is google_sheet, the export is already handled by fetch_saved_posts
-        if result_format == "google_sheet":
-            console.print(f"\n✅ [bold green]Export to Google Sheet completed via fetch process.[/bold green]")
-            return
+        exports = result.get("exports", {})
 
-        # Save the output for json/html
-        output_file = f"{DATA_DIR}saved_posts.{result_format}"
-        
-        with open(output_file, "w", encoding="utf-8") as file:
-            if result_format == "json":
-                json.dump(posts_content, file, indent=4)
-            else:
-                file.write(posts_content)
-        
         console.print(f"\n✅ [bold green]Successfully fetched {posts_count} posts![/bold green]")
-        console.print(f"💾 Output saved to [bold green]{output_file}[/bold green]")
-        
+        for name, success in exports.items():
+            if not success:
+                console.print(f"❌ [bold red]Export to {name} failed.[/bold red]")
+            elif name == "google_sheet":
+                console.print("✅ [bold green]Export to Google Sheet completed.[/bold green]")
+            elif name == "parquet":
+                console.print(f"💾 Parquet dataset updated in [bold green]{PARQUET_DIR}[/bold green]")
+            else:
+                console.print(f"💾 Output saved to [bold green]{DATA_DIR}saved_posts.{name}[/bold green]")
+
+        if exports and not all(exports.values()):
+            sys.exit(1)
+
         if is_docker_env:
             console.print(f"🐳 [bold blue]File available in your mounted data directory[/bold blue]")
     
@@ -265,5 +467,5 @@ def main():
         sys.exit(1)
 
 if __name__ == "__main__":
-    console.print("🟢 Script reached __main__, calling cli_entry()", style="bold magenta")
+    err_console.print("🟢 Script reached __main__, calling cli_entry()", style="bold magenta")
     cli_entry()
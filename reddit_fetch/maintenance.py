@@ -0,0 +1,177 @@
+import os
+import time
+from rich.console import Console
+from rich.table import Table
+from reddit_fetch.changelog import ChangeLog
+from reddit_fetch.config import DATA_DIR, CACHE_MAX_AGE, GC_TIME_BUDGET, HTTP_CACHE_MAX_BYTES, LINK_CACHE_MAX_BYTES
+from reddit_fetch.http_cache import ResponseCache
+from reddit_fetch.storage import ShardedArchive, write_json_atomic
+
+console = Console()
+
+STORES = ("tmp", "http_cache", "link_cache", "changes", "shards", "blobs")
+# Files younger than this may belong to a write or a snapshot not committed yet
+ORPHAN_GRACE = 3600
+GC_STATE_FILE = "gc_state.json"
+
+def _collect_tmp(data_dir: str, deadline: float, state: dict) -> tuple[int, int, bool]:
+    """Removes the .tmp files left behind by interrupted atomic writes."""
+    removed = freed = 0
+    now = time.time()
+    for root, _, files in os.walk(data_dir):
+        for name in files:
+            if time.monotonic() > deadline:
+                return removed, freed, False
+            if not name.endswith(".tmp"):
+                continue
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+                if now - stat.st_mtime < ORPHAN_GRACE:
+                    continue
+                os.remove(path)
+            except OSError:
+                continue
+            removed, freed = removed + 1, freed + stat.st_size
+    return removed, freed, True
+
+def _collect_http_cache(data_dir: str, deadline: float, state: dict) -> tuple[int, int, bool]:
+    return ResponseCache(f"{data_dir}http_cache/", HTTP_CACHE_MAX_BYTES).collect(CACHE_MAX_AGE, deadline)
+
+def _collect_link_cache(data_dir: str, deadline: float, state: dict) -> tuple[int, int, bool]:
+    return ResponseCache(f"{data_dir}link_cache/", LINK_CACHE_MAX_BYTES).collect(CACHE_MAX_AGE, deadline)
+
+def _collect_changes(data_dir: str, deadline: float, state: dict) -> tuple[int, int, bool]:
+    """Compacts the change log down to what its slowest consumer has not acknowledged."""
+    changelog = ChangeLog(f"{data_dir}archive/changes/")
+    before = len(changelog.segments())
+    freed = changelog.compact()
+    return before - len(changelog.segments()), freed, True
+
+def _collect_shards(data_dir: str, deadline: float, state: dict) -> tuple[int, int, bool]:
+    """Drops the archive shards left empty by removed or merged records."""
+    archive = ShardedArchive(f"{data_dir}archive/")
+    if not archive.exists:
+        return 0, 0, True
+    dropped, freed = archive.drop_empty_shards()
+    if dropped:
+        archive.commit()
+    return dropped, freed, True
+
+def _collect_blobs(data_dir: str, deadline: float, state: dict) -> tuple[int, int, bool]:
+    """
+    Removes the snapshot blobs no archived post refers to anymore.
+
+    The references found in each shard are kept in state along with the shard's
+    SHA-256, so later passes only read the shards that changed, and the blob prefix
+    directory reached is kept so a cut pass resumes there. Nothing is deleted until
+    every shard has been scanned.
+    """
+    archive = ShardedArchive(f"{data_dir}archive/")
+    blob_dir = f"{data_dir}blobs/"
+    if not archive.exists or not os.path.isdir(blob_dir):
+        return 0, 0, True
+    shards = archive.manifest["shards"]
+    scanned = {key: value for key, value in state.get("shards", {}).items() if key in shards}
+    state["shards"] = scanned
+    for key, meta in shards.items():
+        if key in scanned and scanned[key][0] == meta.get("sha256"):
+            continue
+        if time.monotonic() > deadline:
+            return 0, 0, False
+        references = ((post.get('snapshot') or {}).get('blob') for post in ShardedArchive._read_json(archive.shard_path(key), []))
+        scanned[key] = [meta.get("sha256"), sorted({reference.split(":", 1)[1] for reference in references if reference})]
+    referenced = {digest for _, digests in scanned.values() for digest in digests}
+
+    removed = freed = 0
+    now = time.time()
+    for prefix in sorted(os.listdir(blob_dir)):
+        if prefix < state.get("prefix", ""):
+            continue # Collected by the pass that was cut
+        directory = os.path.join(blob_dir, prefix)
+        for name in os.listdir(directory) if os.path.isdir(directory) else ():
+            if time.monotonic() > deadline:
+                state["prefix"] = prefix
+                return removed, freed, False
+            if name in referenced or name.endswith(".tmp"):
+                continue
+            path = os.path.join(directory, name)
+            try:
+                stat = os.stat(path)
+                if now - stat.st_mtime < ORPHAN_GRACE:
+                    continue
+                os.remove(path)
+            except OSError:
+                continue
+            removed, freed = removed + 1, freed + stat.st_size
+    state.pop("prefix", None)
+    return removed, freed, True
+
+_COLLECTORS = {
+    "tmp": _collect_tmp,
+    "http_cache": _collect_http_cache,
+    "link_cache": _collect_link_cache,
+    "changes": _collect_changes,
+    "shards": _collect_shards,
+    "blobs": _collect_blobs
+}
+
+def collect_garbage(stores=None, budget: float = GC_TIME_BUDGET, data_dir: str = DATA_DIR, report: bool = True) -> dict[str, dict]:
+    """
+    Reclaims disk space in data/: stale temporary files, expired or over-budget
+    cache entries, acknowledged change-log segments, empty archive shards and
+    unreferenced snapshot blobs.
+
+    Every store is collected incrementally: once the time budget is spent, the
+    remaining work is left for the next pass, which starts with the stores this
+    one did not reach. Progress is kept in data/gc_state.json.
+
+    Args:
+        stores: Names of the stores to collect, among STORES. None collects them all.
+        budget: Seconds the whole pass may take.
+        data_dir: The data directory holding the stores.
+        report: Whether to print a summary table.
+
+    Returns:
+        A dictionary mapping each store to its 'files' and 'bytes' reclaimed, the
+        'seconds' spent and whether it was collected 'complete'ly.
+    """
+    deadline = time.monotonic() + budget
+    state_path = f"{data_dir}{GC_STATE_FILE}"
+    state = ShardedArchive._read_json(state_path, {})
+    stores = list(stores or STORES)
+    if state.get("next") in stores: # Start with the stores the previous pass did not reach
+        start = stores.index(state["next"])
+        stores = stores[start:] + stores[:start]
+
+    results, cut = {}, None
+    for store in stores:
+        started = time.monotonic()
+        if started > deadline:
+            files, freed, complete = 0, 0, False
+        else:
+            files, freed, complete = _COLLECTORS[store](data_dir, deadline, state.setdefault("stores", {}).setdefault(store, {}))
+            if not complete and cut is None:
+                cut = store
+        results[store] = {"files": files, "bytes": freed, "seconds": time.monotonic() - started, "complete": complete}
+    # The store that was cut goes last next time, so a slow one cannot starve the others
+    state["next"] = stores[(stores.index(cut) + 1) % len(stores)] if cut else next(
+        (store for store in stores if not results[store]["complete"]), None)
+    state["stores"] = {store: store_state for store, store_state in state.get("stores", {}).items() if store_state}
+    write_json_atomic(state_path, state)
+
+    if report:
+        table = Table(title="Nettoyage")
+        table.add_column("Stockage")
+        for column in ("Fichiers", "Mio", "Secondes"):
+            table.add_column(column, justify="right")
+        for store, result in results.items():
+            table.add_row(store if result["complete"] else f"{store} (partiel)", str(result["files"]),
+                          f"{result['bytes'] / 2**20:.1f}", f"{result['seconds']:.2f}")
+        console.print(table)
+        total = sum(result["bytes"] for result in results.values())
+        seconds = sum(result["seconds"] for result in results.values())
+        console.print(f"[bold green]Succès:[/bold green] {total / 2**20:.1f} Mio récupérés en {seconds:.1f}s.")
+        if not all(result["complete"] for result in results.values()):
+            console.print("[yellow]Budget de temps épuisé: le nettoyage reprendra au prochain passage.[/yellow]")
+    return results
@@ -0,0 +1,168 @@
+import os
+import sys
+import time
+import threading
+import tracemalloc
+from collections import Counter
+from rich.console import Console
+from rich.table import Table
+from reddit_fetch.config import DATA_DIR, PROFILE_INTERVAL, PROFILE_TRACEMALLOC_FRAMES
+
+console = Console()
+
+TOP_ALLOCATIONS = 30
+# A new allocation snapshot is taken when traced memory passes the last one by 50% and
+# SNAPSHOT_MIN_BYTES: snapshots cost time proportional to live allocations, so they stay rare
+SNAPSHOT_GROWTH = 1.5
+SNAPSHOT_MIN_BYTES = 16 * 1024 * 1024
+
+# Where a slow run usually spends its time: (label, path fragment, function names or None for any)
+HOTSPOTS = (
+    ("PRAW attribute loads", os.path.join("praw", "models", "reddit", "base.py"), ("_fetch", "__getattr__")),
+    ("Comment expansion", os.path.join("praw", "models", "comment_forest.py"), ("replace_more",)),
+    ("JSON encoding", os.path.join("json", ""), ("dump", "dumps", "encode", "iterencode")),
+    ("gspread calls", os.path.join("gspread", ""), None),
+    ("HTTP requests", os.path.join("requests", "sessions.py"), ("send",)),
+)
+
+def _frame_label(code) -> str:
+    # Collapsed-stack format separates frames with ';' and ends with ' <weight>'
+    filename = code.co_filename
+    for root in sorted(sys.path, key=len, reverse=True):
+        if root and filename.startswith(root):
+            filename = filename[len(root):].lstrip(os.sep)
+            break
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(";", ":")
+
+class Profiler:
+    """
+    Wall-clock sampling profiler with allocation tracking, used as a context manager.
+
+    A background thread records the stack of every other thread each interval
+    seconds, so the cost does not depend on how many calls the profiled code makes,
+    and time spent waiting on the network shows up as such. tracemalloc runs along;
+    the allocation report is taken at the traced memory peak rather than at exit,
+    when most records have been released.
+
+    On exit it writes two files to data/:
+        profile-<timestamp>.folded: Collapsed stacks ('thread;outer;...;inner ms'),
+            the input of flamegraph.pl, speedscope or inferno.
+        profile-<timestamp>-allocations.txt: Time spent in the HOTSPOTS and the top
+            allocation sites at peak memory.
+    """
+
+    def __init__(self, directory: str = DATA_DIR, interval: float = PROFILE_INTERVAL, frames: int = PROFILE_TRACEMALLOC_FRAMES):
+        self.interval = max(interval, 0.001)
+        self.frames = max(frames, 1)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        self.stacks_path = os.path.join(directory, f"profile-{stamp}.folded")
+        self.report_path = os.path.join(directory, f"profile-{stamp}-allocations.txt")
+        self.stacks = Counter()
+        self.samples = 0
+        self.peak_snapshot = None
+        self.peak = 0
+        self._labels = {}
+        self._stop = threading.Event()
+        self._thread = None
+        self._started = None
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = _frame_label(code)
+        return label
+
+    def _sample(self, weight: int):
+        own = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            stack.append(names.get(ident, f"thread-{ident}").replace(";", ":"))
+            self.stacks[";".join(reversed(stack))] += weight
+        self.samples += 1
+
+    def _run(self):
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            # Weighted by the milliseconds since the previous sample: a thread holding
+            # the GIL delays sampling, and its stack must not look shorter for it
+            now = time.perf_counter()
+            self._sample(max(round((now - last) * 1000), 1))
+            last = now
+            current, _ = tracemalloc.get_traced_memory()
+            if current > max(self.peak * SNAPSHOT_GROWTH, SNAPSHOT_MIN_BYTES):
+                self.peak_snapshot = tracemalloc.take_snapshot()
+                self.peak = current
+
+    def __enter__(self):
+        tracemalloc.start(self.frames)
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+        console.print(f"[bold blue]Profilage activé (échantillon toutes les {self.interval * 1000:.0f} ms).[/bold blue]")
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        elapsed = time.perf_counter() - self._started
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = self.peak_snapshot if self.peak_snapshot is not None and self.peak >= current else tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        try:
+            self.write(snapshot, elapsed, peak)
+        except OSError as e:
+            console.print(f"[bold red]Erreur:[/bold red] Impossible d'écrire le profil: {e}", style="bold red")
+        return False
+
+    def hotspots(self) -> dict[str, float]:
+        """Returns the sampled seconds spent in each HOTSPOTS entry, across all threads."""
+        seconds = {}
+        for label, fragment, functions in HOTSPOTS:
+            milliseconds = 0
+            for stack, weight in self.stacks.items():
+                for frame in stack.split(";"):
+                    name, _, location = frame.partition(" (")
+                    if fragment in location and (functions is None or name in functions):
+                        milliseconds += weight
+                        break
+            seconds[label] = milliseconds / 1000
+        return seconds
+
+    def write(self, snapshot, elapsed: float, peak: int):
+        os.makedirs(os.path.dirname(self.stacks_path) or ".", exist_ok=True)
+        with open(self.stacks_path, "w", encoding="utf-8") as f:
+            for stack, weight in self.stacks.most_common():
+                f.write(f"{stack} {weight}\n")
+
+        hotspots = self.hotspots()
+        snapshot = snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        ))
+        statistics = snapshot.statistics("traceback")[:TOP_ALLOCATIONS]
+        with open(self.report_path, "w", encoding="utf-8") as f:
+            f.write(f"Wall time: {elapsed:.1f}s, {self.samples} samples every {self.interval * 1000:.0f} ms\n")
+            f.write(f"Peak traced memory: {peak / 2**20:.1f} MiB\n\n")
+            f.write("Sampled time (all threads):\n")
+            for label, seconds in hotspots.items():
+                f.write(f"  {label:<22} {seconds:8.2f}s\n")
+            f.write(f"\nTop {len(statistics)} allocation sites at peak:\n")
+            for rank, stat in enumerate(statistics, 1):
+                f.write(f"\n#{rank}: {stat.size / 2**20:.2f} MiB in {stat.count} blocks\n")
+                for line in stat.traceback.format(most_recent_first=True):
+                    f.write(f"  {line}\n")
+
+        table = Table(title="Profil")
+        table.add_column("Zone")
+        table.add_column("Secondes", justify="right")
+        for label, seconds in hotspots.items():
+            table.add_row(label, f"{seconds:.2f}")
+        console.print(table)
+        console.print(f"[bold green]Succès:[/bold green] Profil écrit dans {self.stacks_path} et {self.report_path} (pic mémoire {peak / 2**20:.1f} Mio).")
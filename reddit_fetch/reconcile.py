@@ -0,0 +1,95 @@
+import time
+from rich.console import Console
+from reddit_fetch.api import get_reddit_client, load_archive
+from reddit_fetch.records import record_fullname
+
+console = Console()
+
+INFO_BATCH = 100 # Fullnames per /api/info request, Reddit's maximum
+_DELETED_TEXT = ("[deleted]", "[removed]")
+
+def _listing_data(item) -> dict:
+    # PRAW fetches a lazy object when an attribute is missing from its data; reading
+    # the instance dictionary guarantees reconciliation never hydrates an item
+    return vars(item)
+
+def is_deleted(item) -> bool:
+    """Tells from listing or /api/info data whether an item was deleted or removed."""
+    data = _listing_data(item)
+    if data.get("removed_by_category"):
+        return True
+    return data.get("body", data.get("selftext")) in _DELETED_TEXT
+
+def reconcile_archive(reddit=None, archive=None) -> dict:
+    """
+    Marks archived items that were unsaved on Reddit, deleted or removed.
+
+    The saved listing is walked for fullnames only: no comment tree or submission is
+    hydrated, so each page of 100 items costs one request. Saved items whose listing
+    data shows them deleted are marked 'deleted'. Archived items absent from the
+    listing are looked up through /api/info in batches of INFO_BATCH, which tells
+    whether each one still exists and is still saved; Reddit listings stop after
+    1000 items, so absence alone does not prove an item was unsaved. Items seen
+    saved again have their status cleared.
+
+    Statuses are stored on the records ('status', 'status_changed_at') and only the
+    shards of records whose status changed are rewritten.
+
+    Args:
+        reddit: An authenticated praw.Reddit instance. Built from the environment if None.
+        archive: The ShardedArchive to reconcile. Opened from data/archive/ if None.
+
+    Returns:
+        A summary dictionary: 'saved', 'archived', 'not_archived', the number of
+        records newly marked 'unsaved' or 'deleted', 'restored', and the number of
+        'requests' made.
+
+    Raises:
+        RuntimeError: If no client was given and Reddit credentials are missing.
+    """
+    if reddit is None:
+        reddit = get_reddit_client(revalidate=True) # Cached listing pages would hide recent unsaves
+        if reddit is None:
+            raise RuntimeError("Reddit credentials or refresh token are missing")
+    if archive is None:
+        archive = load_archive()
+
+    # Fullnames derive from permalinks, so the index is enough and no shard is read
+    archived = {record_fullname({'permalink': permalink}): permalink for permalink in archive.index}
+    statuses = {}
+    saved = set()
+    not_archived = 0
+    for item in reddit.user.me().saved(limit=None):
+        saved.add(item.fullname)
+        if item.fullname not in archived:
+            not_archived += 1
+        else:
+            statuses[item.fullname] = "deleted" if is_deleted(item) else None
+    requests = len(saved) // 100 + 1
+
+    missing = [fullname for fullname in archived if fullname not in saved]
+    for start in range(0, len(missing), INFO_BATCH):
+        batch = missing[start:start + INFO_BATCH]
+        found = {item.fullname: item for item in reddit.info(fullnames=batch)}
+        requests += 1
+        for fullname in batch:
+            item = found.get(fullname)
+            if item is None or is_deleted(item):
+                statuses[fullname] = "deleted"
+            else:
+                statuses[fullname] = None if _listing_data(item).get("saved") else "unsaved"
+
+    now = time.time()
+    summary = {"saved": len(saved), "archived": len(archived), "not_archived": not_archived,
+               "unsaved": 0, "deleted": 0, "restored": 0, "requests": requests}
+    for fullname, status in statuses.items():
+        if archive.set_status(archived[fullname], status, at=now):
+            summary[status or "restored"] += 1
+    archive.commit()
+
+    console.print(
+        f"[bold green]Réconciliation:[/bold green] {summary['unsaved']} retirés des sauvegardes, "
+        f"{summary['deleted']} supprimés, {summary['restored']} restaurés "
+        f"({summary['requests']} requêtes pour {len(archived)} posts archivés)."
+    )
+    return summary
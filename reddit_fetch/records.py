@@ -0,0 +1,159 @@
+import json
+import hashlib
+import unicodedata
+from typing import TypedDict, Union
+import praw
+from rich.console import Console
+from reddit_fetch.comments import CommentForest, comment_rows
+
+console = Console()
+
+REDDIT_URL = "https://www.reddit.com"
+
+class CommentRecord(TypedDict):
+    author: str
+    body: str
+    score: int
+
+class SavedItem(TypedDict, total=False):
+    """An archive record, as stored in the archive shards and passed to exporters."""
+    fullname: str
+    type: str # 'post' or 'comment'
+    title: str
+    score: int
+    subreddit: str
+    permalink: str
+    url: str
+    date_saved: float # Unix timestamp
+    selftext: str
+    num_comments: Union[int, str] # 'N/A' for comments
+    comments: Union[list[CommentRecord], CommentForest] # Posts only; a CommentForest when freshly fetched
+    combined_content: str
+    content_hash: str # See content_hash()
+
+# Fields that define a record's content. Scores and counts move constantly and are
+# deliberately left out, so only real edits change the hash.
+HASHED_FIELDS = ('title', 'url', 'selftext')
+
+def _normalize(value) -> str:
+    return unicodedata.normalize("NFC", str(value or "")).replace("\r\n", "\n").strip()
+
+def content_hash(post: dict) -> str:
+    """
+    Returns a stable hash of a record's normalized content.
+
+    Covers the title, URL, selftext (the body, for comments) and the author/body of
+    every comment. Comments are hashed as a sorted set since Reddit reorders them as
+    votes change.
+    """
+    normalized = {field: _normalize(post.get(field)) for field in HASHED_FIELDS}
+    normalized['comments'] = sorted([_normalize(author), _normalize(body)] for author, body, _ in comment_rows(post.get('comments')))
+    blob = json.dumps(normalized, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+def record_hash(post: dict) -> str:
+    """Returns the stored content hash of a record, computing it for legacy records."""
+    return post.get('content_hash') or content_hash(post)
+
+def _release_comments(item):
+    # The listing keeps up to 100 submissions alive while its page is consumed: once
+    # converted, their PRAW comment trees are dropped rather than kept until then
+    data = vars(item)
+    if "_comments" in data:
+        data["_comments"] = praw.models.comment_forest.CommentForest(item)
+    data["_comments_by_id"] = {}
+
+def submission_to_record(item, hydrate: str = "all") -> SavedItem:
+    """
+    Builds the archive record for a saved Submission.
+
+    `hydrate` controls the comment requests: 'all' expands the full comment tree,
+    'top' keeps only the comments returned with the first page, and 'none' makes no
+    comment request. Be cautious: expanding every comment can be very slow and hit
+    API limits for posts with many comments.
+
+    Comments are converted to a compact CommentForest as soon as they are fetched,
+    and the submission's PRAW comment objects are released.
+    """
+    comments = CommentForest()
+    try:
+        if hydrate != "none":
+            item.comments.replace_more(limit=None if hydrate == "all" else 0)
+            comments = CommentForest.from_praw(item.comments)
+            _release_comments(item)
+    except Exception as comment_e:
+        console.print(f"[bold yellow]Avertissement:[/bold yellow] Impossible de récupérer les commentaires pour {item.title}: {comment_e}", style="bold yellow")
+    combined_content = "".join(
+        [item.selftext or ""] + [f"\n\n--- Comment by u/{author} ---\n{body}" for author, body, _ in comments.rows()]
+    )
+
+    record = {
+        'fullname': item.fullname,
+        'type': 'post',
+        'title': item.title,
+        'score': item.score,
+        'subreddit': item.subreddit.display_name,
+        'permalink': f"{REDDIT_URL}{item.permalink}",
+        'url': item.url,
+        'date_saved': item.created_utc, # Unix timestamp
+        'selftext': item.selftext,
+        'num_comments': item.num_comments,
+        'comments': comments,
+        'combined_content': combined_content
+    }
+    record['content_hash'] = content_hash(record)
+    return record
+
+def comment_to_record(item) -> SavedItem:
+    """
+    Builds the archive record for a saved Comment.
+
+    The parent submission's title and URL come from the listing data (link_title,
+    link_url), which avoids lazily fetching the submission for every comment.
+    """
+    record = {
+        'fullname': item.fullname,
+        'type': 'comment',
+        'title': f"Comment on {item.link_title}",
+        'score': item.score,
+        'subreddit': item.subreddit.display_name,
+        'permalink': f"{REDDIT_URL}{item.permalink}",
+        'url': item.link_url, # Link to the submission the comment is on
+        'date_saved': item.created_utc,
+        'selftext': item.body, # Comment body is selftext for comments
+        'num_comments': 'N/A', # Not applicable for a single comment
+        'combined_content': item.body # Comment body is the primary content for comments
+    }
+    record['content_hash'] = content_hash(record)
+    return record
+
+def item_to_record(item, hydrate: str = "all"):
+    """Builds the archive record for a saved item, or returns None for unsupported types."""
+    if isinstance(item, praw.models.Submission):
+        return submission_to_record(item, hydrate)
+    if isinstance(item, praw.models.Comment):
+        return comment_to_record(item)
+    return None
+
+def record_fullname(post: dict) -> str:
+    """
+    Returns the Reddit fullname of an archive record.
+
+    Records written before the 'fullname' field existed get it derived from their
+    permalink: /r/<sub>/comments/<post_id>/<slug>/ for posts, with a trailing
+    <comment_id>/ segment for comments.
+    """
+    if post.get('fullname'):
+        return post['fullname']
+    parts = [part for part in post.get('permalink', '').replace(REDDIT_URL, '').split('/') if part]
+    if len(parts) >= 6:
+        return f"t1_{parts[5]}"
+    if len(parts) >= 4:
+        return f"t3_{parts[3]}"
+    return post.get('permalink', '')
+
+def record_type(post: dict) -> str:
+    """Returns 'post' or 'comment' for an archive record, including legacy records."""
+    if post.get('type'):
+        return post['type']
+    return 'comment' if record_fullname(post).startswith('t1_') else 'post'
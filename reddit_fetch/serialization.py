@@ -0,0 +1,83 @@
+import json
+import textwrap
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
+from typing import Callable, Iterable, Iterator
+from reddit_fetch.comments import json_default
+from reddit_fetch.config import EXPORT_WORKERS, EXPORT_CHUNK_RECORDS
+
+def encode_json_record(record: dict) -> str:
+    """Encodes one record exactly as json.dump(records, f, indent=4) lays out an array element."""
+    return textwrap.indent(json.dumps(record, indent=4, default=json_default), "    ")
+
+def encode_json_array(records: Iterable[dict], encoder: "ParallelEncoder" = None) -> bytes:
+    """Returns json.dumps(list(records), indent=4) as UTF-8, with elements encoded by encoder."""
+    parts = list((encoder or ParallelEncoder(workers=1)).map(encode_json_record, records))
+    return ("[\n" + ",\n".join(parts) + "\n]" if parts else "[]").encode("utf-8")
+
+def _apply(function: Callable[[dict], str], chunk: list[dict]) -> list[str]:
+    return [function(record) for record in chunk]
+
+def _chunks(records: Iterable[dict], size: int) -> Iterator[list[dict]]:
+    iterator = iter(records)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+class ParallelEncoder:
+    """
+    Encodes records to text in chunks across a process pool, yielding results in order.
+
+    json.dumps with an indent runs the pure-Python encoder, so large exports are
+    bound by one core; records pickle to the workers far faster than they encode.
+    At most two chunks per worker are in flight, which bounds memory. Inputs of a
+    single chunk, or workers=1 (the reference mode), are encoded in-process, so
+    small commits never start a pool. Output does not depend on the worker count.
+
+    The pool is created on first need and shut down by close() or on exit when used
+    as a context manager, so one pool can serve several calls to map().
+    """
+
+    def __init__(self, workers: int = EXPORT_WORKERS, chunk_records: int = EXPORT_CHUNK_RECORDS):
+        self.workers = max(workers, 1)
+        self.chunk_records = max(chunk_records, 1)
+        self._pool = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # Spawned, not forked: the sink threads may hold locks at fork time
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    def map(self, function: Callable[[dict], str], records: Iterable[dict]) -> Iterator[str]:
+        """Yields function(record) for every record, in order. function must be picklable (module level)."""
+        chunks = _chunks(records, self.chunk_records)
+        head = list(islice(chunks, 2))
+        if self.workers == 1 or len(head) < 2:
+            for chunk in chain(head, chunks):
+                yield from _apply(function, chunk)
+            return
+        pool = self._get_pool()
+        pending = deque()
+        for chunk in chain(head, chunks):
+            pending.append(pool.submit(_apply, function, chunk))
+            if len(pending) >= 2 * self.workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
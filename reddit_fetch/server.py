@@ -0,0 +1,321 @@
+import os
+import json
+import base64
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit, unquote
+from rich.console import Console
+from reddit_fetch.changelog import ChangeLog
+from reddit_fetch.comments import json_default
+from reddit_fetch.config import SERVE_HOST, SERVE_PORT, SERVE_CACHE_RECORDS, SERVE_PAGE_SIZE, GC_INTERVAL
+from reddit_fetch.maintenance import collect_garbage
+from reddit_fetch.filters import _parse_date, _split
+from reddit_fetch.records import record_fullname, record_type
+from reddit_fetch.storage import ARCHIVE_DIR, ShardedArchive, shard_key
+
+console = Console()
+
+MAX_PAGE_SIZE = 1000
+# Fields left out of list responses: a record's full text is fetched by fullname
+_HEAVY_FIELDS = ('comments', 'combined_content')
+
+class ShardCache:
+    """Thread-safe LRU of loaded shards, bounded by the total number of records they hold."""
+
+    def __init__(self, capacity: int = SERVE_CACHE_RECORDS):
+        self.capacity = capacity
+        self.records = 0
+        self._shards = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            records = self._shards.get(key)
+            if records is not None:
+                self._shards.move_to_end(key)
+            return records
+
+    def put(self, key: str, records: list[dict]):
+        with self._lock:
+            if key in self._shards:
+                self.records -= len(self._shards.pop(key))
+            self._shards[key] = records
+            self.records += len(records)
+            # The most recent shard stays even when it alone exceeds the capacity
+            while self.records > self.capacity and len(self._shards) > 1:
+                _, evicted = self._shards.popitem(last=False)
+                self.records -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._shards.clear()
+            self.records = 0
+
+def encode_cursor(key: str, offset: int) -> str:
+    return base64.urlsafe_b64encode(f"{key}:{offset}".encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> tuple[str, int]:
+    """Returns the (shard key, offset) a cursor points at. Raises ValueError if it is malformed."""
+    try:
+        key, _, offset = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8").rpartition(":")
+        return key, int(offset)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"invalid cursor '{cursor}'") from e
+
+def _etag(*parts) -> str:
+    return '"' + hashlib.sha256("\n".join(map(str, parts)).encode("utf-8")).hexdigest()[:32] + '"'
+
+def _summary(post: dict) -> dict:
+    summary = {field: value for field, value in post.items() if field not in _HEAVY_FIELDS}
+    summary['fullname'] = record_fullname(post)
+    return summary
+
+class ArchiveReader:
+    """
+    Read-only view of the sharded archive shared by the server's threads.
+
+    Shards are read through a ShardCache, never through the archive's own shard
+    map, so concurrent requests do not mutate shared state. The archive is reopened
+    and the cache dropped whenever manifest.json changes, e.g. after a fetch run in
+    another process.
+    """
+
+    def __init__(self, directory: str = ARCHIVE_DIR, cache: ShardCache = None):
+        self.directory = directory
+        self.cache = cache or ShardCache()
+        self.changelog = ChangeLog(os.path.join(directory, "changes", ""))
+        self._lock = threading.Lock()
+        self._version = None
+        self._archive = None
+        self._fullnames = None
+
+    def _manifest_version(self):
+        try:
+            stat = os.stat(os.path.join(self.directory, "manifest.json"))
+            return stat.st_mtime_ns, stat.st_size
+        except FileNotFoundError:
+            return None
+
+    @property
+    def archive(self) -> ShardedArchive:
+        version = self._manifest_version()
+        with self._lock:
+            if self._archive is None or version != self._version:
+                self._archive = ShardedArchive(self.directory)
+                self.changelog = ChangeLog(self.changelog.directory) # Drops the cached head
+                self._version = version
+                self._fullnames = None
+                self.cache.clear()
+            return self._archive
+
+    def shard(self, key: str) -> list[dict]:
+        records = self.cache.get(key)
+        if records is None:
+            records = ShardedArchive._read_json(self.archive.shard_path(key), [])
+            self.cache.put(key, records)
+        return records
+
+    def shard_etag(self, key: str) -> str:
+        return self.archive.manifest["shards"].get(key, {}).get("sha256", "")
+
+    def permalink(self, fullname: str):
+        """Maps a fullname to its record's permalink, from the index alone."""
+        archive = self.archive
+        with self._lock:
+            if self._fullnames is None:
+                self._fullnames = {record_fullname({'permalink': permalink}): permalink for permalink in archive.index}
+            return self._fullnames.get(fullname)
+
+    def stats(self) -> dict:
+        """Returns the archive aggregates, read under the same lock that swaps the archive."""
+        archive = self.archive
+        with self._lock:
+            return archive.aggregates
+
+    def record(self, fullname: str):
+        """
+        Returns (payload factory, ETag) for a fullname, or (None, None) if it is not
+        archived. The ETag comes from the index and manifest alone: the shard is only
+        read when the factory is called, which returns None if the record is gone.
+        """
+        permalink = self.permalink(fullname)
+        entry = self.archive.index.get(permalink) if permalink else None
+        if entry is None:
+            return None, None
+
+        def payload():
+            return next((post for post in self.shard(entry[0]) if post['permalink'] == permalink), None)
+        return payload, _etag(self.shard_etag(entry[0]), fullname)
+
+    def changes(self, query: dict) -> tuple[dict, str]:
+        """
+        Returns the change events after sequence number 'since' (at most 'limit') and their ETag.
+
+        Raises:
+            ValueError: If a parameter is invalid.
+        """
+        since = int(query.get('since') or 0)
+        limit = int(query.get('limit') or SERVE_PAGE_SIZE)
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+        self.archive # Picks up the log's new head along with the archive
+        changelog = self.changelog
+        payload = {
+            "events": list(changelog.read(since=since, limit=limit)),
+            "first_seq": changelog.first_seq,
+            "last_seq": changelog.last_seq,
+        }
+        return payload, _etag("changes", since, limit, payload["first_seq"], payload["last_seq"])
+
+    def page(self, query: dict) -> tuple[Callable[[], dict], str]:
+        """
+        Returns a factory building one page of record summaries, and the page's ETag.
+        Shards are only read when the factory is called.
+
+        Query parameters: subreddit (comma-separated), type ('post' or 'comment'),
+        since and until (ISO dates or Unix timestamps, on date_saved), limit and
+        cursor (the next_cursor of the previous page).
+
+        Raises:
+            ValueError: If a parameter is invalid.
+        """
+        subreddits = _split(query.get('subreddit'))
+        types = _split(query.get('type'))
+        if types - {"post", "comment"}:
+            raise ValueError("type must be 'post' or 'comment'")
+        since, until = _parse_date(query.get('since')), _parse_date(query.get('until'))
+        limit = int(query.get('limit') or SERVE_PAGE_SIZE)
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+        start_key, offset = decode_cursor(query['cursor']) if query.get('cursor') else (None, 0)
+
+        archive = self.archive
+        keys = archive.shard_keys(
+            since=shard_key({'date_saved': since}) if since is not None else None,
+            until=shard_key({'date_saved': until}) if until is not None else None
+        )
+        keys = [key for key in keys if start_key is None or key >= start_key]
+        # Known before reading any shard, so polling an unchanged archive costs nothing
+        etag = _etag(*sorted(query.items()), *(self.shard_etag(key) for key in keys))
+
+        def payload():
+            items, next_cursor = [], None
+            for key in keys:
+                shard = self.shard(key)
+                for position in range(offset if key == start_key else 0, len(shard)):
+                    post = shard[position]
+                    date_saved = post.get('date_saved')
+                    if subreddits and str(post.get('subreddit', '')).lower() not in subreddits:
+                        continue
+                    if types and record_type(post) not in types:
+                        continue
+                    if since is not None and not (isinstance(date_saved, (int, float)) and date_saved >= since):
+                        continue
+                    if until is not None and not (isinstance(date_saved, (int, float)) and date_saved <= until):
+                        continue
+                    if len(items) == limit:
+                        next_cursor = encode_cursor(key, position)
+                        break
+                    items.append(_summary(post))
+                if next_cursor:
+                    break
+            return {"items": items, "next_cursor": next_cursor}
+        return payload, etag
+
+class ArchiveRequestHandler(BaseHTTPRequestHandler):
+    """
+    Routes:
+        GET /items: Paginated record summaries (see ArchiveReader.page).
+        GET /items/<fullname>: One full record, comments included.
+        GET /changes: Change-log events after ?since=<seq> (see ArchiveReader.changes).
+        GET /stats: The archive aggregates.
+    """
+
+    server_version = "reddit-fetch"
+
+    def _send(self, status: int, payload=None, etag: str = None):
+        body = b"" if payload is None else json.dumps(payload, ensure_ascii=False, default=json_default).encode("utf-8")
+        self.send_response(status)
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache") # Clients revalidate, and get 304 while unchanged
+        if payload is not None:
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_cached(self, payload_factory, etag: str):
+        """Answers 304 if the client holds etag, without calling payload_factory. A None payload is a 404."""
+        if etag in [tag.strip() for tag in self.headers.get("If-None-Match", "").split(",")]:
+            self._send(304, etag=etag)
+            return
+        payload = payload_factory()
+        if payload is None:
+            self._send(404, {"error": "not found"})
+        else:
+            self._send(200, payload, etag=etag)
+
+    def do_GET(self):
+        reader = self.server.reader
+        parts = urlsplit(self.path)
+        path = parts.path.rstrip("/")
+        query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+        try:
+            if path == "/items":
+                self._send_cached(*reader.page(query))
+            elif path.startswith("/items/"):
+                payload, etag = reader.record(unquote(path[len("/items/"):]))
+                if payload is None:
+                    self._send(404, {"error": "not found"})
+                else:
+                    self._send_cached(payload, etag)
+            elif path == "/changes":
+                changes, etag = reader.changes(query)
+                self._send_cached(lambda: changes, etag)
+            elif path == "/stats":
+                aggregates = reader.stats()
+                self._send_cached(lambda: aggregates, _etag(json.dumps(aggregates, sort_keys=True)))
+            else:
+                self._send(404, {"error": "not found"})
+        except ValueError as e:
+            self._send(400, {"error": str(e)})
+
+    def log_message(self, format, *args):
+        # Dashboards poll: request lines would flood the console
+        pass
+
+def make_server(host: str = SERVE_HOST, port: int = SERVE_PORT, directory: str = ARCHIVE_DIR) -> ThreadingHTTPServer:
+    """Builds the API server over the archive in directory. Port 0 picks a free port."""
+    server = ThreadingHTTPServer((host, port), ArchiveRequestHandler)
+    server.daemon_threads = True
+    server.reader = ArchiveReader(directory)
+    return server
+
+# Stores the background collector may touch: the archive itself is left to its writers
+BACKGROUND_GC_STORES = ("tmp", "http_cache", "link_cache", "changes", "blobs")
+
+def _collect_periodically(stop: threading.Event, interval: float):
+    while not stop.wait(interval):
+        results = collect_garbage(BACKGROUND_GC_STORES, report=False)
+        freed = sum(result["bytes"] for result in results.values())
+        if freed:
+            console.print(f"[blue]Nettoyage: {freed / 2**20:.1f} Mio récupérés.[/blue]")
+
+def serve_archive(host: str = SERVE_HOST, port: int = SERVE_PORT, directory: str = ARCHIVE_DIR, gc_interval: float = GC_INTERVAL):
+    """Serves the archive read API until interrupted, collecting garbage every gc_interval seconds if positive."""
+    server = make_server(host, port, directory)
+    stop = threading.Event()
+    if gc_interval > 0:
+        threading.Thread(target=_collect_periodically, args=(stop, gc_interval), name="gc", daemon=True).start()
+    console.print(f"[bold green]API de l'archive sur http://{host}:{server.server_address[1]}/items[/bold green] (Ctrl+C pour arrêter)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        server.server_close()
@@ -0,0 +1,160 @@
+import time
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from reddit_fetch.config import HTTP_POOL_CONNECTIONS, HTTP_POOL_MAXSIZE, HTTP_TIMEOUT, REDDIT_MAX_RPM, HTTP_CACHE, HTTP_CACHE_TTL
+from reddit_fetch.http_cache import CachingSession, ResponseCache
+
+GOOGLE_SCOPES = ("https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive")
+
+_lock = threading.Lock()
+_adapter = None
+_session = None
+_response_cache = None
+_sheets_clients = {}
+
+class _TimeoutHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter that applies a default timeout to requests sent without one."""
+
+    def __init__(self, timeout, **kwargs):
+        self.timeout = timeout
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        return super().send(request, **kwargs)
+
+class RateLimiter:
+    """Spaces calls evenly so that at most max_per_minute of them start in any minute."""
+
+    def __init__(self, max_per_minute: float):
+        self.interval = 60.0 / max_per_minute if max_per_minute > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+class _RateLimitedSession(requests.Session):
+    """Session that waits on a RateLimiter before every request."""
+
+    def __init__(self, limiter: RateLimiter):
+        super().__init__()
+        self.limiter = limiter
+
+    def request(self, *args, **kwargs):
+        self.limiter.wait()
+        return super().request(*args, **kwargs)
+
+def get_http_adapter() -> HTTPAdapter:
+    """
+    Returns the process-wide pooled adapter.
+
+    Every session built by this module mounts the same adapter, so Reddit OAuth,
+    PRAW and gspread all reuse the same keep-alive connection pools.
+    """
+    global _adapter
+    with _lock:
+        if _adapter is None:
+            _adapter = _TimeoutHTTPAdapter(
+                HTTP_TIMEOUT,
+                pool_connections=HTTP_POOL_CONNECTIONS,
+                pool_maxsize=HTTP_POOL_MAXSIZE
+            )
+        return _adapter
+
+def mount_pool(session: requests.Session) -> requests.Session:
+    """Mounts the shared pooled adapter on an existing session."""
+    adapter = get_http_adapter()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def new_session() -> requests.Session:
+    """
+    Returns a new session backed by the shared connection pool.
+
+    Used for clients that modify session-level state, such as PRAW setting its own
+    User-Agent header.
+    """
+    return mount_pool(requests.Session())
+
+def get_session() -> requests.Session:
+    """Returns the process-wide session used for plain HTTP calls such as the OAuth token endpoint."""
+    global _session
+    if _session is None:
+        session = new_session()
+        with _lock:
+            if _session is None:
+                _session = session
+    return _session
+
+def get_response_cache() -> ResponseCache:
+    """Returns the process-wide on-disk cache of Reddit API responses."""
+    global _response_cache
+    with _lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache()
+        return _response_cache
+
+def praw_requestor_kwargs(revalidate: bool = False) -> dict:
+    """
+    Returns the requestor_kwargs that make PRAW use the shared connection pool.
+
+    When HTTP_CACHE is on, listing and comment pages go through the on-disk response
+    cache; `revalidate` (used by force fetches) skips the freshness window so every
+    cached page is at least revalidated. When REDDIT_MAX_RPM is set, requests that
+    reach the network are paced by a rate limiter. Each account of a multi-account
+    run lives in its own process, so every account gets its own limiter.
+    """
+    limiter = RateLimiter(REDDIT_MAX_RPM) if REDDIT_MAX_RPM > 0 else None
+    if HTTP_CACHE:
+        session = CachingSession(get_response_cache(), ttl=0 if revalidate else HTTP_CACHE_TTL, limiter=limiter)
+    elif limiter is not None:
+        session = _RateLimitedSession(limiter)
+    else:
+        session = requests.Session()
+    return {"session": mount_pool(session), "timeout": HTTP_TIMEOUT}
+
+def get_sheets_client(credentials_path: str):
+    """
+    Returns an authorized gspread client for a service account key file.
+
+    Clients are cached per process, so repeated exports skip credential loading and
+    auth setup. The client's AuthorizedSession is mounted on the shared pool.
+    """
+    import gspread
+    from google.oauth2 import service_account
+
+    with _lock:
+        client = _sheets_clients.get(credentials_path)
+    if client is not None:
+        return client
+
+    creds = service_account.Credentials.from_service_account_file(credentials_path, scopes=list(GOOGLE_SCOPES))
+    client = gspread.authorize(creds)
+    mount_pool(client.http_client.session)
+    client.set_timeout(HTTP_TIMEOUT)
+    with _lock:
+        _sheets_clients[credentials_path] = client
+    return client
+
+def close_sessions():
+    """Closes pooled connections and drops cached clients."""
+    global _adapter, _session
+    with _lock:
+        if _session is not None:
+            _session.close()
+        if _adapter is not None:
+            _adapter.close()
+        _adapter = None
+        _session = None
+        _sheets_clients.clear()
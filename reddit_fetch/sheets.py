@@ -0,0 +1,191 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from rich.console import Console
+from rich.progress import Progress
+from reddit_fetch.config import GOOGLE_SHEET_WORKERS
+
+console = Console()
+
+SHEET_HEADERS = ['Title', 'Score', 'Subreddit', 'Reddit Link', 'External URL', 'Date Saved', 'Self Text', 'Comments Count', 'Combined Content']
+SHEET_LAYOUTS = ("single", "year", "subreddit")
+
+OVERFLOW_SHEET = "Overflow"
+OVERFLOW_HEADERS = ['Reddit Link', 'Field', 'Part', 'Text']
+OVERFLOW_FIELDS = ('selftext', 'combined_content')
+CELL_TEXT_LIMIT = 4999 # Characters kept in a data sheet cell
+OVERFLOW_CHUNK = 45000 # Google Sheets caps a cell at 50,000 characters
+WRITE_BATCH_ROWS = 500 # Rows per update request when rewriting a worksheet
+
+def _truncate(text: str, overflow: bool) -> str:
+    if len(text) <= CELL_TEXT_LIMIT:
+        return text
+    if not overflow:
+        return text[:CELL_TEXT_LIMIT]
+    marker = f" […] ({len(text)} caractères, texte complet dans '{OVERFLOW_SHEET}')"
+    return text[:CELL_TEXT_LIMIT - len(marker)] + marker
+
+def sheet_row(post: dict, overflow: bool = False) -> list:
+    """
+    Builds the worksheet row for a post.
+
+    Long 'Self Text' and 'Combined Content' cells are cut to CELL_TEXT_LIMIT
+    characters. With overflow=True the cut is marked and the full text is expected
+    in the overflow worksheet.
+    """
+    date_saved = post.get('date_saved', '')
+    if isinstance(date_saved, (int, float)): # Assuming timestamp
+        date_saved = datetime.fromtimestamp(date_saved).strftime('%Y-%m-%d %H:%M:%S')
+
+    return [
+        post.get('title', ''),
+        post.get('score', ''),
+        post.get('subreddit', ''),
+        post.get('permalink', ''),
+        post.get('url', ''),
+        date_saved,
+        _truncate(str(post.get('selftext', '')), overflow),
+        post.get('num_comments', ''),
+        _truncate(str(post.get('combined_content', '')), overflow)
+    ]
+
+def overflow_rows(posts_data: list[dict]) -> list[list]:
+    """Returns the overflow worksheet rows holding the full text of every cut cell."""
+    rows = []
+    for post in posts_data:
+        for field in OVERFLOW_FIELDS:
+            text = str(post.get(field, ''))
+            if len(text) <= CELL_TEXT_LIMIT:
+                continue
+            for part, start in enumerate(range(0, len(text), OVERFLOW_CHUNK)):
+                rows.append([post.get('permalink', ''), field, part, text[start:start + OVERFLOW_CHUNK]])
+    return rows
+
+def update_worksheet(worksheet, posts_data: list[dict], changed: list[int], overflow: bool = False) -> bool:
+    """
+    Brings a worksheet up to date by rewriting only changed rows and appending new ones.
+
+    The sheet mirrors the order of posts_data, so position p lives on row p + 2.
+    Returns False, leaving the sheet untouched, when the sheet's Reddit Link column
+    does not match the start of posts_data; the caller then rewrites it fully.
+    """
+    sheet_links = worksheet.col_values(SHEET_HEADERS.index('Reddit Link') + 1)
+    if not sheet_links or sheet_links[0] != 'Reddit Link' or len(sheet_links) - 1 > len(posts_data):
+        return False
+    exported = len(sheet_links) - 1
+    if any(link != post.get('permalink', '') for link, post in zip(sheet_links[1:], posts_data)):
+        return False
+
+    updates = [
+        {"range": f"A{position + 2}:I{position + 2}", "values": [sheet_row(posts_data[position], overflow)]}
+        for position in changed if position < exported
+    ]
+    if updates:
+        worksheet.batch_update(updates)
+    new_rows = [sheet_row(post, overflow) for post in posts_data[exported:]]
+    if new_rows:
+        worksheet.append_rows(new_rows)
+    console.print(f"[bold green]Succès:[/bold green] {worksheet.title}: {len(updates)} lignes modifiées et {len(new_rows)} lignes ajoutées.")
+    return True
+
+def sheet_title(post: dict, layout: str) -> str:
+    """Returns the worksheet a post belongs to under a 'year' or 'subreddit' layout."""
+    if layout == "year":
+        date_saved = post.get('date_saved')
+        if isinstance(date_saved, (int, float)):
+            return str(datetime.fromtimestamp(date_saved, tz=timezone.utc).year)
+        return "Sans date"
+    return str(post.get('subreddit') or "Sans subreddit")
+
+def _rewrite_worksheet(worksheet, rows: list[list], advance):
+    """Clears a worksheet, sizes its grid to the rows and writes them in batches."""
+    worksheet.clear()
+    worksheet.resize(rows=max(len(rows), 1), cols=len(rows[0]))
+    for start in range(0, len(rows), WRITE_BATCH_ROWS):
+        batch = rows[start:start + WRITE_BATCH_ROWS]
+        worksheet.update(range_name=f"A{start + 1}", values=batch)
+        advance(len(batch) - (1 if start == 0 else 0))
+    worksheet.format('1:1', {'textFormat': {'bold': True}})
+
+def export_sharded(spreadsheet, posts_data: list[dict], layout: str, changed: list[int] = None) -> bool:
+    """
+    Spreads the archive over one worksheet per year or subreddit.
+
+    Worksheets are created on demand and written concurrently by
+    GOOGLE_SHEET_WORKERS threads, each with its own progress bar. Every worksheet is
+    updated in place when it still mirrors its posts, and rewritten otherwise. Text
+    cells longer than CELL_TEXT_LIMIT are cut and their full text is written, in
+    chunks, to the OVERFLOW_SHEET worksheet keyed by Reddit link.
+
+    Args:
+        spreadsheet: An opened gspread Spreadsheet.
+        posts_data: Archive records in archive order.
+        layout: 'year' or 'subreddit'.
+        changed: Archive positions whose content changed since the last export.
+
+    Returns:
+        True if every worksheet was written, False otherwise.
+    """
+    if layout not in SHEET_LAYOUTS[1:]:
+        console.print(f"[bold red]Erreur:[/bold red] GOOGLE_SHEET_LAYOUT '{layout}' inconnu. Choisissez parmi: {', '.join(SHEET_LAYOUTS)}", style="bold red")
+        return False
+
+    # Group posts by worksheet, keeping archive order and mapping changed positions
+    changed_set = set(changed or ())
+    groups = {}
+    for position, post in enumerate(posts_data):
+        posts, local_changed = groups.setdefault(sheet_title(post, layout), ([], []))
+        if position in changed_set:
+            local_changed.append(len(posts))
+        posts.append(post)
+    overflow = overflow_rows(posts_data)
+
+    # Create missing worksheets up front, sequentially: sheet creation is not safe to race
+    worksheets = {worksheet.title: worksheet for worksheet in spreadsheet.worksheets()}
+    for title, (posts, _) in sorted(groups.items()):
+        if title not in worksheets:
+            worksheets[title] = spreadsheet.add_worksheet(title=title, rows=len(posts) + 1, cols=len(SHEET_HEADERS))
+            console.print(f"[bold green]Succès:[/bold green] Feuille de travail '{title}' créée.")
+    if overflow and OVERFLOW_SHEET not in worksheets:
+        worksheets[OVERFLOW_SHEET] = spreadsheet.add_worksheet(title=OVERFLOW_SHEET, rows=len(overflow) + 1, cols=len(OVERFLOW_HEADERS))
+
+    # The overflow sheet is rebuilt whenever its keys moved or a changed post overflows
+    overflow_keys = [(row[0], row[1], str(row[2])) for row in overflow]
+    changed_links = {posts_data[position].get('permalink') for position in changed_set if position < len(posts_data)}
+    rewrite_overflow = False
+    if OVERFLOW_SHEET in worksheets:
+        existing = worksheets[OVERFLOW_SHEET].get_values("A:C")
+        existing_keys = [tuple(str(value) for value in row) for row in existing[1:]]
+        rewrite_overflow = (changed is None or existing_keys != overflow_keys
+                            or any(key[0] in changed_links for key in overflow_keys))
+
+    with Progress(console=console) as progress:
+        def write_data_sheet(title):
+            posts, local_changed = groups[title]
+            task = progress.add_task(f"Feuille '{title}'", total=len(posts))
+            worksheet = worksheets[title]
+            if changed is not None and update_worksheet(worksheet, posts, local_changed, overflow=True):
+                progress.update(task, completed=len(posts))
+                return
+            rows = [SHEET_HEADERS] + [sheet_row(post, overflow=True) for post in posts]
+            _rewrite_worksheet(worksheet, rows, lambda count: progress.advance(task, count))
+
+        def write_overflow_sheet():
+            task = progress.add_task(f"Feuille '{OVERFLOW_SHEET}'", total=len(overflow))
+            _rewrite_worksheet(worksheets[OVERFLOW_SHEET], [OVERFLOW_HEADERS] + overflow, lambda count: progress.advance(task, count))
+
+        jobs = {title: (write_data_sheet, title) for title in groups}
+        if rewrite_overflow:
+            jobs[OVERFLOW_SHEET] = (write_overflow_sheet,)
+
+        with ThreadPoolExecutor(max_workers=max(GOOGLE_SHEET_WORKERS, 1), thread_name_prefix="sheet") as pool:
+            futures = {title: pool.submit(*job) for title, job in jobs.items()}
+        failed = []
+        for title, future in futures.items():
+            try:
+                future.result()
+            except Exception as e:
+                console.print(f"[bold red]Erreur sur la feuille '{title}':[/bold red] {e}", style="bold red")
+                failed.append(title)
+
+    console.print(f"[bold green]Succès:[/bold green] {len(posts_data)} posts répartis sur {len(groups)} feuilles ({len(overflow)} blocs de texte dans '{OVERFLOW_SHEET}').")
+    return not failed
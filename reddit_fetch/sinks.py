@@ -0,0 +1,270 @@
+import os
+import html
+import queue
+import threading
+from datetime import datetime
+from functools import partial
+from typing import Callable, Iterable, Iterator
+from rich.console import Console
+from reddit_fetch.config import DATA_DIR, SINK_QUEUE_SIZE
+from reddit_fetch.serialization import ParallelEncoder, encode_json_record
+
+console = Console()
+
+OUTPUT_HTML = f"{DATA_DIR}saved_posts.html"
+
+_SENTINEL = object()
+
+def write_json_stream(records: Iterable[dict], path: str, encoder: ParallelEncoder = None) -> int:
+    """
+    Streams records to path as a JSON array, encoded in parallel chunks by encoder
+    (a ParallelEncoder with the EXPORT_* settings if None) and written in order.
+
+    The output is byte-identical to json.dump(list(records), f, indent=4) whatever
+    the number of workers. It is written to a temporary file and atomically renamed
+    over path.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    count = 0
+    with open(tmp_path, "w", encoding="utf-8") as f, (encoder or ParallelEncoder()) as encoder:
+        f.write("[")
+        for encoded in encoder.map(encode_json_record, records):
+            f.write("\n" if count == 0 else ",\n")
+            f.write(encoded)
+            count += 1
+        f.write("\n]" if count else "]")
+    os.replace(tmp_path, path)
+    return count
+
+def write_json_from_shards(archive, path: str):
+    """
+    Writes the whole archive to path as a JSON array by splicing its shard files.
+
+    A shard holds json.dumps(records, indent=4), in which every record is laid out
+    exactly as in the single-file array, so the shards' bodies are concatenated
+    without decoding or encoding any record: the run's commit was the only
+    serialization. The output is byte-identical to write_json_stream over
+    archive.iter_records().
+
+    Returns:
+        The number of records written, or None if a shard is not in the expected
+        layout, in which case path is left untouched.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    count = 0
+    with open(tmp_path, "wb") as f:
+        f.write(b"[")
+        for key in archive.shard_keys():
+            if not os.path.exists(archive.shard_path(key)):
+                continue
+            with open(archive.shard_path(key), "rb") as shard:
+                payload = shard.read()
+            if payload == b"[]":
+                continue
+            if not (payload.startswith(b"[\n    {") and payload.endswith(b"}\n]")):
+                f.close()
+                os.remove(tmp_path)
+                return None
+            f.write(payload[1:-2] if count == 0 else b"," + payload[1:-2])
+            count += archive.manifest["shards"].get(key, {}).get("count", 0)
+        f.write(b"\n]" if count else b"]")
+    os.replace(tmp_path, path)
+    return count
+
+_HTML_HEAD = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>Reddit Saved Posts</title>
+<style>
+body { font-family: -apple-system, Segoe UI, Helvetica, Arial, sans-serif; background: #dae0e6; margin: 0; padding: 20px; }
+.post { background: #fff; border: 1px solid #ccc; border-radius: 4px; margin: 0 auto 12px; max-width: 860px; padding: 12px 16px; }
+.meta { color: #787c7e; font-size: 12px; }
+.post h2 { font-size: 18px; margin: 6px 0; }
+.post h2 a { color: #222; text-decoration: none; }
+.selftext { white-space: pre-wrap; font-size: 14px; }
+</style>
+</head>
+<body>
+"""
+
+def _render_html_post(post: dict) -> str:
+    date_saved = post.get('date_saved', '')
+    if isinstance(date_saved, (int, float)):
+        date_saved = datetime.fromtimestamp(date_saved).strftime('%Y-%m-%d %H:%M:%S')
+    selftext = post.get('selftext') or ''
+    return (
+        '<div class="post">\n'
+        f'<div class="meta">r/{html.escape(str(post.get("subreddit", "")))} · {post.get("score", "")} points · {html.escape(str(date_saved))}</div>\n'
+        f'<h2><a href="{html.escape(str(post.get("permalink", "")))}">{html.escape(str(post.get("title", "")))}</a></h2>\n'
+        f'<div class="meta"><a href="{html.escape(str(post.get("url", "")))}">{html.escape(str(post.get("url", "")))}</a></div>\n'
+        + (f'<div class="selftext">{html.escape(selftext)}</div>\n' if selftext else '')
+        + '</div>\n'
+    )
+
+_HTML_FIELDS = ('date_saved', 'selftext', 'subreddit', 'score', 'permalink', 'title', 'url')
+
+def _html_view(post: dict) -> dict:
+    # Workers only receive what _render_html_post reads: comments never cross the pipe
+    return {field: post[field] for field in _HTML_FIELDS if field in post}
+
+def write_html_stream(records: Iterable[dict], path: str, encoder: ParallelEncoder = None) -> int:
+    """Streams records to path as a self-contained HTML page, rendered in parallel chunks by encoder."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    count = 0
+    with open(tmp_path, "w", encoding="utf-8") as f, (encoder or ParallelEncoder()) as encoder:
+        f.write(_HTML_HEAD)
+        for rendered in encoder.map(_render_html_post, map(_html_view, records)):
+            f.write(rendered)
+            count += 1
+        f.write("</body>\n</html>\n")
+    os.replace(tmp_path, path)
+    return count
+
+def _json_sink(records: Iterable[dict], archive=None) -> bool:
+    from reddit_fetch.api import OUTPUT_JSON
+    # Records already encoded in the committed shards are not encoded a second time
+    count = write_json_from_shards(archive, OUTPUT_JSON) if archive is not None and archive.clean else None
+    if count is None:
+        count = write_json_stream(records, OUTPUT_JSON)
+    console.print(f"[bold green]Succès:[/bold green] {count} posts écrits dans {OUTPUT_JSON}.")
+    return True
+
+def _html_sink(records: Iterable[dict]) -> bool:
+    count = write_html_stream(records, OUTPUT_HTML)
+    console.print(f"[bold green]Succès:[/bold green] {count} posts écrits dans {OUTPUT_HTML}.")
+    return True
+
+def _google_sheet_sink(records: Iterable[dict], changed: list[int] = None) -> bool:
+    from reddit_fetch.api import export_to_google_sheet
+    # Rows are addressed by archive position, so the records are gathered first
+    rows = list(records)
+    spreadsheet_name = os.getenv("GOOGLE_SHEET_NAME")
+    if not spreadsheet_name:
+        console.print("[bold red]Erreur:[/bold red] GOOGLE_SHEET_NAME n'est pas défini dans .env. Impossible d'exporter vers Google Sheet.", style="bold red")
+        return False
+    return export_to_google_sheet(rows, spreadsheet_name, changed=changed)
+
+def _parquet_sink(records: Iterable[dict], reset: bool = False) -> bool:
+    from reddit_fetch.columnar import export_to_parquet
+    return export_to_parquet(records, reset=reset)
+
+SINKS = {
+    "json": _json_sink,
+    "html": _html_sink,
+    "google_sheet": _google_sheet_sink,
+    "parquet": _parquet_sink,
+}
+
+def parse_formats(format: str) -> list[str]:
+    """
+    Splits a comma-separated OUTPUT_FORMAT value such as 'json,html,google_sheet'.
+
+    Raises:
+        ValueError: If a format is not a known sink.
+    """
+    formats = []
+    for name in format.split(","):
+        name = name.strip().lower()
+        if not name:
+            continue
+        if name not in SINKS:
+            raise ValueError(f"Unknown output format '{name}'. Choose from: {', '.join(SINKS)}")
+        if name not in formats:
+            formats.append(name)
+    return formats
+
+class _SinkWorker:
+    """Runs one sink in its own thread, fed through a bounded queue."""
+
+    def __init__(self, name: str, consume: Callable[[Iterable[dict]], bool], maxsize: int):
+        self.name = name
+        self.consume = consume
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.result = False
+        self._closed = False
+        self.thread = threading.Thread(target=self._run, name=f"sink-{name}", daemon=True)
+
+    def _records(self) -> Iterator[dict]:
+        while True:
+            record = self.queue.get()
+            if record is _SENTINEL:
+                self._closed = True
+                return
+            yield record
+
+    def _run(self):
+        try:
+            self.result = bool(self.consume(self._records()))
+        except Exception as e:
+            console.print(f"[bold red]Erreur dans l'export {self.name}:[/bold red] {e}", style="bold red")
+            self.result = False
+        finally:
+            # A sink that stops early must keep draining, or the producer would block on a full queue
+            while not self._closed:
+                if self.queue.get() is _SENTINEL:
+                    self._closed = True
+
+class SinkPipeline:
+    """
+    Fans records out to several export sinks at once.
+
+    Each sink gets its own bounded queue and worker thread, so a slow sink (Google
+    Sheets I/O) never holds up the others; the producer only blocks when a queue is
+    full.
+    """
+
+    def __init__(self, sinks: dict[str, Callable[[Iterable[dict]], bool]], maxsize: int = SINK_QUEUE_SIZE):
+        self.workers = [_SinkWorker(name, consume, maxsize) for name, consume in sinks.items()]
+
+    def __enter__(self):
+        for worker in self.workers:
+            worker.thread.start()
+        return self
+
+    def put(self, record: dict):
+        for worker in self.workers:
+            worker.queue.put(record)
+
+    def close(self) -> dict[str, bool]:
+        """Signals end of stream, waits for every sink and returns their success flags."""
+        for worker in self.workers:
+            worker.queue.put(_SENTINEL)
+        for worker in self.workers:
+            worker.thread.join()
+        return {worker.name: worker.result for worker in self.workers}
+
+    def __exit__(self, exc_type, exc, tb):
+        if any(worker.thread.is_alive() for worker in self.workers):
+            self.close()
+
+def export_to_sinks(records: Iterable[dict], formats: list[str], reset: bool = False, changed: list[int] = None, archive=None) -> dict[str, bool]:
+    """
+    Streams records once through every requested export format concurrently.
+
+    Args:
+        records: Archive records, consumed once.
+        formats: Sink names, as returned by parse_formats.
+        reset: Passed to sinks that update incrementally (parquet) to rebuild from scratch.
+        changed: Archive positions whose content changed. Google Sheets rewrites only
+                 those rows; parquet rewrites the months whose records changed.
+        archive: The committed ShardedArchive the records come from, if they are the
+                 whole archive. The json sink then splices its shard files.
+
+    Returns:
+        A dictionary mapping each format to True if its export succeeded.
+    """
+    sinks = {name: SINKS[name] for name in formats}
+    if "parquet" in sinks:
+        sinks["parquet"] = partial(_parquet_sink, reset=reset)
+    if "google_sheet" in sinks:
+        sinks["google_sheet"] = partial(_google_sheet_sink, changed=changed)
+    if "json" in sinks:
+        sinks["json"] = partial(_json_sink, archive=archive)
+    with SinkPipeline(sinks) as pipeline:
+        for record in records:
+            pipeline.put(record)
+        return pipeline.close()
@@ -0,0 +1,179 @@
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import zip_longest
+from urllib.parse import urlsplit
+from rich.console import Console
+from reddit_fetch.config import (
+    DATA_DIR, HTTP_TIMEOUT, LINK_CACHE_MAX_BYTES, SNAPSHOT_WORKERS, SNAPSHOT_DOMAIN_DELAY, SNAPSHOT_MAX_BYTES, SNAPSHOT_RETRIES
+)
+from reddit_fetch.http_cache import CachingSession, ResponseCache
+from reddit_fetch.sessions import RateLimiter, mount_pool
+from reddit_fetch.storage import write_bytes_atomic
+
+console = Console()
+
+BLOB_DIR = f"{DATA_DIR}blobs/"
+LINK_CACHE_DIR = f"{DATA_DIR}link_cache/"
+SNAPSHOT_USER_AGENT = "Mozilla/5.0 (compatible; reddit-fetch link snapshotter)"
+_CHUNK_BYTES = 64 * 1024
+
+# Targets that are Reddit itself: the post already holds their content
+_REDDIT_HOSTS = ("reddit.com", "redd.it", "redditmedia.com")
+
+class BlobStore:
+    """
+    Content-addressed store of fetched pages.
+
+    A blob lives at <directory>/<first two hex digits>/<sha256 hex>, so identical
+    pages saved from different posts are stored once.
+    """
+
+    def __init__(self, directory: str = BLOB_DIR):
+        self.directory = directory
+
+    def path(self, digest: str) -> str:
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def put(self, content: bytes) -> str:
+        """Stores content if it is not stored yet. Returns its 'sha256:<hex>' reference."""
+        digest = hashlib.sha256(content).hexdigest()
+        path = self.path(digest)
+        if os.path.exists(path):
+            os.utime(path) # Referenced again: keep garbage collection off it until the archive is committed
+        else:
+            write_bytes_atomic(path, content)
+        return f"sha256:{digest}"
+
+    def get(self, reference: str) -> bytes:
+        with open(self.path(reference.split(":", 1)[1]), "rb") as f:
+            return f.read()
+
+def needs_snapshot(post: dict) -> bool:
+    """Tells whether a post links outside Reddit and has no snapshot yet, or failed fewer than SNAPSHOT_RETRIES times."""
+    parts = urlsplit(str(post.get('url') or ''))
+    host = (parts.hostname or '').lower()
+    if parts.scheme not in ("http", "https") or not host:
+        return False
+    if any(host == domain or host.endswith(f".{domain}") for domain in _REDDIT_HOSTS):
+        return False
+    snapshot = post.get('snapshot')
+    return snapshot is None or ('blob' not in snapshot and snapshot.get('attempts', 0) < SNAPSHOT_RETRIES)
+
+class LinkSnapshotter:
+    """
+    Fetches external link targets with a bounded pool of worker threads.
+
+    Every worker has its own CachingSession over a shared ResponseCache, so
+    unchanged pages are revalidated rather than downloaded again. Requests to one
+    domain are spaced at least SNAPSHOT_DOMAIN_DELAY seconds apart whatever the
+    number of workers, and URLs are interleaved across domains so workers are not
+    all parked on the same slow host.
+    """
+
+    def __init__(self, blobs: BlobStore = None, cache: ResponseCache = None, workers: int = SNAPSHOT_WORKERS,
+                 domain_delay: float = SNAPSHOT_DOMAIN_DELAY, max_bytes: int = SNAPSHOT_MAX_BYTES):
+        self.blobs = blobs or BlobStore()
+        self.cache = cache or ResponseCache(LINK_CACHE_DIR, LINK_CACHE_MAX_BYTES)
+        self.workers = max(workers, 1)
+        self.domain_delay = domain_delay
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._limiters = {}
+        self._lock = threading.Lock()
+
+    def _limiter(self, domain: str) -> RateLimiter:
+        with self._lock:
+            if domain not in self._limiters:
+                self._limiters[domain] = RateLimiter(60.0 / self.domain_delay if self.domain_delay > 0 else 0)
+            return self._limiters[domain]
+
+    def _session(self) -> CachingSession:
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = mount_pool(CachingSession(self.cache))
+            session.headers["User-Agent"] = SNAPSHOT_USER_AGENT
+            self._local.session = session
+        return session
+
+    def fetch(self, url: str) -> dict:
+        """Fetches one URL into the blob store. Returns the snapshot description."""
+        session = self._session()
+        session.limiter = self._limiter((urlsplit(url).hostname or '').lower()) # Only network requests wait
+        fetched_at = time.time()
+        try:
+            # Streamed so oversized pages are dropped before they are downloaded or cached
+            with session.get(url, timeout=HTTP_TIMEOUT, allow_redirects=True, stream=True) as response:
+                if response.status_code != 200:
+                    return {"error": f"HTTP {response.status_code}", "fetched_at": fetched_at}
+                declared = response.headers.get("Content-Length", "")
+                if declared.isdigit() and int(declared) > self.max_bytes:
+                    return {"error": f"{declared} bytes exceeds SNAPSHOT_MAX_BYTES", "fetched_at": fetched_at}
+                content = bytearray()
+                for chunk in response.iter_content(_CHUNK_BYTES):
+                    content += chunk
+                    if len(content) > self.max_bytes:
+                        return {"error": f"over {self.max_bytes} bytes exceeds SNAPSHOT_MAX_BYTES", "fetched_at": fetched_at}
+                content = bytes(content)
+                session.store(response, content)
+            return {
+                "blob": self.blobs.put(content),
+                "url": response.url,
+                "content_type": response.headers.get("Content-Type", ""),
+                "bytes": len(content),
+                "fetched_at": fetched_at
+            }
+        except Exception as e:
+            return {"error": str(e) or type(e).__name__, "fetched_at": fetched_at}
+
+    def fetch_all(self, urls) -> dict[str, dict]:
+        """Fetches distinct URLs concurrently. Returns a dictionary mapping each URL to its snapshot."""
+        by_domain = OrderedDict()
+        for url in dict.fromkeys(urls):
+            by_domain.setdefault((urlsplit(url).hostname or '').lower(), []).append(url)
+        ordered = [url for batch in zip_longest(*by_domain.values()) for url in batch if url is not None]
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="snapshot") as pool:
+            return dict(zip(ordered, pool.map(self.fetch, ordered)))
+
+def snapshot_archive(archive, permalinks: list[str] = None, snapshotter: LinkSnapshotter = None) -> dict:
+    """
+    Snapshots the external link targets of archived posts.
+
+    Each post gets a 'snapshot' field: the blob reference, final URL, content type
+    and size on success, or the error and number of attempts on failure. Posts
+    sharing a URL share a single request.
+
+    Args:
+        archive: The open ShardedArchive. Touched shards are left dirty for its commit.
+        permalinks: Posts to consider. None considers the whole archive.
+        snapshotter: The fetcher to use. Built from the SNAPSHOT_* settings if None.
+
+    Returns:
+        A dictionary of 'stored' and 'failed' counts.
+    """
+    if permalinks is None:
+        # iter_records() lets go of clean shards: edits must go to the records get() keeps
+        permalinks = [post['permalink'] for post in archive.iter_records() if needs_snapshot(post)]
+    posts = [post for post in (archive.get(permalink) for permalink in permalinks) if post and needs_snapshot(post)]
+    counts = {"stored": 0, "failed": 0}
+    if not posts:
+        return counts
+
+    started = time.perf_counter()
+    snapshotter = snapshotter or LinkSnapshotter()
+    snapshots = snapshotter.fetch_all(post['url'] for post in posts)
+    for post in posts:
+        snapshot = dict(snapshots[post['url']])
+        if 'error' in snapshot:
+            snapshot['attempts'] = (post.get('snapshot') or {}).get('attempts', 0) + 1
+            counts["failed"] += 1
+        else:
+            counts["stored"] += 1
+        post['snapshot'] = snapshot
+        archive.touch(post['permalink'])
+
+    console.print(f"[bold blue]Liens: {counts['stored']} pages archivées, {counts['failed']} échecs en {time.perf_counter() - started:.1f}s.[/bold blue]")
+    return counts
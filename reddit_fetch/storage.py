@@ -0,0 +1,419 @@
+import os
+import json
+import time
+import hashlib
+import tempfile
+from datetime import datetime, timezone
+from typing import Iterable, Iterator
+from rich.console import Console
+from reddit_fetch.config import DATA_DIR
+from reddit_fetch.records import record_fullname, record_hash
+from reddit_fetch.serialization import ParallelEncoder, encode_json_array
+
+console = Console()
+
+ARCHIVE_DIR = f"{DATA_DIR}archive/"
+UNDATED_SHARD = "undated"
+
+def write_bytes_atomic(path, payload: bytes):
+    """
+    Writes payload to a temporary file and atomically renames it over path.
+
+    The temporary file name is unique, so concurrent writers of the same path
+    (e.g. two snapshots of one page) never interleave.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f"{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, 0o644) # mkstemp creates owner-only files
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+def write_json_atomic(path, data):
+    """Writes data as JSON to a temporary file and atomically renames it over path."""
+    write_bytes_atomic(path, json.dumps(data, indent=4).encode("utf-8"))
+
+def shard_key(post: dict) -> str:
+    """
+    Returns the month shard ('YYYY-MM', UTC) a record belongs to.
+
+    Reddit does not expose when an item was saved, so 'date_saved' holds the item's
+    creation time and shards follow it.
+    """
+    date_saved = post.get('date_saved')
+    if isinstance(date_saved, (int, float)):
+        return datetime.fromtimestamp(date_saved, tz=timezone.utc).strftime("%Y-%m")
+    return UNDATED_SHARD
+
+def _empty_totals() -> dict:
+    return {"count": 0, "score": 0, "comments": 0}
+
+def _empty_aggregates() -> dict:
+    return {"total": _empty_totals(), "subreddits": {}, "months": {}}
+
+def _apply_aggregates(aggregates: dict, post: dict, sign: int):
+    """Adds (sign=1) or subtracts (sign=-1) a record's contribution to the aggregates."""
+    score = post.get('score')
+    score = score if isinstance(score, int) and not isinstance(score, bool) else 0
+    comments = len(post.get('comments') or ())
+    buckets = (
+        (aggregates, "total"),
+        (aggregates["subreddits"], post.get('subreddit') or ""),
+        (aggregates["months"], shard_key(post)),
+    )
+    for table, key in buckets:
+        totals = table.setdefault(key, _empty_totals())
+        totals["count"] += sign
+        totals["score"] += sign * score
+        totals["comments"] += sign * comments
+        if totals["count"] <= 0 and key != "total":
+            del table[key]
+
+class ShardedArchive:
+    """
+    The saved-posts archive, stored as one JSON file per saved month.
+
+    data/archive/ holds YYYY-MM.json shards, a manifest.json with each shard's record
+    count, byte size and SHA-256, and an index.json mapping every permalink to its
+    shard, content hash and reconciliation status. Only the shards a caller touches
+    are read, and only shards that gained or changed records are rewritten on
+    commit, so older shards stay byte-for-byte identical across runs.
+
+    The manifest also holds aggregates (post count, score sum and archived comment
+    count per subreddit, per month and overall), kept up to date as records are
+    inserted, replaced or removed, so statistics never require a scan.
+
+    Archive order is shard order (oldest month first), then insertion order.
+
+    With a changelog (a ChangeLog), each commit also appends one event per record
+    inserted, updated, unsaved, deleted or restored since the previous commit.
+    """
+
+    def __init__(self, directory: str = ARCHIVE_DIR, changelog=None):
+        self.directory = directory
+        self.changelog = changelog
+        self.manifest_path = os.path.join(directory, "manifest.json")
+        self.index_path = os.path.join(directory, "index.json")
+        self.manifest = self._read_json(self.manifest_path, {"version": 1, "shards": {}, "aggregates": _empty_aggregates()})
+        self._index = None # permalink -> [shard, content_hash], read on first use
+        self._shards = {} # Loaded shards: key -> list of records
+        self._dirty = set()
+        self._manifest_dirty = False
+        self._changes = [] # Change events awaiting the next commit
+        self._change_positions = {} # permalink -> its latest event in _changes
+
+    @property
+    def index(self) -> dict:
+        if self._index is None:
+            self._index = self._read_json(self.index_path, {})
+            stale = self._stale_shards()
+            if stale:
+                self._recover_index(stale)
+        return self._index
+
+    def _shard_files(self) -> list[str]:
+        """The keys of the shard files on disk."""
+        if not os.path.isdir(self.directory):
+            return []
+        keys = (name[:-5] for name in os.listdir(self.directory) if name.endswith(".json"))
+        return [key for key in keys if key == UNDATED_SHARD or (len(key) == 7 and key[4] == "-" and key.replace("-", "").isdigit())]
+
+    def _stale_shards(self) -> set[str]:
+        """
+        Returns the shard files written after the index and manifest, i.e. by a
+        commit that died before completing. Inserting or removing a record always
+        changes a shard's byte size, so comparing it with the manifest is enough.
+        """
+        stale = set()
+        for key in self._shard_files():
+            meta = self.manifest["shards"].get(key)
+            if meta is None or os.path.getsize(self.shard_path(key)) != meta.get("bytes"):
+                stale.add(key)
+        return stale
+
+    def _recover_index(self, stale: set[str]):
+        """
+        Rebuilds the index from the shard files after an interrupted commit, keeping
+        the last copy of any record a replayed commit archived twice. Recovered
+        records are logged as inserts, which may repeat events the interrupted
+        commit already appended. The repair is written by the next commit.
+        """
+        previous, self._index = self._index, {}
+        for key in sorted(set(self.manifest["shards"]) | set(self._shard_files())):
+            loaded = key in self._shards
+            shard = self.load_shard(key)
+            records = {post['permalink']: post for post in shard}
+            if len(records) != len(shard):
+                shard[:] = list(records.values())
+                stale.add(key)
+            for permalink, post in records.items():
+                self._index[permalink] = [key, record_hash(post)] + previous.get(permalink, [])[2:]
+                if permalink not in previous:
+                    self._log("insert", permalink, self._index[permalink])
+            if key in stale:
+                self._dirty.add(key) # Refreshes its manifest entry on commit
+            elif not loaded:
+                del self._shards[key]
+        self.manifest.pop("aggregates", None) # Rebuilt by the next scan
+        self._manifest_dirty = True
+        console.print(f"[yellow]Archive: commit interrompu détecté, index reconstruit ({len(stale)} shards réparés).[/yellow]")
+
+    @property
+    def aggregates(self) -> dict:
+        """Per-subreddit, per-month and overall totals. Built by one scan for archives predating them."""
+        if "aggregates" not in self.manifest:
+            aggregates = _empty_aggregates()
+            for post in self.iter_records():
+                _apply_aggregates(aggregates, post, 1)
+            self.manifest["aggregates"] = aggregates
+            self._manifest_dirty = True
+        return self.manifest["aggregates"]
+
+    @staticmethod
+    def _read_json(path, default):
+        if not os.path.exists(path):
+            return default
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    @property
+    def clean(self) -> bool:
+        """True when every change has been committed, so the shard files match the records."""
+        return not self._dirty and not self._changes
+
+    @property
+    def exists(self) -> bool:
+        return os.path.exists(self.manifest_path)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __contains__(self, permalink: str) -> bool:
+        return permalink in self.index
+
+    def shard_path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def shard_keys(self, since: str = None, until: str = None) -> list[str]:
+        """Returns the shard keys, oldest first, optionally limited to a 'YYYY-MM' range (inclusive)."""
+        keys = sorted(set(self.manifest["shards"]) | set(self._shards))
+        dated = [key for key in keys if key != UNDATED_SHARD and (since is None or key >= since) and (until is None or key <= until)]
+        if UNDATED_SHARD in keys and since is None and until is None:
+            dated.append(UNDATED_SHARD)
+        return dated
+
+    def load_shard(self, key: str) -> list[dict]:
+        if key not in self._shards:
+            path = self.shard_path(key)
+            self._shards[key] = self._read_json(path, [])
+        return self._shards[key]
+
+    def iter_records(self, since: str = None, until: str = None) -> Iterator[dict]:
+        """Yields records in archive order, reading only the shards in the requested range."""
+        for key in self.shard_keys(since, until):
+            loaded = key in self._shards
+            yield from self.load_shard(key)
+            if not loaded and key not in self._dirty:
+                del self._shards[key] # Keep memory bounded to one shard while streaming
+
+    def get(self, permalink: str):
+        entry = self.index.get(permalink)
+        if entry is None:
+            return None
+        for post in self.load_shard(entry[0]):
+            if post['permalink'] == permalink:
+                return post
+        return None
+
+    def _log(self, op: str, permalink: str, entry: list):
+        if self.changelog is None:
+            return
+        event = {"op": op, "permalink": permalink, "fullname": record_fullname({'permalink': permalink}),
+                 "shard": entry[0], "content_hash": entry[1]}
+        previous = self._change_positions.get(permalink)
+        if op == "update" and previous is not None and self._changes[previous]["op"] in ("insert", "update"):
+            self._changes[previous]["content_hash"] = entry[1] # One event per record and commit
+            return
+        self._change_positions[permalink] = len(self._changes)
+        self._changes.append(event)
+
+    def upsert(self, post: dict) -> str:
+        """
+        Inserts a record or replaces it when its content hash changed.
+
+        Returns:
+            'new', 'changed' or 'unchanged'.
+        """
+        permalink = post['permalink']
+        new_hash = record_hash(post)
+        entry = self.index.get(permalink)
+        if entry is None:
+            key = shard_key(post)
+            _apply_aggregates(self.aggregates, post, 1)
+            self.load_shard(key).append(post)
+            self.index[permalink] = [key, new_hash]
+            self._dirty.add(key)
+            self._log("insert", permalink, self.index[permalink])
+            return "new"
+        if entry[1] == new_hash:
+            return "unchanged"
+        shard = self.load_shard(entry[0])
+        for position, existing in enumerate(shard):
+            if existing['permalink'] == permalink:
+                _apply_aggregates(self.aggregates, existing, -1)
+                _apply_aggregates(self.aggregates, post, 1)
+                shard[position] = post
+                break
+        entry[1:] = [new_hash] # A freshly fetched record carries no reconciliation status
+        self._dirty.add(entry[0])
+        self._log("update", permalink, entry)
+        return "changed"
+
+    def status(self, permalink: str):
+        """Returns a record's reconciliation status ('unsaved', 'deleted') from the index, or None."""
+        entry = self.index.get(permalink)
+        return entry[2] if entry is not None and len(entry) > 2 else None
+
+    def set_status(self, permalink: str, status, at: float = None) -> bool:
+        """
+        Sets or clears (status=None) a record's reconciliation status.
+
+        The status is kept in the index too, so reading it never loads a shard and
+        only records whose status actually changes dirty theirs.
+
+        Returns:
+            True if the status changed.
+        """
+        entry = self.index.get(permalink)
+        if entry is None or self.status(permalink) == status:
+            return False
+        post = self.get(permalink)
+        if status:
+            post['status'] = status
+            post['status_changed_at'] = at or time.time()
+            entry[2:] = [status]
+        else:
+            post.pop('status', None)
+            post.pop('status_changed_at', None)
+            del entry[2:]
+        self._dirty.add(entry[0])
+        self._log({"unsaved": "unsave", "deleted": "delete"}.get(status, "restore"), permalink, entry)
+        return True
+
+    def touch(self, permalink: str):
+        """Marks the shard holding a record modified in place as needing a rewrite."""
+        entry = self.index.get(permalink)
+        if entry is not None:
+            self.load_shard(entry[0])
+            self._dirty.add(entry[0])
+            self._log("update", permalink, entry)
+
+    def remove(self, permalink: str) -> bool:
+        """Drops a record from the archive. Returns False if it was not archived."""
+        entry = self.index.pop(permalink, None)
+        if entry is None:
+            return False
+        shard = self.load_shard(entry[0])
+        for post in shard:
+            if post['permalink'] == permalink:
+                _apply_aggregates(self.aggregates, post, -1)
+        shard[:] = [post for post in shard if post['permalink'] != permalink]
+        self._dirty.add(entry[0])
+        self._log("delete", permalink, entry)
+        return True
+
+    def position(self, permalink: str):
+        """Returns a record's position in archive order, or None."""
+        entry = self.index.get(permalink)
+        if entry is None:
+            return None
+        offset = 0
+        for key in self.shard_keys():
+            if key == entry[0]:
+                break
+            offset += self._shard_count(key)
+        for position, post in enumerate(self.load_shard(entry[0])):
+            if post['permalink'] == permalink:
+                return offset + position
+        return None
+
+    def _shard_count(self, key: str) -> int:
+        if key in self._shards:
+            return len(self._shards[key])
+        return self.manifest["shards"].get(key, {}).get("count", 0)
+
+    def commit(self) -> list[str]:
+        """
+        Atomically rewrites dirty shards, then appends pending change events, then
+        rewrites the index and the manifest.
+
+        Returns:
+            The keys of the shards that were rewritten.
+        """
+        rewritten = sorted(self._dirty)
+        with ParallelEncoder() as encoder: # Only spawns workers for shards of several chunks
+            for key in rewritten:
+                payload = encode_json_array(self._shards[key], encoder)
+                write_bytes_atomic(self.shard_path(key), payload)
+                self.manifest["shards"][key] = {
+                    "count": len(self._shards[key]),
+                    "bytes": len(payload),
+                    "sha256": hashlib.sha256(payload).hexdigest(),
+                    "updated_at": time.time()
+                }
+        if self._changes:
+            self.changelog.append(self._changes)
+            self._changes, self._change_positions = [], {}
+        if self._dirty or not self.exists:
+            write_json_atomic(self.index_path, self.index)
+        if self._dirty or self._manifest_dirty or not self.exists:
+            write_json_atomic(self.manifest_path, self.manifest)
+        self._dirty.clear()
+        self._manifest_dirty = False
+        return rewritten
+
+    def drop_empty_shards(self) -> tuple[int, int]:
+        """
+        Deletes the files of committed shards left without records (e.g. after
+        duplicates were merged away) and their manifest entries. Takes effect on commit.
+
+        Returns:
+            (shards dropped, bytes reclaimed).
+        """
+        dropped = freed = 0
+        for key, meta in list(self.manifest["shards"].items()):
+            if meta.get("count") or key in self._dirty:
+                continue
+            if os.path.exists(self.shard_path(key)):
+                freed += os.path.getsize(self.shard_path(key))
+                os.remove(self.shard_path(key))
+            del self.manifest["shards"][key]
+            self._shards.pop(key, None)
+            self._manifest_dirty = True
+            dropped += 1
+        return dropped, freed
+
+    def import_records(self, records: Iterable[dict]) -> int:
+        """Upserts many records and commits. Returns the number of new records."""
+        added = sum(1 for post in records if self.upsert(post) == "new")
+        self.commit()
+        return added
+
+def open_archive(directory: str = ARCHIVE_DIR, legacy_json: str = None, changelog=None) -> ShardedArchive:
+    """
+    Opens the sharded archive, migrating a legacy single-file saved_posts.json into
+    it the first time. The migration itself is not written to the changelog.
+    """
+    archive = ShardedArchive(directory)
+    if not archive.exists and legacy_json and os.path.exists(legacy_json):
+        with open(legacy_json, "r", encoding="utf-8") as f:
+            archive.import_records(json.load(f))
+    archive.changelog = changelog
+    return archive
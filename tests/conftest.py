@@ -0,0 +1,20 @@
+from datetime import datetime, timezone
+
+
+def permalink(name, subreddit="t", kind="post"):
+    return f"https://www.reddit.com/r/{subreddit}/comments/{name}/slug/" + ("c1/" if kind == "comment" else "")
+
+
+def make_post(name, year=2024, month=1, subreddit="t", kind="post", **fields):
+    """Builds an archived record saved on the 10th of the given month. Keyword arguments override its fields."""
+    post = {
+        "title": f"Post {name}",
+        "subreddit": subreddit,
+        "permalink": permalink(name, subreddit, kind),
+        "type": kind,
+        "date_saved": datetime(year, month, 10, tzinfo=timezone.utc).timestamp(),
+        "selftext": "text",
+        "comments": [],
+    }
+    post.update(fields)
+    return post
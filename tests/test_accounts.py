@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+from reddit_fetch import accounts as accounts_module
+from reddit_fetch.accounts import account_environment, fetch_accounts, load_accounts
+
+CREDENTIALS = {"client_id": "id", "client_secret": "secret", "user_agent": "agent/1.0", "username": "alice"}
+
+
+def write_manifest(tmp_path, manifest):
+    path = tmp_path / "accounts.json"
+    path.write_text(json.dumps(manifest))
+    return str(path)
+
+
+def test_load_accounts_defaults_the_token_file(tmp_path):
+    accounts = load_accounts(write_manifest(tmp_path, {"accounts": [dict(CREDENTIALS, name="alice")]}))
+    assert accounts[0]["token_file"] == f"{accounts_module.DATA_DIR}alice/tokens.json"
+
+
+@pytest.mark.parametrize("manifest, message", [
+    ({"accounts": []}, "non-empty 'accounts' list"),
+    ([dict(CREDENTIALS, name="alice")], "non-empty 'accounts' list"),
+    ({"accounts": [dict(CREDENTIALS, name="../alice")]}, "Invalid account name"),
+    ({"accounts": [dict(CREDENTIALS, name="alice"), dict(CREDENTIALS, name="alice")]}, "Duplicate account name"),
+    ({"accounts": [{"name": "alice", "client_id": "id"}]}, "missing: client_secret, user_agent, username"),
+])
+def test_load_accounts_rejects_malformed_manifests(tmp_path, manifest, message):
+    with pytest.raises(ValueError, match=message):
+        load_accounts(write_manifest(tmp_path, manifest))
+
+
+def test_account_environment_scopes_credentials_and_data_dir():
+    env = account_environment(dict(CREDENTIALS, name="alice", token_file="t.json", max_requests_per_minute=60))
+    assert env == {"CLIENT_ID": "id", "CLIENT_SECRET": "secret", "USER_AGENT": "agent/1.0", "REDDIT_USERNAME": "alice",
+                   "TOKEN_FILE": "t.json", "REDDIT_MAX_RPM": "60", "REDDIT_FETCH_DATA_DIR": f"{accounts_module.DATA_DIR}alice/"}
+
+
+class FakeProcess:
+    def __init__(self, exitcode, alive_polls=0):
+        self.exitcode = None if alive_polls else exitcode
+        self._final_exitcode = exitcode
+        self._alive_polls = alive_polls
+
+    def is_alive(self):
+        if self._alive_polls:
+            self._alive_polls -= 1
+            return True
+        self.exitcode = self._final_exitcode
+        return False
+
+    def join(self):
+        pass
+
+
+def test_summaries_of_workers_that_exit_non_zero_replace_the_crash(tmp_path, monkeypatch):
+    # a and b report then exit non-zero, c reports while still running, d dies without reporting
+    workers = {"a": (True, 1, 0), "b": (True, 1, 0), "c": (True, 0, 1), "d": (False, -9, 0)}
+
+    def start_worker(ctx, account, format, force_fetch, results):
+        reports, exitcode, alive_polls = workers[account["name"]]
+        if reports:
+            results.put({"account": account["name"], "status": "ok", "count": 2})
+        return FakeProcess(exitcode, alive_polls)
+
+    monkeypatch.setattr(accounts_module, "_start_worker", start_worker)
+    monkeypatch.setattr(accounts_module, "RUN_SUMMARY_FILE", str(tmp_path / "run_summary.json"))
+
+    summary = fetch_accounts([{"name": name} for name in workers], parallelism=4)
+
+    assert [(item["account"], item["status"]) for item in summary["accounts"]] == [
+        ("a", "ok"), ("b", "ok"), ("c", "ok"), ("d", "crashed")]
+    assert summary["total_count"] == 6
+    assert json.loads((tmp_path / "run_summary.json").read_text())["accounts"][3]["exitcode"] == -9
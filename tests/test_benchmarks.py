@@ -0,0 +1,31 @@
+from benchmarks.run import compare
+from benchmarks.stages import run_stage
+from benchmarks.synthetic import generate_records
+from reddit_fetch.sinks import write_json_stream
+
+
+def test_generator_is_deterministic():
+    first = list(generate_records(50, seed=7))
+    assert first == list(generate_records(50, seed=7))
+    assert len({post["permalink"] for post in first}) == 50
+    assert all(post["content_hash"] for post in first)
+
+
+def test_stages_run_on_a_small_archive(tmp_path, monkeypatch):
+    monkeypatch.setenv("REDDIT_FETCH_DATA_DIR", str(tmp_path)) # Restored after run_stage overrides it
+    write_json_stream(generate_records(30), str(tmp_path / "saved_posts.json"))
+
+    imported = run_stage("archive_import", str(tmp_path), 30)
+    merged = run_stage("archive_merge", str(tmp_path), 30)
+    scanned = run_stage("archive_scan", str(tmp_path), 30)
+
+    assert imported["items"] == 30
+    assert merged["items"] == 130 # 30 edited, 100 new
+    assert scanned["items"] == 130
+    assert scanned["peak_rss"] > 0
+
+
+def test_compare_reports_slowdowns_beyond_tolerance():
+    baseline = {"1000": {"export_json": {"items_per_sec": 1000, "peak_rss": 100}}}
+    assert compare({"1000": {"export_json": {"items_per_sec": 800, "peak_rss": 100}}}, baseline, 0.3) == []
+    assert len(compare({"1000": {"export_json": {"items_per_sec": 600, "peak_rss": 140}}}, baseline, 0.3)) == 2
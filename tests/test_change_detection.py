@@ -0,0 +1,92 @@
+import json
+import pytest
+from unittest.mock import patch, MagicMock
+
+from reddit_fetch import api
+from reddit_fetch.records import content_hash, record_hash
+from reddit_fetch.sheets import update_worksheet
+from reddit_fetch.storage import ShardedArchive
+
+BASE_POST = {
+    "title": "Test Post 1",
+    "url": "http://example.com/post1",
+    "selftext": "This is the selftext for post 1.",
+    "score": 100,
+    "permalink": "https://www.reddit.com/r/testsubreddit/comments/a/",
+    "comments": [
+        {"author": "commenter1", "body": "Great post!", "score": 5},
+        {"author": "commenter2", "body": "Nice one.", "score": 2}
+    ]
+}
+
+def test_hash_ignores_scores_and_comment_order():
+    reordered = dict(BASE_POST, score=250, comments=list(reversed(BASE_POST["comments"])))
+    reordered["comments"][0] = dict(reordered["comments"][0], score=40)
+    assert content_hash(reordered) == content_hash(BASE_POST)
+
+def test_hash_normalizes_whitespace_and_line_endings():
+    assert content_hash(dict(BASE_POST, selftext=" This is the selftext for post 1.\r\n")) == content_hash(BASE_POST)
+
+@pytest.mark.parametrize("edit", [
+    {"selftext": "Edited selftext."},
+    {"comments": [{"author": "commenter1", "body": "Edited comment", "score": 5}]},
+])
+def test_hash_changes_on_edits(edit):
+    assert content_hash(dict(BASE_POST, **edit)) != content_hash(BASE_POST)
+
+def test_record_hash_computes_missing_hash():
+    assert record_hash(BASE_POST) == content_hash(BASE_POST)
+    assert record_hash(dict(BASE_POST, content_hash="stored")) == "stored"
+
+def test_fetch_rewrites_only_changed_records(tmp_path):
+    data = tmp_path / "data"
+    data.mkdir()
+    unchanged = dict(BASE_POST, permalink="https://www.reddit.com/r/t/comments/u/")
+    edited = dict(BASE_POST, permalink="https://www.reddit.com/r/t/comments/e/")
+    (data / "saved_posts.json").write_text(json.dumps([unchanged, edited]))
+
+    fetched = [
+        dict(edited, selftext="Edited", content_hash=content_hash(dict(edited, selftext="Edited"))),
+        dict(unchanged, score=999, content_hash=content_hash(unchanged)),
+        dict(BASE_POST, permalink="https://www.reddit.com/r/t/comments/n/", content_hash=content_hash(BASE_POST)),
+    ]
+
+    def fake_iter(reddit, cursor, **kwargs):
+        for post in fetched:
+            cursor["seen"] += 1
+            yield post
+
+    with patch.object(api, "OUTPUT_JSON", f"{data}/saved_posts.json"), \
+         patch.object(api, "ARCHIVE_DIR", f"{data}/archive/"), \
+         patch.object(api, "LAST_FETCH_FILE", f"{data}/last_fetch.json"), \
+         patch.object(api, "FETCH_STATE_FILE", f"{data}/fetch_state.json"), \
+         patch("reddit_fetch.api.get_reddit_client", return_value=MagicMock()), \
+         patch("reddit_fetch.api.iter_saved_items", side_effect=fake_iter), \
+         patch("reddit_fetch.api.export_to_sinks", return_value={"google_sheet": True}) as sinks:
+        result = api.fetch_saved_posts(format="google_sheet", force_fetch=True)
+
+    assert result["changes"] == {"new": 1, "changed": 1, "unchanged": 1}
+    archive = list(ShardedArchive(f"{data}/archive/").iter_records())
+    assert [post["permalink"][-2] for post in archive] == ["u", "e", "n"]
+    assert archive[0]["score"] == 100 # Unchanged records are kept as archived
+    assert archive[1]["selftext"] == "Edited"
+    assert sinks.call_args.kwargs["changed"] == [1]
+
+def test_sheet_update_rewrites_changed_rows_and_appends_new():
+    posts = [dict(BASE_POST, permalink=f"link{n}") for n in range(4)]
+    worksheet = MagicMock()
+    worksheet.col_values.return_value = ["Reddit Link", "link0", "link1", "link2"]
+
+    assert update_worksheet(worksheet, posts, changed=[1])
+
+    worksheet.clear.assert_not_called()
+    (updates,), _ = worksheet.batch_update.call_args
+    assert [update["range"] for update in updates] == ["A3:I3"]
+    (appended,), _ = worksheet.append_rows.call_args
+    assert [row[3] for row in appended] == ["link3"]
+
+def test_sheet_update_falls_back_when_sheet_diverged():
+    worksheet = MagicMock()
+    worksheet.col_values.return_value = ["Reddit Link", "other"]
+    assert not update_worksheet(worksheet, [dict(BASE_POST, permalink="link0")], changed=[])
+    worksheet.batch_update.assert_not_called()
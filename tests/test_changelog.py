@@ -0,0 +1,76 @@
+import os
+
+from conftest import make_post
+from reddit_fetch import changelog as changelog_module
+from reddit_fetch.changelog import ChangeLog
+from reddit_fetch.storage import ShardedArchive, open_archive
+
+
+def ops(events):
+    return [(event["seq"], event["op"], event["fullname"]) for event in events]
+
+
+def test_commits_append_numbered_events(tmp_path):
+    log = ChangeLog(f"{tmp_path}/changes/")
+    archive = ShardedArchive(f"{tmp_path}/", changelog=log)
+    archive.upsert(make_post("a"))
+    archive.upsert(make_post("b"))
+    archive.touch(make_post("a")["permalink"]) # Folded into the insert of the same commit
+    archive.commit()
+
+    archive.upsert(make_post("a", selftext="edited"))
+    archive.upsert(make_post("b")) # Unchanged: no event
+    archive.set_status(make_post("b")["permalink"], "unsaved")
+    archive.remove(make_post("a")["permalink"])
+    archive.commit()
+
+    assert ops(ChangeLog(f"{tmp_path}/changes/").read()) == [
+        (1, "insert", "t3_a"), (2, "insert", "t3_b"), (3, "update", "t3_a"), (4, "unsave", "t3_b"), (5, "delete", "t3_a")]
+    assert ops(log.read(since=3)) == [(4, "unsave", "t3_b"), (5, "delete", "t3_a")]
+
+
+def test_migration_is_not_logged(tmp_path):
+    legacy = tmp_path / "saved_posts.json"
+    legacy.write_text('[{"title": "a", "permalink": "https://www.reddit.com/r/t/comments/a/slug/"}]')
+    log = ChangeLog(f"{tmp_path}/archive/changes/")
+    open_archive(f"{tmp_path}/archive/", legacy_json=str(legacy), changelog=log)
+    assert log.last_seq == 0
+
+
+def test_log_compacts_once_every_consumer_acknowledged(tmp_path, monkeypatch):
+    monkeypatch.setattr(changelog_module, "CHANGELOG_SEGMENT_EVENTS", 2)
+    log = ChangeLog(f"{tmp_path}/")
+    log.register("indexer", since=0)
+    log.register("search", since=0)
+    for n in range(5):
+        log.append([{"op": "insert", "fullname": f"t3_{n}"}])
+    assert [first for first, _ in log.segments()] == [1, 3, 5]
+
+    log.ack("indexer", 4)
+    assert len(log.segments()) == 3 # 'search' still needs them
+    assert [event["seq"] for event in log.pending("search")] == [1, 2, 3, 4, 5]
+
+    log.ack("search", 3)
+    assert [first for first, _ in log.segments()] == [3, 5]
+    assert log.first_seq == 3
+    assert [event["seq"] for event in log.pending("indexer")] == [5]
+
+    log.ack("search", 5)
+    assert [first for first, _ in log.segments()] == [5] # The newest segment is kept
+    assert ChangeLog(f"{tmp_path}/").last_seq == 5
+    assert os.path.exists(tmp_path / "consumers.json")
+
+
+def test_log_without_consumers_keeps_the_newest_segments(tmp_path, monkeypatch):
+    monkeypatch.setattr(changelog_module, "CHANGELOG_SEGMENT_EVENTS", 2)
+    monkeypatch.setattr(changelog_module, "CHANGELOG_RETAIN_SEGMENTS", 2)
+    log = ChangeLog(f"{tmp_path}/")
+    for n in range(7):
+        log.append([{"op": "insert", "fullname": f"t3_{n}"}])
+    assert [first for first, _ in log.segments()] == [5, 7]
+    assert [event["seq"] for event in log.read()] == [5, 6, 7]
+
+    log.register("indexer", since=7)
+    for n in range(4):
+        log.append([{"op": "insert", "fullname": f"t3_{n}"}])
+    assert [first for first, _ in log.segments()] == [7, 9, 11] # The consumer's acknowledgement governs now
@@ -0,0 +1,94 @@
+import json
+import pytest
+from unittest.mock import patch, MagicMock
+import praw
+
+from reddit_fetch import api
+from reddit_fetch.storage import ShardedArchive
+
+
+def make_submission(n, created_utc):
+    item = MagicMock()
+    item.__class__ = praw.models.Submission
+    item.title = f"Post {n}"
+    item.score = n
+    item.subreddit.display_name = "testsubreddit"
+    item.permalink = f"/r/testsubreddit/comments/{n}/"
+    item.url = f"http://example.com/{n}"
+    item.created_utc = created_utc
+    item.selftext = f"Selftext {n}"
+    item.num_comments = 0
+    item.fullname = f"t3_{n}"
+    item.comments.list.return_value = []
+    return item
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    data = tmp_path / "data"
+    with patch.object(api, "DATA_DIR", f"{data}/"), \
+         patch.object(api, "OUTPUT_JSON", f"{data}/saved_posts.json"), \
+         patch.object(api, "ARCHIVE_DIR", f"{data}/archive/"), \
+         patch.object(api, "LAST_FETCH_FILE", f"{data}/last_fetch.json"), \
+         patch.object(api, "FETCH_STATE_FILE", f"{data}/fetch_state.json"), \
+         patch.object(api, "CHECKPOINT_EVERY", 2), \
+         patch.dict("os.environ", {"CLIENT_ID": "id", "CLIENT_SECRET": "secret", "USER_AGENT": "ua", "REDDIT_USERNAME": "user"}), \
+         patch("reddit_fetch.api.load_tokens_safe", return_value={"refresh_token": "token"}):
+        yield data
+
+
+def run_fetch(saved):
+    with patch("praw.Reddit") as mock_reddit:
+        mock_reddit.return_value.user.me.return_value.saved.side_effect = saved
+        result = api.fetch_saved_posts()
+    return result, mock_reddit.return_value.user.me.return_value.saved
+
+
+def test_interrupted_fetch_keeps_committed_batches(data_dir):
+    items = [make_submission(n, 1000 - n) for n in range(5)]
+
+    def interrupted(limit, params):
+        yield from items[:3]
+        raise RuntimeError("rate limited")
+
+    result, _ = run_fetch(interrupted)
+
+    assert result["count"] == 0
+    archive = list(ShardedArchive(f"{data_dir}/archive/").iter_records())
+    assert [post["title"] for post in archive] == ["Post 0", "Post 1", "Post 2"]
+    state = json.loads((data_dir / "fetch_state.json").read_text())
+    assert state["after"] == "t3_2"
+    assert state["seen"] == 3
+    assert not (data_dir / "last_fetch.json").exists()
+
+
+def test_rerun_resumes_after_cursor(data_dir):
+    items = [make_submission(n, 1000 - n) for n in range(5)]
+
+    def interrupted(limit, params):
+        yield from items[:3]
+        raise RuntimeError("rate limited")
+
+    run_fetch(interrupted)
+    result, saved = run_fetch(lambda limit, params: iter(items[3:]))
+
+    saved.assert_called_once_with(limit=api.FETCH_LIMIT - 3, params={"after": "t3_2"})
+    assert result["count"] == 5
+    archive = list(ShardedArchive(f"{data_dir}/archive/").iter_records())
+    assert [post["title"] for post in archive] == [f"Post {n}" for n in range(5)]
+    assert json.loads((data_dir / "saved_posts.json").read_text()) == archive
+    assert not (data_dir / "fetch_state.json").exists()
+    assert float((data_dir / "last_fetch.json").read_text()) == 1000
+
+
+def test_replayed_batch_is_not_duplicated(data_dir):
+    items = [make_submission(n, 1000 - n) for n in range(3)]
+    (data_dir).mkdir()
+    (data_dir / "saved_posts.json").write_text(json.dumps([{"title": "Post 0", "permalink": "https://www.reddit.com/r/testsubreddit/comments/0/"}]))
+    (data_dir / "fetch_state.json").write_text(json.dumps({
+        "after": None, "seen": 0, "force": False, "stop_timestamp": 0.0, "max_timestamp": 0.0
+    }))
+
+    result, _ = run_fetch(lambda limit, params: iter(items))
+
+    assert result["count"] == 3
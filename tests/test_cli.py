@@ -0,0 +1,28 @@
+import json
+import os
+import subprocess
+import sys
+
+from conftest import make_post
+from reddit_fetch.changelog import ChangeLog
+from reddit_fetch.storage import ShardedArchive
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_changes_writes_only_json_lines_to_stdout(tmp_path):
+    archive_dir = f"{tmp_path}/data/archive/"
+    archive = ShardedArchive(archive_dir, changelog=ChangeLog(f"{archive_dir}changes/"))
+    for name in ("a", "b"):
+        archive.upsert(make_post(name))
+    archive.commit()
+
+    result = subprocess.run(
+        [sys.executable, "-m", "reddit_fetch.main", "changes", "--since", "0"],
+        cwd=ROOT, capture_output=True, text=True, timeout=60,
+        env=dict(os.environ, REDDIT_FETCH_DATA_DIR=f"{tmp_path}/data", PYTHONPATH=ROOT)
+    )
+
+    assert result.returncode == 0, result.stderr
+    events = [json.loads(line) for line in result.stdout.splitlines()]
+    assert [(event["seq"], event["op"], event["fullname"]) for event in events] == [(1, "insert", "t3_a"), (2, "insert", "t3_b")]
@@ -0,0 +1,70 @@
+import json
+import os
+import sys
+
+import pytest
+
+pq = pytest.importorskip("pyarrow.parquet")
+
+from conftest import make_post
+from reddit_fetch import columnar
+from reddit_fetch.columnar import export_to_parquet
+
+
+@pytest.fixture
+def dataset(tmp_path, monkeypatch):
+    monkeypatch.setattr(columnar, "PARQUET_DIR", f"{tmp_path}/parquet/")
+    monkeypatch.setattr(columnar, "PARQUET_MANIFEST", f"{tmp_path}/parquet/_manifest.json")
+    return tmp_path / "parquet"
+
+
+def mtimes(directory):
+    return {str(path.relative_to(directory)): path.stat().st_mtime_ns for path in directory.rglob("*.parquet")}
+
+
+def test_posts_and_comments_are_partitioned_by_month(dataset):
+    comments = [{"author": "alice", "body": "first", "score": 1}, {"author": "bob", "body": "second", "score": 1}]
+    assert export_to_parquet([make_post("a", month=1, comments=comments), make_post("b", month=2)])
+
+    assert sorted(mtimes(dataset)) == ["comments/month=2024-01/part-0.parquet", "posts/month=2024-01/part-0.parquet",
+                                       "posts/month=2024-02/part-0.parquet"] # February has no comments
+    posts = pq.read_table(dataset / "posts").to_pylist()
+    assert [(post["fullname"], post["title"], post["month"]) for post in posts] == [("t3_a", "Post a", "2024-01"), ("t3_b", "Post b", "2024-02")]
+    assert "comments" not in posts[0]
+    comments = pq.read_table(dataset / "comments").to_pylist()
+    assert [(comment["post_fullname"], comment["position"], comment["author"], comment["body"]) for comment in comments] == [
+        ("t3_a", 0, "alice", "first"), ("t3_a", 1, "bob", "second")]
+
+
+def test_unchanged_months_are_not_rewritten(dataset):
+    export_to_parquet([make_post("a", month=1), make_post("b", month=2)])
+    before = mtimes(dataset)
+
+    export_to_parquet([make_post("a", month=1), dict(make_post("b", month=2), title="Edited")])
+
+    after = mtimes(dataset)
+    assert after["posts/month=2024-01/part-0.parquet"] == before["posts/month=2024-01/part-0.parquet"]
+    assert after["posts/month=2024-02/part-0.parquet"] != before["posts/month=2024-02/part-0.parquet"]
+    assert [post["title"] for post in pq.read_table(dataset / "posts/month=2024-02").to_pylist()] == ["Edited"]
+
+
+def test_reset_rebuilds_the_dataset(dataset):
+    export_to_parquet([make_post("a", month=1), make_post("b", month=2)])
+
+    assert export_to_parquet([make_post("b", month=2)], reset=True)
+
+    assert sorted(mtimes(dataset)) == ["posts/month=2024-02/part-0.parquet"]
+    assert list(json.loads((dataset / "_manifest.json").read_text())["months"]) == ["2024-02"]
+
+
+def test_non_contiguous_months_fail_but_keep_finished_months(dataset):
+    assert not export_to_parquet([make_post("a", month=1), make_post("b", month=2), make_post("c", month=1)])
+
+    assert list(json.loads((dataset / "_manifest.json").read_text())["months"]) == ["2024-01", "2024-02"]
+    assert not any(name.endswith(".tmp") for _, _, files in os.walk(dataset) for name in files)
+
+
+def test_missing_pyarrow_fails_the_export(dataset, monkeypatch):
+    monkeypatch.setitem(sys.modules, "pyarrow", None)
+    assert not export_to_parquet([make_post("a", month=1)])
+    assert not dataset.exists()
@@ -0,0 +1,58 @@
+import json
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+from reddit_fetch.comments import CommentForest, comment_rows
+from reddit_fetch.records import content_hash, submission_to_record
+from reddit_fetch.sinks import write_json_stream
+
+
+def praw_comment(comment_id, parent_id, author, body, score=1):
+    return SimpleNamespace(id=comment_id, parent_id=parent_id, author=SimpleNamespace(name=author) if author else None,
+                           body=body, score=score)
+
+
+def test_forest_packs_comments_and_interns_authors():
+    praw_forest = MagicMock()
+    praw_forest.list.return_value = [
+        praw_comment("a", "t3_p", "alice", "top"),
+        praw_comment("b", "t3_p", None, "deleted author", score=-2),
+        praw_comment("c", "t1_a", "alice", "réponse"),
+        praw_comment("d", "t1_c", "bob", "deep"),
+    ]
+
+    forest = CommentForest.from_praw(praw_forest)
+
+    assert len(forest) == 4
+    assert list(forest.parents) == [-1, -1, 0, 2]
+    assert list(forest.depths) == [0, 0, 1, 2]
+    assert forest.authors == ["alice", "[deleted]", "bob"]
+    assert forest[2] == {"author": "alice", "body": "réponse", "score": 1}
+    assert list(comment_rows(forest))[1] == ("[deleted]", "deleted author", -2)
+
+
+def test_forest_encodes_and_hashes_like_the_archive_format(tmp_path):
+    comments = [{"author": "alice", "body": "one", "score": 3}, {"author": "bob", "body": "two", "score": 1}]
+    post = {"title": "t", "permalink": "p", "comments": comments}
+    compact = dict(post, comments=CommentForest(comments))
+
+    assert content_hash(compact) == content_hash(post)
+    write_json_stream([post], str(tmp_path / "dicts.json"))
+    write_json_stream([compact], str(tmp_path / "forest.json"))
+    assert (tmp_path / "forest.json").read_bytes() == (tmp_path / "dicts.json").read_bytes()
+    assert json.loads((tmp_path / "forest.json").read_text())[0]["comments"] == comments
+
+
+def test_submission_comments_are_converted_and_released():
+    item = MagicMock()
+    item.selftext = "body"
+    item.comments.list.return_value = [praw_comment("a", "t3_p", "alice", "hi")]
+    vars(item)["_comments"] = item.comments
+    vars(item)["_comments_by_id"] = {"t1_a": object()}
+
+    record = submission_to_record(item)
+
+    assert isinstance(record["comments"], CommentForest)
+    assert record["combined_content"] == "body\n\n--- Comment by u/alice ---\nhi"
+    assert vars(item)["_comments_by_id"] == {}
+    assert vars(item)["_comments"] is not item.comments
@@ -0,0 +1,94 @@
+import os
+import time
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from conftest import make_post, permalink
+from reddit_fetch.dedup import DedupIndex, dedupe_archive, minhash_signatures, shingles
+from reddit_fetch.storage import ShardedArchive
+
+TEXT = ("I finally benchmarked the new parser against the old one and the results surprised me. "
+        "Startup time dropped by half while memory use stayed flat across every workload we tried.")
+
+
+def titled(name, title, selftext=TEXT, url=None, **fields):
+    return make_post(name, title=title, selftext=selftext, url=url or permalink(name), **fields)
+
+
+def test_signatures_estimate_similarity():
+    posts = [titled("a", "Parser benchmark"), titled("b", "Parser benchmark!"), titled("c", "Cats", selftext="A picture of my cat.")]
+    signatures = minhash_signatures(np, [shingles(post) for post in posts])
+    assert signatures.shape == (3, 128)
+    assert (signatures[0] == signatures[1]).mean() > 0.8
+    assert (signatures[0] == signatures[2]).mean() < 0.2
+
+
+def test_index_clusters_incrementally(tmp_path):
+    path = f"{tmp_path}/index.npz"
+    first = [titled("a", "Parser benchmark"), titled("c", "Cats", selftext="A picture of my cat.")]
+    index = DedupIndex(np, path)
+    index.add([post["permalink"] for post in first], minhash_signatures(np, [shingles(post) for post in first]))
+    index.save()
+
+    repost = titled("b", "Parser benchmark (repost)")
+    roots = DedupIndex(np, path).add([repost["permalink"]], minhash_signatures(np, [shingles(repost)]), threshold=0.7)
+    assert roots == {repost["permalink"]: first[0]["permalink"]}
+
+
+def test_crossposts_of_same_link_cluster():
+    posts = [titled("a", "Great talk on databases", selftext="", url="https://example.com/talk"),
+             titled("b", "Great talk on databases", selftext="", url="http://www.example.com/talk/")]
+    signatures = minhash_signatures(np, [shingles(post) for post in posts])
+    assert (signatures[0] == signatures[1]).all()
+
+
+@pytest.mark.parametrize("mode", ["flag", "merge"])
+def test_dedupe_archive_flags_or_merges(tmp_path, mode):
+    archive = ShardedArchive(f"{tmp_path}/archive/")
+    original, repost = titled("a", "Parser benchmark"), titled("b", "Parser benchmark")
+    archive.import_records([original, repost])
+
+    counts = dedupe_archive(archive, [repost["permalink"]], mode, path=f"{tmp_path}/index.npz")
+    archive.commit()
+
+    if mode == "flag":
+        assert counts == {"flagged": 1, "merged": 0}
+        assert archive.get(repost["permalink"])["duplicate_of"] == original["permalink"]
+    else:
+        assert counts == {"flagged": 0, "merged": 1}
+        assert repost["permalink"] not in archive
+        assert archive.get(original["permalink"])["duplicates"] == [repost["permalink"]]
+
+
+def test_first_run_on_a_reopened_archive_keeps_its_flags(tmp_path):
+    original, repost = titled("a", "Parser benchmark", month=1), titled("b", "Parser benchmark", month=2)
+    ShardedArchive(f"{tmp_path}/archive/").import_records([original, repost])
+    archive = ShardedArchive(f"{tmp_path}/archive/") # No shard loaded yet
+
+    assert dedupe_archive(archive, [], "flag", path=f"{tmp_path}/index.npz") == {"flagged": 1, "merged": 0}
+    archive.commit()
+
+    assert ShardedArchive(f"{tmp_path}/archive/").get(repost["permalink"])["duplicate_of"] == original["permalink"]
+
+
+def test_unknown_mode_is_rejected(tmp_path):
+    archive = ShardedArchive(f"{tmp_path}/archive/")
+    archive.import_records([titled("a", "Parser benchmark"), titled("b", "Parser benchmark")])
+
+    assert dedupe_archive(archive, [], "merg", path=f"{tmp_path}/index.npz") is None
+    assert len(archive) == 2 and not os.path.exists(f"{tmp_path}/index.npz")
+
+
+def test_lookup_against_large_index_is_fast(tmp_path):
+    rng = np.random.default_rng(1)
+    index = DedupIndex(np, f"{tmp_path}/index.npz")
+    index.permalinks = [f"p{n}" for n in range(100000)]
+    index.positions = {permalink: n for n, permalink in enumerate(index.permalinks)}
+    index.signatures = rng.integers(0, 2**32, size=(100000, 128), dtype=np.uint32)
+    index.roots = np.arange(100000, dtype=np.int64)
+
+    new = [titled(f"n{n}", f"Post number {n}", selftext=f"Body {n} " * 20) for n in range(100)]
+    started = time.perf_counter()
+    index.add([post["permalink"] for post in new], minhash_signatures(np, [shingles(post) for post in new]))
+    assert time.perf_counter() - started < 1.0
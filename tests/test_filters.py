@@ -0,0 +1,76 @@
+import pytest
+from unittest.mock import MagicMock
+import praw
+
+from reddit_fetch.filters import FetchFilters, _parse_date, parse_hydration
+from reddit_fetch.records import submission_to_record
+
+def make_item(cls, subreddit="Python", score=10, created_utc=1700000000):
+    item = MagicMock()
+    item.__class__ = cls
+    item.subreddit.display_name = subreddit
+    item.score = score
+    item.created_utc = created_utc
+    return item
+
+def test_accepts_uses_listing_fields():
+    filters = FetchFilters(subreddits=["python", "rust"], exclude_subreddits=["rust"], saved_since=1690000000, types=["post"], min_score=5)
+
+    assert filters.accepts(make_item(praw.models.Submission))
+    assert not filters.accepts(make_item(praw.models.Comment))
+    assert not filters.accepts(make_item(praw.models.Submission, subreddit="rust"))
+    assert not filters.accepts(make_item(praw.models.Submission, subreddit="golang"))
+    assert not filters.accepts(make_item(praw.models.Submission, score=4))
+    assert not filters.accepts(make_item(praw.models.Submission, created_utc=1680000000))
+
+def test_no_filters_accept_everything():
+    filters = FetchFilters()
+    assert not filters.active
+    assert filters.accepts(make_item(praw.models.Comment, score=-100))
+
+def test_from_env(monkeypatch):
+    monkeypatch.setenv("FILTER_SUBREDDITS", "Python, rust")
+    monkeypatch.setenv("FILTER_SAVED_SINCE", "2024-01-01")
+    monkeypatch.setenv("FILTER_TYPES", "comment")
+    monkeypatch.setenv("HYDRATE_COMMENTS", "none,python:all")
+    filters = FetchFilters.from_env()
+
+    assert filters.subreddits == {"python", "rust"}
+    assert filters.saved_since == 1704067200
+    assert filters.types == {"comment"}
+    assert filters.hydration_for("Python") == "all"
+    assert filters.hydration_for("rust") == "none"
+
+def test_filter_types_are_case_insensitive_and_validated(monkeypatch):
+    monkeypatch.setenv("FILTER_TYPES", "Post,COMMENT")
+    assert FetchFilters.from_env().types == {"post", "comment"}
+    monkeypatch.setenv("FILTER_TYPES", "posts")
+    with pytest.raises(ValueError, match="FILTER_TYPES 'posts' inconnu"):
+        FetchFilters.from_env()
+
+def test_saved_since_honours_an_explicit_offset():
+    assert _parse_date("2024-01-01") == 1704067200
+    assert _parse_date("2024-01-01T02:00:00+02:00") == 1704067200
+    assert _parse_date("1704067200") == 1704067200
+
+def test_parse_hydration_rejects_unknown_policy():
+    assert parse_hydration("top,askhistorians:all") == ("top", {"askhistorians": "all"})
+    with pytest.raises(ValueError):
+        parse_hydration("python:some")
+
+@pytest.mark.parametrize("hydrate,limit", [("all", None), ("top", 0)])
+def test_submission_hydration_policy(hydrate, limit):
+    item = make_item(praw.models.Submission)
+    item.selftext = ""
+    item.comments.list.return_value = []
+    submission_to_record(item, hydrate=hydrate)
+    item.comments.replace_more.assert_called_once_with(limit=limit)
+
+def test_submission_without_hydration_makes_no_comment_request():
+    item = make_item(praw.models.Submission)
+    item.selftext = "Body"
+    record = submission_to_record(item, hydrate="none")
+    item.comments.replace_more.assert_not_called()
+    item.comments.list.assert_not_called()
+    assert record["comments"] == []
+    assert record["combined_content"] == "Body"
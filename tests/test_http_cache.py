@@ -0,0 +1,59 @@
+import time
+import requests
+from unittest.mock import patch
+from requests.structures import CaseInsensitiveDict
+
+from reddit_fetch.http_cache import CachingSession, ResponseCache, cache_key
+
+LISTING_URL = "https://oauth.reddit.com/user/testuser/saved"
+
+def make_response(status_code=200, body=b'{"data": {"children": []}}', headers=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = body
+    response.headers = CaseInsensitiveDict(headers or {})
+    response.url = LISTING_URL
+    response.encoding = "utf-8"
+    return response
+
+def test_fresh_entry_is_served_from_disk(tmp_path):
+    session = CachingSession(ResponseCache(str(tmp_path)), ttl=300)
+    with patch.object(requests.Session, "request", return_value=make_response(headers={"x-ratelimit-remaining": "99"})) as network:
+        first = session.request("GET", LISTING_URL, params={"limit": 100, "raw_json": 1})
+        second = session.request("GET", LISTING_URL, params={"raw_json": 1, "limit": 100})
+
+    assert network.call_count == 1
+    assert second.content == first.content
+    assert second.json() == {"data": {"children": []}}
+    assert "x-ratelimit-remaining" not in second.headers
+    assert (session.hits, session.misses) == (1, 1)
+
+def test_stale_entry_is_revalidated_with_etag(tmp_path):
+    session = CachingSession(ResponseCache(str(tmp_path)), ttl=0)
+    with patch.object(requests.Session, "request", return_value=make_response(headers={"ETag": '"abc"'})):
+        session.request("GET", LISTING_URL)
+    with patch.object(requests.Session, "request", return_value=make_response(status_code=304, body=b"")) as network:
+        response = session.request("GET", LISTING_URL)
+
+    assert network.call_args.kwargs["headers"]["If-None-Match"] == '"abc"'
+    assert response.status_code == 200
+    assert response.json() == {"data": {"children": []}}
+    assert session.revalidated == 1
+
+def test_non_get_requests_bypass_cache(tmp_path):
+    session = CachingSession(ResponseCache(str(tmp_path)), ttl=300)
+    with patch.object(requests.Session, "request", return_value=make_response()) as network:
+        session.request("POST", LISTING_URL, data={"id": "t3_a"})
+        session.request("POST", LISTING_URL, data={"id": "t3_a"})
+    assert network.call_count == 2
+    assert not list(tmp_path.iterdir())
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_bytes=25)
+    for n in range(3):
+        cache.put(cache_key("GET", f"{LISTING_URL}/{n}"), {"stored_at": time.time()}, b"x" * 10)
+        time.sleep(0.01)
+
+    assert cache.total_bytes == 20
+    assert cache.get(cache_key("GET", f"{LISTING_URL}/0")) is None
+    assert cache.get(cache_key("GET", f"{LISTING_URL}/2")) is not None
@@ -0,0 +1,60 @@
+from unittest.mock import MagicMock
+import praw
+
+from reddit_fetch.api import iter_saved_items
+from reddit_fetch.filters import FetchFilters
+
+def make_submission(n, created_utc, subreddit="testsubreddit"):
+    item = MagicMock()
+    item.__class__ = praw.models.Submission
+    item.title = f"Post {n}"
+    item.score = n
+    item.subreddit.display_name = subreddit
+    item.permalink = f"/r/{subreddit}/comments/{n}/"
+    item.url = f"http://example.com/{n}"
+    item.created_utc = created_utc
+    item.selftext = ""
+    item.num_comments = 0
+    item.fullname = f"t3_{n}"
+    item.comments.list.return_value = []
+    return item
+
+def make_reddit(items):
+    reddit = MagicMock()
+    walked = []
+
+    def saved(limit, params):
+        for item in items:
+            walked.append(item.fullname)
+            yield item
+
+    reddit.user.me.return_value.saved.side_effect = saved
+    return reddit, walked
+
+def test_items_are_fetched_only_as_consumed():
+    items = [make_submission(n, 1000 - n) for n in range(5)]
+    reddit, walked = make_reddit(items)
+
+    stream = iter_saved_items(reddit)
+    first = next(stream)
+
+    assert first["fullname"] == "t3_0"
+    assert first["type"] == "post"
+    assert walked == ["t3_0"]
+    items[1].comments.replace_more.assert_not_called()
+
+def test_cursor_tracks_skipped_items_and_stop():
+    items = [make_submission(0, 1000, "python"), make_submission(1, 999, "pics"), make_submission(2, 500, "python")]
+    reddit, _ = make_reddit(items)
+    cursor = {}
+
+    records = list(iter_saved_items(reddit, since=600, filters=FetchFilters(subreddits=["python"]), cursor=cursor))
+
+    assert [record["title"] for record in records] == ["Post 0"]
+    assert cursor == {"seen": 2, "skipped": 1, "max_timestamp": 1000, "after": "t3_1", "stopped_at": 500}
+    items[1].comments.replace_more.assert_not_called()
+
+def test_resumes_after_fullname():
+    reddit, _ = make_reddit([])
+    list(iter_saved_items(reddit, limit=10, after="t3_9"))
+    reddit.user.me.return_value.saved.assert_called_once_with(limit=10, params={"after": "t3_9"})
@@ -0,0 +1,107 @@
+import os
+import time
+
+from conftest import make_post
+from reddit_fetch import maintenance
+from reddit_fetch.http_cache import ResponseCache
+from reddit_fetch.maintenance import collect_garbage
+from reddit_fetch.snapshots import BlobStore
+from reddit_fetch.storage import ShardedArchive
+
+
+def age(path, seconds):
+    then = time.time() - seconds
+    os.utime(path, (then, then))
+
+
+def test_cache_collect_drops_expired_orphaned_and_over_budget_entries(tmp_path):
+    cache = ResponseCache(f"{tmp_path}/", max_bytes=1000)
+    for key in ("old", "recent", "headless"):
+        cache.put(key, {"status": 200}, b"x" * 100)
+    os.remove(tmp_path / "headless.json") # Interrupted write: body without metadata
+    (tmp_path / "stray.json").write_text("{}")
+    (tmp_path / "stray.json.tmp").write_text("{}")
+    for name in os.listdir(tmp_path):
+        age(tmp_path / name, 120)
+    age(tmp_path / "old.body", 3600)
+
+    files, freed, complete = ResponseCache(f"{tmp_path}/", max_bytes=1000).collect(max_age=1800)
+
+    assert complete
+    assert sorted(os.listdir(tmp_path)) == ["recent.body", "recent.json"]
+    assert files == 5 # old (2 files), headless body, stray metadata, stray .tmp
+    assert freed > 200
+
+    entry_bytes = os.path.getsize(tmp_path / "recent.json") + 100
+    assert ResponseCache(f"{tmp_path}/", max_bytes=50).collect() == (2, entry_bytes, True) # Least recently used past the budget
+    assert os.listdir(tmp_path) == []
+
+
+def test_collect_garbage_reclaims_orphans_and_respects_budget(tmp_path):
+    data_dir = f"{tmp_path}/"
+    blobs = BlobStore(f"{data_dir}blobs/")
+    kept, orphan = blobs.put(b"kept page"), blobs.put(b"orphan page")
+    archive = ShardedArchive(f"{data_dir}archive/")
+    archive.upsert(make_post("a", snapshot={"blob": kept}))
+    archive.upsert(make_post("b", month=2))
+    archive.commit()
+    archive.remove(make_post("b")["permalink"])
+    archive.commit()
+    for reference in (kept, orphan):
+        age(blobs.path(reference.split(":", 1)[1]), 7200)
+    stale = tmp_path / "archive" / "index.json.tmp"
+    stale.write_text("{")
+    age(stale, 7200)
+
+    assert not any(result["complete"] for result in collect_garbage(budget=0, data_dir=data_dir, report=False).values())
+    assert stale.exists() and os.path.exists(archive.shard_path("2024-02"))
+
+    results = collect_garbage(data_dir=data_dir, report=False)
+
+    assert all(result["complete"] for result in results.values())
+    assert results["blobs"]["files"] == 1 and results["tmp"]["files"] == 1 and results["shards"]["files"] == 1
+    assert os.path.exists(blobs.path(kept.split(":", 1)[1]))
+    assert not os.path.exists(blobs.path(orphan.split(":", 1)[1]))
+    assert not stale.exists()
+    archive = ShardedArchive(f"{data_dir}archive/")
+    assert archive.shard_keys() == ["2024-01"] and not os.path.exists(archive.shard_path("2024-02"))
+    assert [post["title"] for post in archive.iter_records()] == ["Post a"]
+
+
+def test_pass_cut_by_the_budget_resumes_with_the_stores_it_did_not_reach(tmp_path, monkeypatch):
+    data_dir = f"{tmp_path}/"
+    archive = ShardedArchive(f"{data_dir}archive/")
+    archive.import_records([make_post("a"), make_post("b", month=2)])
+    archive.remove(make_post("b")["permalink"])
+    archive.commit()
+
+    def slow_cache(data_dir, deadline, state):
+        time.sleep(0.1)
+        return 0, 0, False
+    monkeypatch.setitem(maintenance._COLLECTORS, "http_cache", slow_cache)
+
+    first = collect_garbage(budget=0.05, data_dir=data_dir, report=False)
+    assert not first["shards"]["complete"] and first["shards"]["files"] == 0
+
+    second = collect_garbage(budget=0.05, data_dir=data_dir, report=False)
+    assert list(second)[:2] == ["link_cache", "changes"] # The slow store goes last
+    assert second["shards"]["complete"] and second["shards"]["files"] == 1
+    assert second["blobs"]["complete"]
+
+
+def test_blob_scan_only_reads_changed_shards(tmp_path, monkeypatch):
+    data_dir = f"{tmp_path}/"
+    blobs = BlobStore(f"{data_dir}blobs/")
+    archive = ShardedArchive(f"{data_dir}archive/")
+    archive.import_records([make_post("a", snapshot={"blob": blobs.put(b"page a")}), make_post("b", month=2)])
+    collect_garbage(["blobs"], data_dir=data_dir, report=False)
+
+    archive = ShardedArchive(f"{data_dir}archive/")
+    archive.upsert(make_post("c", month=2, snapshot={"blob": blobs.put(b"page c")}))
+    archive.commit()
+    reads = []
+    read_json = ShardedArchive._read_json
+    monkeypatch.setattr(ShardedArchive, "_read_json", staticmethod(lambda path, default: reads.append(os.path.basename(path)) or read_json(path, default)))
+
+    collect_garbage(["blobs"], data_dir=data_dir, report=False)
+    assert [name for name in reads if name.startswith("2024")] == ["2024-02.json"]
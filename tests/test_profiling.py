@@ -0,0 +1,41 @@
+import json
+import threading
+import time
+
+import pytest
+
+from reddit_fetch.profiling import Profiler
+
+
+def encode_for(seconds):
+    deadline = time.perf_counter() + seconds
+    payload = [{"title": "x" * 100, "comments": list(range(50))}] * 200
+    while time.perf_counter() < deadline:
+        json.dumps(payload)
+
+
+def test_profile_writes_stacks_and_allocations(tmp_path):
+    with Profiler(directory=str(tmp_path), interval=0.001) as profiler:
+        worker = threading.Thread(target=encode_for, args=(0.2,), name="sink-json")
+        worker.start()
+        kept = [bytearray(1024) for _ in range(2000)]
+        worker.join()
+
+    lines = open(profiler.stacks_path, encoding="utf-8").read().splitlines()
+    assert lines
+    stack, count = lines[0].rsplit(" ", 1)
+    assert int(count) > 0
+    assert any(line.startswith("sink-json;") and "encode_for" in line for line in lines)
+    assert profiler.hotspots()["JSON encoding"] > 0
+
+    report = open(profiler.report_path, encoding="utf-8").read()
+    assert "Top" in report and "test_profiling.py" in report
+    assert kept
+
+
+def test_profile_is_written_when_the_run_exits(tmp_path):
+    with pytest.raises(SystemExit):
+        with Profiler(directory=str(tmp_path), interval=0.001) as profiler:
+            encode_for(0.05)
+            raise SystemExit(1)
+    assert open(profiler.report_path, encoding="utf-8").read().startswith("Wall time")
@@ -0,0 +1,58 @@
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+from conftest import make_post
+from reddit_fetch.reconcile import INFO_BATCH, reconcile_archive
+from reddit_fetch.storage import ShardedArchive
+
+
+def listing_item(post_id, **data):
+    # Plain namespaces: any attribute missing from the listing data raises instead of fetching
+    return SimpleNamespace(fullname=f"t3_{post_id}", selftext="text", **data)
+
+
+def make_reddit(saved, info):
+    reddit = MagicMock()
+    reddit.user.me.return_value.saved.return_value = iter(saved)
+    reddit.info.side_effect = lambda fullnames: [info[name] for name in fullnames if name in info]
+    return reddit
+
+
+def test_reconcile_marks_unsaved_and_deleted(tmp_path):
+    archive = ShardedArchive(f"{tmp_path}/")
+    archive.import_records([make_post(post_id) for post_id in ("kept", "gone", "unsaved", "removed", "old")])
+    reddit = make_reddit(
+        saved=[listing_item("kept"), listing_item("removed", removed_by_category="moderator"), listing_item("new")],
+        info={"t3_unsaved": listing_item("unsaved", saved=False), "t3_old": listing_item("old", saved=True)}
+    )
+
+    summary = reconcile_archive(reddit, archive)
+
+    assert summary["unsaved"] == 1 and summary["deleted"] == 2 and summary["not_archived"] == 1
+    reloaded = ShardedArchive(f"{tmp_path}/")
+    statuses = {post["title"]: post.get("status") for post in reloaded.iter_records()}
+    assert statuses == {"Post kept": None, "Post gone": "deleted", "Post unsaved": "unsaved", "Post removed": "deleted", "Post old": None}
+    assert reloaded.status(make_post("gone")["permalink"]) == "deleted"
+
+
+def test_resaved_items_are_restored(tmp_path):
+    archive = ShardedArchive(f"{tmp_path}/")
+    archive.import_records([make_post("a")])
+    reconcile_archive(make_reddit(saved=[], info={"t3_a": listing_item("a", saved=False)}), archive)
+
+    summary = reconcile_archive(make_reddit(saved=[listing_item("a")], info={}), archive)
+
+    assert summary["restored"] == 1
+    assert "status" not in archive.get(make_post("a")["permalink"])
+
+
+def test_info_lookups_are_batched(tmp_path):
+    archive = ShardedArchive(f"{tmp_path}/")
+    archive.import_records([make_post(f"p{n}") for n in range(250)])
+    reddit = make_reddit(saved=[], info={})
+
+    summary = reconcile_archive(reddit, archive)
+
+    assert reddit.info.call_count == 3
+    assert max(len(call.kwargs["fullnames"]) for call in reddit.info.call_args_list) == INFO_BATCH
+    assert summary["deleted"] == 250
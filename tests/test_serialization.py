@@ -0,0 +1,46 @@
+import json
+from datetime import datetime, timezone
+
+from reddit_fetch.comments import CommentForest
+from reddit_fetch.serialization import ParallelEncoder, encode_json_array
+from reddit_fetch.sinks import write_html_stream, write_json_from_shards, write_json_stream
+from reddit_fetch.storage import ShardedArchive
+
+
+def make_posts(count):
+    return [{"title": f"Post {n} é", "permalink": f"https://www.reddit.com/r/t/comments/{n}/",
+             "date_saved": datetime(2024, 1 + n % 3, 1, tzinfo=timezone.utc).timestamp(), "selftext": "<b>\n",
+             "comments": CommentForest([{"author": "alice", "body": f"comment {n}", "score": n}])}
+            for n in range(count)]
+
+
+def test_parallel_output_is_byte_identical_to_the_reference(tmp_path):
+    posts = make_posts(20)
+    write_json_stream(posts, str(tmp_path / "reference.json"), encoder=ParallelEncoder(workers=1))
+    write_json_stream(posts, str(tmp_path / "parallel.json"), encoder=ParallelEncoder(workers=2, chunk_records=3))
+    write_html_stream(posts, str(tmp_path / "reference.html"), encoder=ParallelEncoder(workers=1))
+    write_html_stream(posts, str(tmp_path / "parallel.html"), encoder=ParallelEncoder(workers=2, chunk_records=3))
+
+    assert (tmp_path / "parallel.json").read_bytes() == (tmp_path / "reference.json").read_bytes()
+    assert (tmp_path / "parallel.html").read_bytes() == (tmp_path / "reference.html").read_bytes()
+    expected = json.dumps([dict(post, comments=post["comments"].to_list()) for post in posts], indent=4)
+    assert (tmp_path / "reference.json").read_text(encoding="utf-8") == expected
+
+
+def test_encode_json_array_matches_json_dumps():
+    posts = [dict(post, comments=post["comments"].to_list()) for post in make_posts(4)]
+    assert encode_json_array(posts) == json.dumps(posts, indent=4).encode("utf-8")
+    assert encode_json_array([]) == b"[]"
+
+
+def test_json_from_shards_matches_the_streamed_export(tmp_path):
+    archive = ShardedArchive(f"{tmp_path}/archive/")
+    archive.import_records(make_posts(7))
+
+    assert write_json_from_shards(archive, str(tmp_path / "spliced.json")) == 7
+    write_json_stream(archive.iter_records(), str(tmp_path / "streamed.json"), encoder=ParallelEncoder(workers=1))
+    assert (tmp_path / "spliced.json").read_bytes() == (tmp_path / "streamed.json").read_bytes()
+
+    empty = ShardedArchive(f"{tmp_path}/empty/")
+    assert write_json_from_shards(empty, str(tmp_path / "empty.json")) == 0
+    assert (tmp_path / "empty.json").read_text() == "[]"
@@ -0,0 +1,112 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from conftest import make_post
+from reddit_fetch.changelog import ChangeLog
+from reddit_fetch.server import ShardCache, make_server
+from reddit_fetch.storage import ShardedArchive
+
+COMMENTS = [{"author": "alice", "body": "hi", "score": 1}]
+FULL_TEXT = {"comments": COMMENTS, "combined_content": "text"}
+
+
+@pytest.fixture
+def api(tmp_path):
+    archive = ShardedArchive(f"{tmp_path}/")
+    archive.import_records([make_post("a", month=1, **FULL_TEXT), make_post("b", month=1, subreddit="rust", **FULL_TEXT),
+                            make_post("c", month=2, **FULL_TEXT), make_post("d", month=3, kind="comment", **FULL_TEXT)])
+    server = make_server("127.0.0.1", 0, f"{tmp_path}/")
+    threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+
+    def get(path, headers=None):
+        request = urllib.request.Request(f"http://127.0.0.1:{server.server_address[1]}{path}", headers=headers or {})
+        try:
+            with urllib.request.urlopen(request) as response:
+                return response.status, response.headers, json.loads(response.read() or b"null")
+        except urllib.error.HTTPError as e:
+            return e.code, e.headers, json.loads(e.read() or b"null")
+
+    get.archive = archive
+    get.reader = server.reader
+    yield get
+    server.shutdown()
+    server.server_close()
+
+
+def test_cursor_pagination_walks_the_archive_in_order(api):
+    status, _, page = api("/items?limit=3")
+    assert status == 200
+    assert [item["title"] for item in page["items"]] == ["Post a", "Post b", "Post c"]
+    assert "comments" not in page["items"][0] and page["items"][0]["fullname"] == "t3_a"
+
+    _, _, page = api(f"/items?limit=3&cursor={page['next_cursor']}")
+    assert [item["title"] for item in page["items"]] == ["Post d"]
+    assert page["next_cursor"] is None
+
+
+def test_filters(api):
+    _, _, page = api("/items?subreddit=rust")
+    assert [item["title"] for item in page["items"]] == ["Post b"]
+    _, _, page = api("/items?type=comment")
+    assert [item["title"] for item in page["items"]] == ["Post d"]
+    _, _, page = api("/items?since=2024-02-01&until=2024-02-28")
+    assert [item["title"] for item in page["items"]] == ["Post c"]
+    assert api("/items?type=video")[0] == 400
+
+
+def test_record_by_fullname_with_etag(api):
+    status, headers, post = api("/items/t3_c")
+    assert status == 200 and post["comments"] == COMMENTS
+    assert api("/items/t3_c", {"If-None-Match": headers["ETag"]})[0] == 304
+    assert api("/items/t3_zzz")[0] == 404
+
+
+def test_etag_changes_when_the_archive_is_written(api):
+    _, headers, _ = api("/items")
+    assert api("/items", {"If-None-Match": headers["ETag"]})[0] == 304
+
+    api.archive.upsert(make_post("e", month=3))
+    api.archive.commit()
+
+    status, _, page = api("/items", {"If-None-Match": headers["ETag"]})
+    assert status == 200 and page["items"][-1]["title"] == "Post e"
+
+
+def test_not_modified_reads_no_shard(api, monkeypatch):
+    _, headers, _ = api("/items?limit=2")
+    _, record_headers, _ = api("/items/t3_a")
+    api.reader.cache.clear()
+    reads = []
+    original = api.reader.shard
+    monkeypatch.setattr(api.reader, "shard", lambda key: reads.append(key) or original(key))
+
+    assert api("/items?limit=2", {"If-None-Match": headers["ETag"]})[0] == 304
+    assert api("/items/t3_a", {"If-None-Match": record_headers["ETag"]})[0] == 304
+    assert reads == []
+    assert api("/items/t3_a")[0] == 200 and reads == ["2024-01"]
+
+
+def test_shard_cache_evicts_least_recently_used():
+    cache = ShardCache(capacity=3)
+    cache.put("2024-01", [1, 2])
+    cache.put("2024-02", [3])
+    cache.get("2024-01")
+    cache.put("2024-03", [4])
+    assert cache.get("2024-02") is None
+    assert cache.get("2024-01") == [1, 2] and cache.records == 3
+
+
+def test_changes_feed(api):
+    api.archive.changelog = ChangeLog(f"{api.archive.directory}changes/")
+    api.archive.upsert(make_post("e", month=3))
+    api.archive.commit()
+
+    status, headers, changes = api("/changes?since=0")
+    assert status == 200
+    assert [(event["seq"], event["op"], event["fullname"]) for event in changes["events"]] == [(1, "insert", "t3_e")]
+    assert api("/changes?since=0", {"If-None-Match": headers["ETag"]})[0] == 304
+    assert api("/changes?since=1")[2]["events"] == []
@@ -0,0 +1,71 @@
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from requests.adapters import HTTPAdapter
+
+from reddit_fetch import sessions
+from reddit_fetch.config import HTTP_TIMEOUT
+from reddit_fetch.http_cache import CachingSession
+from reddit_fetch.sessions import (
+    RateLimiter, close_sessions, get_http_adapter, get_session, get_sheets_client, new_session, praw_requestor_kwargs
+)
+
+
+@pytest.fixture(autouse=True)
+def fresh_pool():
+    close_sessions()
+    yield
+    close_sessions()
+
+
+def test_sessions_share_one_pooled_adapter():
+    adapter = get_http_adapter()
+    assert get_http_adapter() is adapter
+    assert new_session().get_adapter("https://oauth.reddit.com") is adapter
+    assert new_session().get_adapter("http://example.com") is adapter
+    assert get_session() is get_session()
+    assert praw_requestor_kwargs()["session"].get_adapter("https://oauth.reddit.com") is adapter
+
+
+def test_default_timeout_is_applied_only_when_none_is_given():
+    sent = []
+    with patch.object(HTTPAdapter, "send", lambda self, request, **kwargs: sent.append(kwargs["timeout"])):
+        adapter = get_http_adapter()
+        adapter.send(MagicMock())
+        adapter.send(MagicMock(), timeout=None)
+        adapter.send(MagicMock(), timeout=3)
+    assert sent == [HTTP_TIMEOUT, HTTP_TIMEOUT, 3]
+
+
+def test_rate_limiter_spaces_calls():
+    limiter = RateLimiter(600) # One call every 0.1 s
+    start = time.monotonic()
+    for _ in range(4):
+        limiter.wait()
+    assert time.monotonic() - start >= 0.3 - 0.01
+    unlimited = RateLimiter(0)
+    start = time.monotonic()
+    for _ in range(100):
+        unlimited.wait()
+    assert time.monotonic() - start < 0.05
+
+
+def test_praw_requestor_uses_the_response_cache(monkeypatch):
+    monkeypatch.setattr(sessions, "HTTP_CACHE", True)
+    monkeypatch.setattr(sessions, "REDDIT_MAX_RPM", 60)
+    kwargs = praw_requestor_kwargs(revalidate=True)
+    assert isinstance(kwargs["session"], CachingSession)
+    assert kwargs["session"].ttl == 0 and kwargs["session"].limiter.interval == 1.0
+    assert kwargs["timeout"] == HTTP_TIMEOUT
+
+
+def test_sheets_client_is_created_once_per_key_file():
+    with patch("google.oauth2.service_account.Credentials.from_service_account_file") as load, patch("gspread.authorize") as authorize:
+        authorize.side_effect = lambda creds: MagicMock()
+        client = get_sheets_client("key.json")
+        assert get_sheets_client("key.json") is client
+        assert get_sheets_client("other.json") is not client
+    assert load.call_count == 2
+    client.set_timeout.assert_called_once_with(HTTP_TIMEOUT)
+    client.http_client.session.mount.assert_any_call("https://", get_http_adapter())
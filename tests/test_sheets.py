@@ -0,0 +1,83 @@
+from unittest.mock import MagicMock
+
+from conftest import make_post, permalink
+from reddit_fetch.sheets import (
+    CELL_TEXT_LIMIT, OVERFLOW_CHUNK, OVERFLOW_SHEET, export_sharded, overflow_rows, sheet_row, sheet_title
+)
+
+
+def make_spreadsheet(existing=()):
+    spreadsheet = MagicMock()
+    sheets = {}
+    for title in existing:
+        sheets[title] = MagicMock(title=title)
+
+    def add_worksheet(title, rows, cols):
+        sheets[title] = MagicMock(title=title)
+        sheets[title].col_values.return_value = []
+        sheets[title].get_values.return_value = []
+        return sheets[title]
+
+    spreadsheet.worksheets.side_effect = lambda: list(sheets.values())
+    spreadsheet.add_worksheet.side_effect = add_worksheet
+    return spreadsheet, sheets
+
+
+def written_rows(worksheet):
+    rows = []
+    for call in worksheet.update.call_args_list:
+        rows.extend(call.kwargs["values"])
+    return rows
+
+
+def test_sheet_title_by_year_and_subreddit():
+    post = make_post("a", 2023, subreddit="rust")
+    assert sheet_title(post, "year") == "2023"
+    assert sheet_title(post, "subreddit") == "rust"
+
+
+def test_long_text_is_marked_and_moved_to_overflow():
+    text = "x" * (OVERFLOW_CHUNK + 10)
+    row = sheet_row(make_post("a", 2023, selftext=text, combined_content=text), overflow=True)
+    assert len(row[6]) == CELL_TEXT_LIMIT
+    assert OVERFLOW_SHEET in row[6]
+
+    rows = overflow_rows([make_post("a", 2023, selftext=text, combined_content=text)])
+    assert [row[:3] for row in rows] == [[permalink("a"), "selftext", 0], [permalink("a"), "selftext", 1],
+                                         [permalink("a"), "combined_content", 0], [permalink("a"), "combined_content", 1]]
+    assert "".join(row[3] for row in rows[:2]) == text
+
+
+def test_export_creates_worksheets_on_demand():
+    spreadsheet, sheets = make_spreadsheet()
+    long_text = "y" * (CELL_TEXT_LIMIT + 1)
+    posts = [make_post("a", 2023), make_post("b", 2024), make_post("c", 2023, selftext=long_text, combined_content=long_text)]
+
+    assert export_sharded(spreadsheet, posts, "year")
+
+    assert sorted(sheets) == ["2023", "2024", OVERFLOW_SHEET]
+    assert [row[3] for row in written_rows(sheets["2023"])[1:]] == [permalink("a"), permalink("c")]
+    assert [row[3] for row in written_rows(sheets["2024"])[1:]] == [permalink("b")]
+    assert [row[:2] for row in written_rows(sheets[OVERFLOW_SHEET])[1:]] == [[permalink("c"), "selftext"], [permalink("c"), "combined_content"]]
+
+
+def test_export_updates_only_affected_worksheets_in_place():
+    spreadsheet, sheets = make_spreadsheet(existing=["2023", "2024"])
+    sheets["2023"].col_values.return_value = ["Reddit Link", permalink("a"), permalink("c")]
+    sheets["2024"].col_values.return_value = ["Reddit Link", permalink("b")]
+    posts = [make_post("a", 2023), make_post("b", 2024), make_post("c", 2023), make_post("d", 2024)]
+
+    assert export_sharded(spreadsheet, posts, "year", changed=[2])
+
+    for worksheet in sheets.values():
+        worksheet.clear.assert_not_called()
+    (updates,), _ = sheets["2023"].batch_update.call_args
+    assert [update["range"] for update in updates] == ["A3:I3"]
+    (appended,), _ = sheets["2024"].append_rows.call_args
+    assert [row[3] for row in appended] == [permalink("d")]
+    assert OVERFLOW_SHEET not in sheets
+
+
+def test_unknown_layout_fails():
+    spreadsheet, _ = make_spreadsheet()
+    assert not export_sharded(spreadsheet, [make_post("a", 2023)], "weekday")
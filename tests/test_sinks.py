@@ -0,0 +1,70 @@
+import json
+import threading
+import pytest
+
+from reddit_fetch.sinks import SinkPipeline, parse_formats, write_json_stream, write_html_stream
+
+SAMPLE_POSTS = [
+    {"title": "Test Post 1", "score": 100, "subreddit": "testsubreddit", "permalink": "https://www.reddit.com/r/testsubreddit/comments/a/", "url": "http://example.com/post1", "date_saved": 1678886400, "selftext": "Café <b>", "comments": [{"author": "commenter1", "body": "Great post!", "score": 5}]},
+    {"title": "Comment on Another Post", "score": 50, "subreddit": "another_sub", "permalink": "https://www.reddit.com/r/another_sub/comments/b/x/c/", "url": "http://example.com/comment1", "date_saved": 1678886500, "selftext": "This is a saved comment.", "num_comments": "N/A"},
+]
+
+@pytest.mark.parametrize("posts", [SAMPLE_POSTS, []])
+def test_write_json_stream_matches_json_dump(tmp_path, posts):
+    path = tmp_path / "saved_posts.json"
+    write_json_stream(iter(posts), str(path))
+    assert path.read_text(encoding="utf-8") == json.dumps(posts, indent=4)
+
+def test_write_html_stream_escapes_content(tmp_path):
+    path = tmp_path / "saved_posts.html"
+    assert write_html_stream(SAMPLE_POSTS, str(path)) == 2
+    content = path.read_text(encoding="utf-8")
+    assert "Café &lt;b&gt;" in content
+    assert content.endswith("</html>\n")
+
+def test_parse_formats():
+    assert parse_formats("json, html,json,google_sheet") == ["json", "html", "google_sheet"]
+    with pytest.raises(ValueError):
+        parse_formats("json,xml")
+
+def test_pipeline_fans_out_to_every_sink():
+    received = {}
+
+    def collector(name):
+        def consume(records):
+            received[name] = [post["title"] for post in records]
+            return True
+        return consume
+
+    with SinkPipeline({"a": collector("a"), "b": collector("b")}, maxsize=1) as pipeline:
+        for post in SAMPLE_POSTS:
+            pipeline.put(post)
+        results = pipeline.close()
+
+    assert results == {"a": True, "b": True}
+    assert received["a"] == received["b"] == ["Test Post 1", "Comment on Another Post"]
+
+def test_slow_or_failing_sink_does_not_block_others():
+    release = threading.Event()
+    fast = []
+
+    def slow(records):
+        release.wait(timeout=5)
+        return len(list(records)) == 50
+
+    def failing(records):
+        raise RuntimeError("quota exceeded")
+
+    def quick(records):
+        for post in records:
+            fast.append(post)
+            if len(fast) == 50:
+                release.set()
+        return True
+
+    with SinkPipeline({"slow": slow, "failing": failing, "quick": quick}, maxsize=100) as pipeline:
+        for n in range(50):
+            pipeline.put({"title": str(n)})
+        results = pipeline.close()
+
+    assert results == {"slow": True, "failing": False, "quick": True}
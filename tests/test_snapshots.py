@@ -0,0 +1,120 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from conftest import make_post
+from reddit_fetch.http_cache import ResponseCache
+from reddit_fetch.snapshots import BlobStore, LinkSnapshotter, needs_snapshot, snapshot_archive
+from reddit_fetch.storage import ShardedArchive
+
+PAGES = {"/a": b"<html>page a</html>", "/b": b"<html>page b</html>", "/copy-of-a": b"<html>page a</html>",
+         "/big": b"x" * 200_000, "/unsized-big": b"x" * 200_000, "/unsized-small": b"<html>small</html>"}
+
+
+class Handler(BaseHTTPRequestHandler):
+    requests = []
+
+    def do_GET(self):
+        Handler.requests.append((self.path, time.monotonic()))
+        body = PAGES.get(self.path)
+        if body is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        if not self.path.startswith("/unsized"): # Otherwise the body runs until the connection closes
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    Handler.requests = []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+
+
+def make_snapshotter(tmp_path, **kwargs):
+    return LinkSnapshotter(BlobStore(f"{tmp_path}/blobs/"), ResponseCache(f"{tmp_path}/cache/"), **kwargs)
+
+
+def test_needs_snapshot_skips_reddit_and_snapshotted_posts():
+    assert needs_snapshot(make_post("a", url="https://example.com/article"))
+    assert not needs_snapshot(make_post("a", url="https://www.reddit.com/r/t/comments/a/"))
+    assert not needs_snapshot(make_post("a", url="https://i.redd.it/x.png"))
+    assert not needs_snapshot(dict(make_post("a", url="https://example.com"), snapshot={"blob": "sha256:00"}))
+    assert not needs_snapshot(dict(make_post("a", url="https://example.com"), snapshot={"error": "HTTP 404", "attempts": 3}))
+
+
+def test_snapshot_archive_stores_deduplicated_blobs(tmp_path, server):
+    archive = ShardedArchive(f"{tmp_path}/archive/")
+    archive.import_records([make_post("a", url=f"{server}/a"), make_post("b", url=f"{server}/b"),
+                            make_post("c", url=f"{server}/copy-of-a"), make_post("d", url=f"{server}/missing"),
+                            make_post("e", url=f"{server}/a")])
+    snapshotter = make_snapshotter(tmp_path, domain_delay=0)
+
+    counts = snapshot_archive(archive, snapshotter=snapshotter)
+    archive.commit()
+
+    assert counts == {"stored": 4, "failed": 1}
+    snapshots = {post["title"][len("Post "):]: post["snapshot"] for post in ShardedArchive(f"{tmp_path}/archive/").iter_records()}
+    assert snapshots["a"]["blob"] == snapshots["c"]["blob"] == snapshots["e"]["blob"]
+    assert snapshotter.blobs.get(snapshots["b"]["blob"]) == PAGES["/b"]
+    assert snapshots["d"]["error"] == "HTTP 404" and snapshots["d"]["attempts"] == 1
+    assert sorted(path for path, _ in Handler.requests) == ["/a", "/b", "/copy-of-a", "/missing"] # Shared URL fetched once
+    assert len(list((tmp_path / "blobs").rglob("*"))) == 4 # Two blobs in two prefix directories
+
+
+def test_backfill_of_a_reopened_archive_keeps_its_snapshots(tmp_path, server):
+    ShardedArchive(f"{tmp_path}/archive/").import_records([make_post("a", month=1, url=f"{server}/a"),
+                                                           make_post("b", month=2, url=f"{server}/b")])
+    archive = ShardedArchive(f"{tmp_path}/archive/") # No shard loaded yet
+
+    assert snapshot_archive(archive, snapshotter=make_snapshotter(tmp_path, domain_delay=0)) == {"stored": 2, "failed": 0}
+    archive.commit()
+
+    reloaded = ShardedArchive(f"{tmp_path}/archive/")
+    for name in ("a", "b"):
+        assert reloaded.get(make_post(name)["permalink"])["snapshot"]["blob"].startswith("sha256:")
+
+
+def test_oversized_pages_are_rejected_without_being_cached(tmp_path, server):
+    snapshotter = make_snapshotter(tmp_path, domain_delay=0, max_bytes=100_000)
+
+    assert "exceeds SNAPSHOT_MAX_BYTES" in snapshotter.fetch(f"{server}/big")["error"] # From Content-Length
+    assert "exceeds SNAPSHOT_MAX_BYTES" in snapshotter.fetch(f"{server}/unsized-big")["error"] # From the running count
+    assert snapshotter.cache.total_bytes == 0
+    assert not (tmp_path / "blobs").exists()
+
+    snapshot = snapshotter.fetch(f"{server}/unsized-small")
+    assert snapshotter.blobs.get(snapshot["blob"]) == PAGES["/unsized-small"]
+    assert snapshotter.cache.total_bytes == len(PAGES["/unsized-small"])
+    assert snapshotter.fetch(f"{server}/unsized-small")["blob"] == snapshot["blob"] # Served from the cache
+    assert [path for path, _ in Handler.requests].count("/unsized-small") == 1
+
+
+def test_requests_to_one_domain_are_spaced(tmp_path, server):
+    snapshotter = make_snapshotter(tmp_path, workers=4, domain_delay=0.2)
+
+    snapshotter.fetch_all([f"{server}/a", f"{server}/b", f"{server}/copy-of-a"])
+
+    times = sorted(at for _, at in Handler.requests)
+    assert all(later - earlier >= 0.15 for earlier, later in zip(times, times[1:]))
+
+
+def test_cached_pages_are_not_fetched_again(tmp_path, server):
+    make_snapshotter(tmp_path, domain_delay=0).fetch_all([f"{server}/a"])
+    snapshot = make_snapshotter(tmp_path, domain_delay=0).fetch(f"{server}/a")
+
+    assert len(Handler.requests) == 1
+    assert snapshot["bytes"] == len(PAGES["/a"])
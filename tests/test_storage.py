@@ -0,0 +1,127 @@
+import json
+import os
+
+import pytest
+
+from conftest import make_post
+from reddit_fetch import storage
+from reddit_fetch.storage import ShardedArchive, open_archive, shard_key
+
+
+def test_shard_key_uses_utc_month():
+    assert shard_key(make_post("a", 2024, 3)) == "2024-03"
+    assert shard_key({"permalink": "x"}) == "undated"
+
+
+def test_commit_writes_shards_and_manifest(tmp_path):
+    archive = ShardedArchive(f"{tmp_path}/")
+    archive.import_records([make_post("a", 2024, 1), make_post("b", 2024, 2), make_post("c", 2024, 1)])
+
+    manifest = json.loads((tmp_path / "manifest.json").read_text())
+    assert sorted(manifest["shards"]) == ["2024-01", "2024-02"]
+    assert manifest["shards"]["2024-01"]["count"] == 2
+    assert manifest["shards"]["2024-01"]["bytes"] == os.path.getsize(tmp_path / "2024-01.json")
+    assert [post["title"] for post in ShardedArchive(f"{tmp_path}/").iter_records()] == ["Post a", "Post c", "Post b"]
+
+
+def test_old_shards_are_not_rewritten(tmp_path):
+    ShardedArchive(f"{tmp_path}/").import_records([make_post("a", 2024, 1), make_post("b", 2024, 2)])
+    os.utime(tmp_path / "2024-01.json", (0, 0))
+
+    archive = ShardedArchive(f"{tmp_path}/")
+    assert archive.upsert(make_post("a", 2024, 1)) == "unchanged"
+    assert archive.upsert(make_post("c", 2024, 2)) == "new"
+    assert archive.commit() == ["2024-02"]
+    assert os.path.getmtime(tmp_path / "2024-01.json") == 0
+
+
+def test_edited_record_is_replaced_in_its_shard(tmp_path):
+    ShardedArchive(f"{tmp_path}/").import_records([make_post("a", 2024, 1), make_post("b", 2024, 2)])
+
+    archive = ShardedArchive(f"{tmp_path}/")
+    assert archive.upsert(make_post("b", 2024, 2, selftext="edited")) == "changed"
+    archive.commit()
+    assert archive.get(make_post("b", 2024, 2)["permalink"])["selftext"] == "edited"
+    assert archive.position(make_post("b", 2024, 2)["permalink"]) == 1
+
+
+def test_range_reads_only_requested_shards(tmp_path):
+    ShardedArchive(f"{tmp_path}/").import_records([make_post("a", 2024, 1), make_post("b", 2024, 2), make_post("c", 2024, 3)])
+    (tmp_path / "2024-01.json").write_text("not json") # Would fail if it were read
+
+    archive = ShardedArchive(f"{tmp_path}/")
+    assert [post["title"] for post in archive.iter_records(since="2024-02")] == ["Post b", "Post c"]
+    assert [post["title"] for post in archive.iter_records(since="2024-02", until="2024-02")] == ["Post b"]
+
+
+def test_open_archive_migrates_legacy_json(tmp_path):
+    legacy = tmp_path / "saved_posts.json"
+    legacy.write_text(json.dumps([make_post("a", 2023, 12), make_post("b", 2024, 1)]))
+
+    archive = open_archive(f"{tmp_path}/archive/", legacy_json=str(legacy))
+
+    assert len(archive) == 2
+    assert archive.shard_keys() == ["2023-12", "2024-01"]
+
+
+def test_aggregates_follow_inserts_edits_and_removals(tmp_path):
+    archive = ShardedArchive(f"{tmp_path}/")
+    archive.import_records([dict(make_post("a", 2024, 1), subreddit="python", score=10, comments=[{"body": "x"}]),
+                            dict(make_post("b", 2024, 2), subreddit="python", score=5)])
+    archive.upsert(dict(make_post("b", 2024, 2, selftext="edited"), subreddit="python", score=7))
+    archive.upsert(dict(make_post("c", 2024, 2), subreddit="rust", score=1))
+    archive.remove(make_post("a", 2024, 1)["permalink"])
+    archive.commit()
+
+    aggregates = ShardedArchive(f"{tmp_path}/").aggregates
+    assert aggregates["total"] == {"count": 2, "score": 8, "comments": 0}
+    assert aggregates["subreddits"] == {"python": {"count": 1, "score": 7, "comments": 0},
+                                        "rust": {"count": 1, "score": 1, "comments": 0}}
+    assert list(aggregates["months"]) == ["2024-02"]
+
+
+def test_aggregates_are_rebuilt_for_older_manifests(tmp_path):
+    ShardedArchive(f"{tmp_path}/").import_records([dict(make_post("a", 2024, 1), subreddit="python", score=3)])
+    manifest = json.loads((tmp_path / "manifest.json").read_text())
+    del manifest["aggregates"]
+    (tmp_path / "manifest.json").write_text(json.dumps(manifest))
+
+    archive = ShardedArchive(f"{tmp_path}/")
+    assert archive.aggregates["subreddits"] == {"python": {"count": 1, "score": 3, "comments": 0}}
+    archive.commit()
+    assert "aggregates" in json.loads((tmp_path / "manifest.json").read_text())
+
+
+def test_commit_interrupted_before_the_index_is_recovered(tmp_path, monkeypatch):
+    def killed(path, data):
+        raise OSError("killed")
+
+    ShardedArchive(f"{tmp_path}/").import_records([make_post("a", 2024, 1)])
+    archive = ShardedArchive(f"{tmp_path}/")
+    archive.upsert(make_post("b", 2024, 1))
+    monkeypatch.setattr(storage, "write_json_atomic", killed)
+    with pytest.raises(OSError):
+        archive.commit() # Dies after the shard write, before index.json and manifest.json
+    monkeypatch.undo()
+
+    replayed = ShardedArchive(f"{tmp_path}/")
+    assert len(replayed) == 2
+    assert replayed.upsert(make_post("b", 2024, 1)) == "unchanged"
+    replayed.commit()
+
+    archive = ShardedArchive(f"{tmp_path}/")
+    assert [post["title"] for post in archive.iter_records()] == ["Post a", "Post b"]
+    assert archive.manifest["shards"]["2024-01"]["count"] == 2
+    assert archive.aggregates["total"]["count"] == 2
+    assert archive._stale_shards() == set()
+
+
+def test_records_archived_twice_are_deduplicated(tmp_path):
+    ShardedArchive(f"{tmp_path}/").import_records([make_post("a", 2024, 1)])
+    shard = json.loads((tmp_path / "2024-01.json").read_text())
+    (tmp_path / "2024-01.json").write_text(json.dumps(shard + [make_post("a", 2024, 1, selftext="edited")]))
+
+    archive = ShardedArchive(f"{tmp_path}/")
+    assert archive.get(make_post("a", 2024, 1)["permalink"])["selftext"] == "edited"
+    archive.commit()
+    assert len(json.loads((tmp_path / "2024-01.json").read_text())) == 1